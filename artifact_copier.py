@@ -0,0 +1,100 @@
+import concurrent
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from threading_utils import propagate_exceptions
+
+
+class ArtifactCopier():
+    """Copies the artifacts of mlflow runs from one workspace to another, file by file.
+
+    The artifact tree of a run is listed recursively and its files are copied largest first by a pool of num_parallel
+    workers, so that the large models start early and the small files fill in behind them. Each file is downloaded to
+    the staging dir, uploaded and removed right away; at most max_staged_bytes are staged at a time, except for a
+    single file that is larger on its own. The mlflow client downloads and uploads each file in chunks where the
+    artifact store supports it. Every copied file is checkpointed, so an interrupted copy resumes with the files that
+    are left.
+    """
+
+    def __init__(self, src_client, dst_client, staging_dir, checkpointer, num_parallel=4,
+                 max_staged_bytes=4 * 1024 ** 3):
+        """
+        :param checkpointer: CheckpointKeyMap of the copied files
+        """
+        self._src_client = src_client
+        self._dst_client = dst_client
+        self._staging_dir = staging_dir
+        self._checkpointer = checkpointer
+        self._max_staged_bytes = max_staged_bytes
+        self._staged_bytes = 0
+        self._staged_condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=num_parallel, thread_name_prefix='artifact-copier')
+
+    def close(self):
+        self._executor.shutdown()
+
+    def list_files(self, run_id):
+        """
+        :return: list of FileInfo of all files in the artifact tree of the run
+        """
+        files = []
+        dirs = [None]
+        while dirs:
+            for file_info in self._src_client.list_artifacts(run_id, dirs.pop()):
+                if file_info.is_dir:
+                    dirs.append(file_info.path)
+                else:
+                    files.append(file_info)
+        return files
+
+    def copy(self, old_run_id, new_run_id):
+        """Copies the artifacts of old_run_id in the source workspace to new_run_id in the destination workspace."""
+        files = [file_info for file_info in self.list_files(old_run_id)
+                 if not self._checkpointer.contains(self._get_checkpoint_key(old_run_id, file_info.path))]
+        if not files:
+            return
+        files.sort(key=lambda file_info: file_info.file_size or 0, reverse=True)
+        logging.info(f"Copying {len(files)} artifacts for run_id: {old_run_id} -> {new_run_id}")
+        run_staging_dir = self._staging_dir + old_run_id + "_temp/"
+        try:
+            futures = [self._executor.submit(self._copy_file, old_run_id, new_run_id, file_info, run_staging_dir)
+                       for file_info in files]
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            for future in futures:
+                future.cancel()
+            concurrent.futures.wait(futures)
+            propagate_exceptions(futures)
+        finally:
+            shutil.rmtree(run_staging_dir, ignore_errors=True)
+
+    def _copy_file(self, old_run_id, new_run_id, file_info, run_staging_dir):
+        size = file_info.file_size or 0
+        self._reserve(size)
+        try:
+            local_path = self._src_client.download_artifacts(old_run_id, file_info.path, run_staging_dir)
+            try:
+                self._dst_client.log_artifact(new_run_id, local_path, os.path.dirname(file_info.path) or None)
+            finally:
+                os.remove(local_path)
+        finally:
+            self._release(size)
+        self._checkpointer.write(self._get_checkpoint_key(old_run_id, file_info.path), new_run_id)
+
+    def _reserve(self, size):
+        with self._staged_condition:
+            self._staged_condition.wait_for(
+                lambda: self._staged_bytes == 0 or self._staged_bytes + size <= self._max_staged_bytes)
+            self._staged_bytes += size
+
+    def _release(self, size):
+        with self._staged_condition:
+            self._staged_bytes -= size
+            self._staged_condition.notify_all()
+
+    @staticmethod
+    def _get_checkpoint_key(run_id, path):
+        # run ids are hex strings, so the key of a file cannot collide with another run's
+        return f"{run_id}_artifacts/{path}"
@@ -0,0 +1,92 @@
+import queue
+import sqlite3
+import threading
+
+
+class BatchedSqliteWriter():
+    """Class that inserts rows into a sqlite database from one writer thread.
+    Any number of threads can write rows without contending for the database lock: rows are queued and inserted with
+    executemany in batches of batch_size rows, in WAL journal mode.
+
+    on_committed(callback) calls the callback from the writer thread once all rows written before it are committed,
+    e.g. to checkpoint them.
+
+    e.g. writer = BatchedSqliteWriter("runs.db", "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)")
+         writer.write([row1, row2])
+         writer.on_committed(lambda: checkpointer.write(key))
+         writer.close()
+    """
+    _CLOSE = object()
+
+    def __init__(self, db_file, insert_sql, batch_size=2000, max_queued_writes=64):
+        """
+        :param max_queued_writes: number of writes that are queued before write blocks
+        """
+        self._db_file = db_file
+        self._insert_sql = insert_sql
+        self._batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queued_writes)
+        self._error = None
+        self._writer = threading.Thread(target=self._write_rows, name='sqlite-writer', daemon=True)
+        self._writer.start()
+
+    def write(self, rows):
+        self._raise_error()
+        self._queue.put(list(rows))
+
+    def on_committed(self, callback):
+        self._raise_error()
+        self._queue.put(callback)
+
+    def close(self):
+        """Commits the remaining rows and waits for the writer thread. Raises the error of the writer thread, if any."""
+        self._queue.put(self._CLOSE)
+        self._writer.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _write_rows(self):
+        con = None
+        try:
+            con = sqlite3.connect(self._db_file)
+            con.execute('PRAGMA journal_mode=WAL')
+        except Exception as e:
+            # the queue is still drained below, so that the error is raised to the writers instead of blocking them
+            self._error = e
+        try:
+            pending_rows = []
+            while True:
+                item = self._queue.get()
+                if self._error is not None:
+                    # drain the queue so that writers do not block, the error is raised to them
+                    if item is self._CLOSE:
+                        return
+                    continue
+                try:
+                    if item is self._CLOSE:
+                        self._commit(con, pending_rows)
+                        return
+                    elif callable(item):
+                        self._commit(con, pending_rows)
+                        pending_rows = []
+                        item()
+                    else:
+                        pending_rows.extend(item)
+                        if len(pending_rows) >= self._batch_size:
+                            self._commit(con, pending_rows)
+                            pending_rows = []
+                except Exception as e:
+                    self._error = e
+                    if item is self._CLOSE:
+                        return
+        finally:
+            if con is not None:
+                con.close()
+
+    def _commit(self, con, rows):
+        if rows:
+            with con:
+                con.executemany(self._insert_sql, rows)
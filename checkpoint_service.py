@@ -90,6 +90,12 @@ class CheckpointKeyMap(AbstractCheckpointKeyMap):
             self._checkpoint_key_map[key] = value
             self._checkpoint_file_append_fp.write(json.dumps({"key": str(key), "value": str(value)}) + "\n")
 
+    def update(self, key, value):
+        """Writes key and value even if the key is already checkpointed. The last value written wins on restore, which
+        makes the map usable as a watermark store."""
+        self._checkpoint_key_map[key] = value
+        self._checkpoint_file_append_fp.write(json.dumps({"key": str(key), "value": str(value)}) + "\n")
+
     def check_contains_otherwise_mark_in_use(self, key):
         """
         If the key_map does not have the key value yet, mark the key to be IN_USE_BY_$THREAD_ID, and return False.
@@ -126,6 +132,9 @@ class CheckpointKeyMap(AbstractCheckpointKeyMap):
     def get(self, key):
         return self._checkpoint_key_map[key]
 
+    def keys(self):
+        return list(self._checkpoint_key_map.keys())
+
     def get_file_path(self):
         return self._checkpoint_file
 
@@ -154,6 +163,9 @@ class DisabledCheckpointKeyMap(AbstractCheckpointKeyMap):
     def write(self, key, value):
         raise NotImplementedError("Checkpoint is disabled")
 
+    def update(self, key, value):
+        raise NotImplementedError("Checkpoint is disabled")
+
     def contains(self, key):
         return False
 
@@ -163,6 +175,9 @@ class DisabledCheckpointKeyMap(AbstractCheckpointKeyMap):
     def get(self, key):
         raise NotImplementedError("Checkpoint is disabled")
 
+    def keys(self):
+        return []
+
     def get_file_path(self):
         raise NotImplementedError("Checkpoint is disabled")
 
@@ -0,0 +1,109 @@
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+_multiplexers = {}
+_multiplexers_lock = threading.Lock()
+
+
+@dataclass
+class _Command:
+    cid: str
+    ec_id: str
+    command_id: str
+    future: concurrent.futures.Future
+    poll_interval: float
+
+
+class CommandMultiplexer():
+    """Keeps remote commands (rest api 1.2) of any number of execution contexts in flight and polls their status from
+    one background thread.
+
+    Each command is polled first after INITIAL_POLL_INTERVAL seconds, and the interval grows by BACKOFF up to
+    MAX_POLL_INTERVAL while the command runs, so short commands return quickly and long ones cost few requests.
+    The results are handed back through futures. The poller thread stops when no command is in flight.
+    Clients share the multiplexer of their workspace through get_command_multiplexer.
+    """
+
+    INITIAL_POLL_INTERVAL = 0.1
+    MAX_POLL_INTERVAL = 5
+    BACKOFF = 1.5
+
+    def __init__(self, client):
+        self._client = client
+        self._condition = threading.Condition()
+        self._commands = []  # heap of (next poll time, sequence number, command)
+        self._sequence = itertools.count()
+        self._poller = None
+
+    def submit(self, cid, ec_id, cmd):
+        """
+        :return: future that resolves to the results of the command
+        """
+        future = concurrent.futures.Future()
+        command_payload = {'language': 'python',
+                           'contextId': ec_id,
+                           'clusterId': cid,
+                           'command': cmd}
+        command = self._client.post('/commands/execute', json_params=command_payload, version="1.2")
+        com_id = command.get('id', None)
+        if not com_id:
+            logging.error(command)
+            future.set_exception(ValueError(f'Unable to submit command: {command}'))
+            return future
+        self._schedule(_Command(cid, ec_id, com_id, future, self.INITIAL_POLL_INTERVAL))
+        return future
+
+    def _schedule(self, command):
+        with self._condition:
+            heapq.heappush(self._commands,
+                           (time.monotonic() + command.poll_interval, next(self._sequence), command))
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='command-multiplexer', daemon=True)
+                self._poller.start()
+            self._condition.notify()
+
+    def _poll(self):
+        while True:
+            with self._condition:
+                if not self._commands:
+                    self._poller = None
+                    return
+                next_poll, _, command = self._commands[0]
+                delay = next_poll - time.monotonic()
+                if delay > 0:
+                    # woken up early when a command is submitted
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._commands)
+            self._poll_command(command)
+
+    def _poll_command(self, command):
+        result_payload = {'clusterId': command.cid, 'contextId': command.ec_id, 'commandId': command.command_id}
+        try:
+            resp = self._client.get('/commands/status', json_params=result_payload, version="1.2")
+            status = self._client.get_key(resp, 'status')
+            if status in ('Running', 'Queued'):
+                command.poll_interval = min(command.poll_interval * self.BACKOFF, self.MAX_POLL_INTERVAL)
+                self._schedule(command)
+                return
+            end_results = self._client.get_key(resp, 'results')
+        except Exception as e:
+            command.future.set_exception(e)
+            return
+        if end_results.get('resultType', None) == 'error':
+            logging.error(end_results.get('summary', None))
+        command.future.set_result(end_results)
+
+
+def get_command_multiplexer(client):
+    """Return the command multiplexer of the client's workspace, shared by all clients."""
+    url = client.get_url()
+    with _multiplexers_lock:
+        if url not in _multiplexers:
+            _multiplexers[url] = CommandMultiplexer(client)
+        return _multiplexers[url]
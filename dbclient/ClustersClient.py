@@ -3,12 +3,33 @@ import os
 import re
 import time
 import logging_utils
+from identity_directory import get_identity_directory
+from group_membership import get_group_membership_index
+from id_translation import get_id_translation_cache
+from execution_context_pool import get_execution_context_pool
+from command_multiplexer import get_command_multiplexer
+from remote_results import get_remote_result_transport
+from poller import Poller
 import wmconstants
 from dbclient import *
+import concurrent
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import threading
 from functools import cached_property
+from thread_safe_writer import ThreadSafeWriter
+from threading_utils import propagate_exceptions
+
+# clusters started in the background by prewarm_cluster, keyed by (workspace url, cluster name)
+_prewarmed_clusters = {}
+_prewarmed_clusters_lock = threading.Lock()
 
 
 class ClustersClient(dbclient):
+    CLUSTER_POLLING_INTERVAL_SECONDS = 2
+    CLUSTER_MAX_POLLING_INTERVAL_SECONDS = 30
+    CLUSTER_WAIT_TIMEOUT_SECONDS = 3600
+
     def __init__(self, configs, checkpoint_service):
         super().__init__(configs)
         self._checkpoint_service = checkpoint_service
@@ -48,8 +69,9 @@ class ClustersClient(dbclient):
         :return:
         """
         pool_id_dict = self.get_instance_pool_id_mapping()
+        old_pool_id = cluster_json['instance_pool_id']
 
-        if not pool_id_dict:
+        if not pool_id_dict or old_pool_id not in pool_id_dict:
             logging.info("WARNING: instance pool is outdated. Pools may have been deleted; cluster will use defaults.")
             cluster_json.pop("instance_pool_id")
         else:
@@ -58,8 +80,7 @@ class ClustersClient(dbclient):
             cluster_json.pop('driver_node_type_id', None)
             cluster_json.pop('enable_elastic_disk', None)
             # map old pool ids to new pool ids
-            old_pool_id = cluster_json['instance_pool_id']
-            cluster_json['instance_pool_id'] = pool_id_dict.get[old_pool_id]
+            cluster_json['instance_pool_id'] = pool_id_dict[old_pool_id]
 
         if not is_job_cluster:
             # add custom tag for original cluster creator for cost tracking
@@ -83,6 +104,7 @@ class ClustersClient(dbclient):
         for x in cl:
             self.post('/clusters/unpin', {'cluster_id': x['cluster_id']})
             self.post('/clusters/permanent-delete', {'cluster_id': x['cluster_id']})
+        get_id_translation_cache(self, refresh=True)
 
     def edit_cluster(self, cid, iam_role):
         """Edits the existing metastore cluster
@@ -118,6 +140,14 @@ class ClustersClient(dbclient):
         perms['cluster_name'] = cluster_name
         return perms
 
+    def get_cluster_by_name(self, cname):
+        """ Returns the cluster json of the cluster name, None if it does not exist """
+        cluster_list = self.get('/clusters/list').get('clusters', [])
+        for x in cluster_list:
+            if cname == x['cluster_name']:
+                return x
+        return None
+
     def get_cluster_id_by_name(self, cname, running_only=False):
         cluster_list = self.get('/clusters/list').get('clusters', [])
         if running_only:
@@ -143,19 +173,16 @@ class ClustersClient(dbclient):
         else:
             return clusters_list
 
+    def get_execution_context_pool(self, cid):
+        return get_execution_context_pool(self, cid, self._num_parallel, self._checkpoint_service)
+
     def get_execution_context(self, cid):
-        logging.info("Creating remote Spark Session")
-        time.sleep(5)
-        ec_payload = {"language": "python",
-                      "clusterId": cid}
-        ec = self.post('/contexts/create', json_params=ec_payload, version="1.2")
-        # Grab the execution context ID
-        ec_id = ec.get('id', None)
-        if not ec_id:
-            logging.info('Unable to establish remote session')
-            logging.info(ec)
-            raise Exception("Remote session error")
-        return ec_id
+        """ Returns the execution context of the cluster shared by commands that run one at a time """
+        return self.get_execution_context_pool(cid).get_context()
+
+    def execution_context(self, cid):
+        """ Hands out an execution context of the cluster for the exclusive use of a with block """
+        return self.get_execution_context_pool(cid).context()
 
     def get_global_init_scripts(self):
         """ return a list of global init scripts. Currently not logged """
@@ -168,30 +195,16 @@ class ClustersClient(dbclient):
 
     def get_instance_pool_id_mapping(self, log_file='instance_pools.log'):
         pool_log = self.get_export_dir() + log_file
-        current_pools = self.get('/instance-pools/list').get('instance_pools', None)
+        id_cache = get_id_translation_cache(self)
+        current_pools = id_cache.pool_ids()  # dict of pool name : current pool id
         if not current_pools:
             return None
-        new_pools = {}
-        # build dict of pool name and id mapping
-        for p in current_pools:
-            new_pools[p['instance_pool_name']] = p['instance_pool_id']
         # mapping id from old_pool_id to new_pool_id
-        pool_mapping_dict = {}
-        with open(pool_log, 'r') as fp:
-            for line in fp:
-                pool_conf = json.loads(line)
-                old_pool_id = pool_conf['instance_pool_id']
-                pool_name = pool_conf['instance_pool_name']
-                new_pool_id = new_pools[pool_name]
-                pool_mapping_dict[old_pool_id] = new_pool_id
-        return pool_mapping_dict
+        old_pools = id_cache.source_names(pool_log, 'instance_pool_id', 'instance_pool_name')
+        return id_cache.translate(old_pools, current_pools)
 
     def get_policy_id_by_name_dict(self):
-        name_id_dict = {}
-        resp = self.get('/policies/clusters/list').get('policies', [])
-        for policy in resp:
-            name_id_dict[policy['name']] = policy['policy_id']
-        return name_id_dict
+        return dict(get_id_translation_cache(self).policy_ids())
 
     def get_spark_versions(self):
         return self.get("/clusters/spark-versions", print_json=True)
@@ -217,25 +230,41 @@ class ClustersClient(dbclient):
         :return: str of new policy id
         """
         policy_log = self.get_export_dir() + policy_file
-        current_policies = self.get('/policies/clusters/list').get('policies', [])
-        current_policies_dict = {}  # name : current policy id
-        for policy in current_policies:
-            current_name = policy['name']
-            current_id = policy['policy_id']
-            current_policies_dict[current_name] = current_id
-        policy_id_dict = {}
-        with open(policy_log, 'r') as fp:
-            for line in fp:
-                policy_conf = json.loads(line)
-                policy_name = policy_conf['name']
-                old_policy_id = policy_conf['policy_id']
-                policy_id_dict[old_policy_id] = current_policies_dict[policy_name] # old_id : new_id
-        return policy_id_dict
+        id_cache = get_id_translation_cache(self)
+        current_policies_dict = id_cache.policy_ids()  # name : current policy id
+        old_policies = id_cache.source_names(policy_log, 'policy_id', 'name')
+        return id_cache.translate(old_policies, current_policies_dict)  # old_id : new_id
 
-    def import_cluster_configs(self, log_file='clusters.log', acl_log_file='acl_clusters.log', filter_user=None):
+    def adjust_cluster_conf(self, cluster_conf, old_2_new_policy_ids):
+        """
+        map the policy and pool ids of an exported cluster config to the new workspace
+        :return: cluster config to create / edit the cluster with
+        """
+        cluster_creator = cluster_conf.pop('creator_user_name')
+        if 'policy_id' in cluster_conf:
+            old_policy_id = cluster_conf['policy_id']
+            cluster_conf['policy_id'] = old_2_new_policy_ids[old_policy_id]
+        # check for instance pools and modify cluster attributes
+        if 'instance_pool_id' in cluster_conf:
+            new_cluster_conf = self.cleanup_cluster_pool_configs(cluster_conf, cluster_creator)
+        else:
+            # update cluster configs for non-pool clusters
+            # add original creator tag to help with DBU tracking
+            if 'custom_tags' in cluster_conf:
+                tags = cluster_conf['custom_tags']
+                tags['OriginalCreator'] = cluster_creator
+                cluster_conf['custom_tags'] = tags
+            else:
+                cluster_conf['custom_tags'] = {'OriginalCreator': cluster_creator}
+            new_cluster_conf = cluster_conf
+        return new_cluster_conf
+
+    def import_cluster_configs(self, log_file='clusters.log', acl_log_file='acl_clusters.log', filter_user=None,
+                               num_parallel=4):
         """
         Import cluster configs and update appropriate properties / tags in the new env
         :param log_file:
+        :param num_parallel: number of clusters to create and apply ACLs to at the same time
         :return:
         """
         cluster_log = self.get_export_dir() + log_file
@@ -243,14 +272,34 @@ class ClustersClient(dbclient):
         if not os.path.exists(cluster_log):
             logging.info("No clusters to import.")
             return
-        current_cluster_names = set([x.get('cluster_name', None) for x in self.get_cluster_list(False)])
+        id_cache = get_id_translation_cache(self)
+        current_cluster_names = set(id_cache.cluster_ids())
         old_2_new_policy_ids = self.get_new_policy_id_dict()  # dict of {old_id : new_id}
         error_logger = logging_utils.get_error_logger(
             wmconstants.WM_IMPORT, wmconstants.CLUSTER_OBJECT, self.get_export_dir())
         checkpoint_cluster_configs_set = self._checkpoint_service.get_checkpoint_key_set(
             wmconstants.WM_IMPORT, wmconstants.CLUSTER_OBJECT)
+
+        def _create_cluster_helper(cluster_conf):
+            cluster_name = cluster_conf['cluster_name']
+            new_cluster_conf = self.adjust_cluster_conf(cluster_conf, old_2_new_policy_ids)
+            print("Creating cluster: {0}".format(new_cluster_conf['cluster_name']))
+            cluster_resp = self.post('/clusters/create', new_cluster_conf)
+            if cluster_resp['http_status_code'] == 200:
+                id_cache.add_cluster(cluster_name, cluster_resp['cluster_id'])
+                # a cluster is stopped after it is created, and then pinned
+                stop_resp = self.post('/clusters/delete', {'cluster_id': cluster_resp['cluster_id']})
+                if 'pinned_by_user_name' in cluster_conf:
+                    pin_resp = self.post('/clusters/pin', {'cluster_id': cluster_resp['cluster_id']})
+                if 'cluster_id' in cluster_conf:
+                    checkpoint_cluster_configs_set.write(cluster_conf['cluster_id'])
+            else:
+                logging_utils.log_response_error(error_logger, cluster_resp)
+                print(cluster_resp)
+
         # get instance pool id mappings
-        with open(cluster_log, 'r') as fp:
+        with open(cluster_log, 'r') as fp, ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            futures = []
             for line in fp:
                 cluster_conf = json.loads(line)
                 if 'cluster_id' in cluster_conf and checkpoint_cluster_configs_set.contains(cluster_conf['cluster_id']):
@@ -259,67 +308,83 @@ class ClustersClient(dbclient):
                 if cluster_name in current_cluster_names:
                     logging.info("Cluster already exists, skipping: {0}".format(cluster_name))
                     continue
-                cluster_creator = cluster_conf.pop('creator_user_name')
-                if 'policy_id' in cluster_conf:
-                    old_policy_id = cluster_conf['policy_id']
-                    cluster_conf['policy_id'] = old_2_new_policy_ids[old_policy_id]
-                # check for instance pools and modify cluster attributes
-                if 'instance_pool_id' in cluster_conf:
-                    new_cluster_conf = self.cleanup_cluster_pool_configs(cluster_conf, cluster_creator)
-                else:
-                    # update cluster configs for non-pool clusters
-                    # add original creator tag to help with DBU tracking
-                    if 'custom_tags' in cluster_conf:
-                        tags = cluster_conf['custom_tags']
-                        tags['OriginalCreator'] = cluster_creator
-                        cluster_conf['custom_tags'] = tags
-                    else:
-                        cluster_conf['custom_tags'] = {'OriginalCreator': cluster_creator}
-                    new_cluster_conf = cluster_conf
-                print("Creating cluster: {0}".format(new_cluster_conf['cluster_name']))
-                cluster_resp = self.post('/clusters/create', new_cluster_conf)
-                if cluster_resp['http_status_code'] == 200:
-                    stop_resp = self.post('/clusters/delete', {'cluster_id': cluster_resp['cluster_id']})
-                    if 'pinned_by_user_name' in cluster_conf:
-                        pin_resp = self.post('/clusters/pin', {'cluster_id': cluster_resp['cluster_id']})
-                    if 'cluster_id' in cluster_conf:
-                        checkpoint_cluster_configs_set.write(cluster_conf['cluster_id'])
-                else:
-                    logging_utils.log_response_error(error_logger, cluster_resp)
-                    print(cluster_resp)
+                futures.append(executor.submit(_create_cluster_helper, cluster_conf))
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures)
 
         # TODO: May be put it into a separate step to make it more rerunnable.
         self._log_cluster_ids_and_original_creators(log_file)
 
+        if self.skip_missing_users:
+            ignore_error_list = ["RESOURCE_DOES_NOT_EXIST", "RESOURCE_ALREADY_EXISTS"]
+        else:
+            ignore_error_list = ["RESOURCE_ALREADY_EXISTS"]
+
+        def _apply_cluster_acl_helper(data):
+            cluster_name = data['cluster_name']
+            print(f'Applying acl for {cluster_name}')
+            acl_args = {'access_control_list' : self.build_acl_args(data['access_control_list'], error_logger)}
+            cid = id_cache.cluster_ids().get(cluster_name, None)
+            if cid is None:
+                error_message = f'Cluster id must exist in new env for cluster_name: {cluster_name}. ' \
+                                f'Re-import cluster configs.'
+                raise ValueError(error_message)
+            api = f'/preview/permissions/clusters/{cid}'
+            resp = self.put(api, acl_args)
+
+            if logging_utils.check_error(resp, ignore_error_list):
+                logging_utils.log_response_error(error_logger, resp)
+            elif 'object_id' in data:
+                checkpoint_cluster_configs_set.write(data['object_id'])
+
+            print(resp)
+
         # add cluster ACLs
         # loop through and reapply cluster ACLs
-        with open(acl_cluster_log, 'r') as acl_fp:
+        with open(acl_cluster_log, 'r') as acl_fp, ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            futures = []
             for x in acl_fp:
                 data = json.loads(x)
                 if 'object_id' in data and checkpoint_cluster_configs_set.contains(data['object_id']):
                     continue
-                cluster_name = data['cluster_name']
-                print(f'Applying acl for {cluster_name}')
-                acl_args = {'access_control_list' : self.build_acl_args(data['access_control_list'], error_logger)}
-                cid = self.get_cluster_id_by_name(cluster_name)
-                if cid is None:
-                    error_message = f'Cluster id must exist in new env for cluster_name: {cluster_name}. ' \
-                                    f'Re-import cluster configs.'
-                    raise ValueError(error_message)
-                api = f'/preview/permissions/clusters/{cid}'
-                resp = self.put(api, acl_args)
-
-                if self.skip_missing_users:
-                    ignore_error_list = ["RESOURCE_DOES_NOT_EXIST", "RESOURCE_ALREADY_EXISTS"]
-                else:
-                    ignore_error_list = ["RESOURCE_ALREADY_EXISTS"]
-
-                if logging_utils.check_error(resp, ignore_error_list):
-                    logging_utils.log_response_error(error_logger, resp)
-                elif 'object_id' in data:
-                    checkpoint_cluster_configs_set.write(data['object_id'])
+                futures.append(executor.submit(_apply_cluster_acl_helper, data))
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures)
 
-                print(resp)
+    def update_cluster_configs(self, log_file='clusters_changed.log'):
+        """
+        Edit clusters that already exist in the new env with their latest exported configs
+        :param log_file: exported configs of clusters that already exist in the new workspace, matched by cluster_name
+        """
+        cluster_log = self.get_export_dir() + log_file
+        if not os.path.exists(cluster_log):
+            logging.info("No cluster configs to update.")
+            return
+        current_cluster_ids = get_id_translation_cache(self).cluster_ids()
+        old_2_new_policy_ids = self.get_new_policy_id_dict()  # dict of {old_id : new_id}
+        error_logger = logging_utils.get_error_logger(
+            wmconstants.WM_IMPORT, wmconstants.CLUSTER_OBJECT, self.get_export_dir())
+        checkpoint_cluster_configs_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_IMPORT, wmconstants.CLUSTER_OBJECT)
+        with open(cluster_log, 'r') as fp:
+            for line in fp:
+                cluster_conf = json.loads(line)
+                old_cluster_id = cluster_conf.pop('cluster_id', None)
+                if old_cluster_id and checkpoint_cluster_configs_set.contains(f'edit:{old_cluster_id}'):
+                    continue
+                cluster_name = cluster_conf['cluster_name']
+                cid = current_cluster_ids.get(cluster_name, None)
+                if cid is None:
+                    error_logger.error(f'Cluster {cluster_name} does not exist in the new env. Re-import cluster configs.')
+                    continue
+                # pinning is not part of the edit api
+                cluster_conf.pop('pinned_by_user_name', None)
+                new_cluster_conf = self.adjust_cluster_conf(cluster_conf, old_2_new_policy_ids)
+                new_cluster_conf['cluster_id'] = cid
+                logging.info(f"Updating cluster: {cluster_name}")
+                resp = self.post('/clusters/edit', new_cluster_conf)
+                if not logging_utils.log_response_error(error_logger, resp) and old_cluster_id:
+                    checkpoint_cluster_configs_set.write(f'edit:{old_cluster_id}')
 
     def _log_cluster_ids_and_original_creators(
             self,
@@ -378,23 +443,16 @@ class ClustersClient(dbclient):
         :return: old_cluster_id -> new_cluster_id dictionary.
         """
         cluster_logfile = self.get_export_dir() + log_file
-        current_cl = self.get_cluster_list(False)
-        old_clusters = {}
-        # build dict with old cluster name to cluster id mapping
         if not os.path.exists(cluster_logfile):
             raise ValueError('Clusters log must exist to map clusters to previous existing cluster ids')
-        with open(cluster_logfile, 'r') as fp:
-            for line in fp:
-                conf = json.loads(line)
-                old_clusters[conf['cluster_name']] = conf['cluster_id']
-        old_to_new_mapping = {}
-        for new_cluster in current_cl:
-            old_cluster_id = old_clusters.get(new_cluster['cluster_name'], None)
-            if old_cluster_id:
-                old_to_new_mapping[old_cluster_id] = new_cluster['cluster_id']
-        return old_to_new_mapping
-
-    def import_cluster_policies(self, log_file='cluster_policies.log', acl_log_file='acl_cluster_policies.log'):
+        id_cache = get_id_translation_cache(self)
+        # build dict with old cluster name to cluster id mapping, the last cluster of a name wins
+        old_clusters = {name: old_id for old_id, name in
+                        id_cache.source_names(cluster_logfile, 'cluster_id', 'cluster_name').items()}
+        return id_cache.translate({old_id: name for name, old_id in old_clusters.items()}, id_cache.cluster_ids())
+
+    def import_cluster_policies(self, log_file='cluster_policies.log', acl_log_file='acl_cluster_policies.log',
+                                num_parallel=4):
         policies_log = self.get_export_dir() + log_file
         acl_policies_log = self.get_export_dir() + acl_log_file
         error_logger = logging_utils.get_error_logger(
@@ -402,36 +460,51 @@ class ClustersClient(dbclient):
         checkpoint_cluster_policies_set = self._checkpoint_service.get_checkpoint_key_set(
             wmconstants.WM_IMPORT, wmconstants.CLUSTER_OBJECT
         )
+
+        def _create_policy_helper(policy_conf):
+            # when creating the policy, we only need `name` and `definition` fields
+            create_args = {'name': policy_conf['name'],
+                           'definition': policy_conf['definition']}
+            resp = self.post('/policies/clusters/create', create_args)
+            ignore_error_list = ['INVALID_PARAMETER_VALUE']
+            if not logging_utils.log_response_error(error_logger, resp, ignore_error_list=ignore_error_list):
+                if 'policy_id' in resp:
+                    get_id_translation_cache(self).add_policy(policy_conf['name'], resp['policy_id'])
+                if 'policy_id' in policy_conf:
+                    checkpoint_cluster_policies_set.write(policy_conf['policy_id'])
+
+        def _apply_policy_acl_helper(p_acl, id_map):
+            acl_create_args = {'access_control_list': self.build_acl_args(p_acl['access_control_list'], error_logger)}
+            policy_id = id_map[p_acl['name']]
+            api = f'/permissions/cluster-policies/{policy_id}'
+            resp = self.put(api, acl_create_args)
+            if not logging_utils.log_response_error(error_logger, resp):
+                if 'object_id' in p_acl:
+                    checkpoint_cluster_policies_set.write(p_acl['object_id'])
+
         # create the policies
         if os.path.exists(policies_log):
-            with open(policies_log, 'r') as policy_fp:
+            with open(policies_log, 'r') as policy_fp, ThreadPoolExecutor(max_workers=num_parallel) as executor:
+                futures = []
                 for p in policy_fp:
                     policy_conf = json.loads(p)
                     if 'policy_id' in policy_conf and checkpoint_cluster_policies_set.contains(policy_conf['policy_id']):
                         continue
-                    # when creating the policy, we only need `name` and `definition` fields
-                    create_args = {'name': policy_conf['name'],
-                                   'definition': policy_conf['definition']}
-                    resp = self.post('/policies/clusters/create', create_args)
-                    ignore_error_list = ['INVALID_PARAMETER_VALUE']
-                    if not logging_utils.log_response_error(error_logger, resp, ignore_error_list=ignore_error_list):
-                        if 'policy_id' in policy_conf:
-                            checkpoint_cluster_policies_set.write(policy_conf['policy_id'])
+                    futures.append(executor.submit(_create_policy_helper, policy_conf))
+                concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                propagate_exceptions(futures)
 
             # ACLs are created by using the `access_control_list` key
-            with open(acl_policies_log, 'r') as acl_fp:
+            with open(acl_policies_log, 'r') as acl_fp, ThreadPoolExecutor(max_workers=num_parallel) as executor:
                 id_map = self.get_policy_id_by_name_dict()
+                futures = []
                 for x in acl_fp:
                     p_acl = json.loads(x)
                     if 'object_id' in p_acl and checkpoint_cluster_policies_set.contains(p_acl['object_id']):
                         continue
-                    acl_create_args = {'access_control_list': self.build_acl_args(p_acl['access_control_list'], error_logger)}
-                    policy_id = id_map[p_acl['name']]
-                    api = f'/permissions/cluster-policies/{policy_id}'
-                    resp = self.put(api, acl_create_args)
-                    if not logging_utils.log_response_error(error_logger, resp):
-                        if 'object_id' in p_acl:
-                            checkpoint_cluster_policies_set.write(p_acl['object_id'])
+                    futures.append(executor.submit(_apply_policy_acl_helper, p_acl, id_map))
+                concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                propagate_exceptions(futures)
         else:
             logging.info('Skipping cluster policies as no log file exists')
 
@@ -447,7 +520,9 @@ class ClustersClient(dbclient):
                 pool_conf = json.loads(line)
                 pool_resp = self.post('/instance-pools/create', pool_conf)
                 ignore_error_list = ['INVALID_PARAMETER_VALUE']
-                logging_utils.log_response_error(error_logger, pool_resp, ignore_error_list=ignore_error_list)
+                if not logging_utils.log_response_error(error_logger, pool_resp, ignore_error_list=ignore_error_list) \
+                        and 'instance_pool_id' in pool_resp:
+                    get_id_translation_cache(self).add_pool(pool_conf['instance_pool_name'], pool_resp['instance_pool_id'])
 
     def import_instance_profiles(self, log_file='instance_profiles.log'):
         # currently an AWS only operation
@@ -486,9 +561,8 @@ class ClustersClient(dbclient):
         else:
             return False
 
-    def launch_cluster(self, iam_role=None, enable_table_acls=False):
-        """ Launches a cluster to get DDL statements.
-        Returns a cluster_id """
+    def get_migration_cluster_json(self, iam_role=None, enable_table_acls=False):
+        """ Returns the config of the cluster to get DDL statements with """
         # removed for now as Spark 3.0 will have backwards incompatible changes
         # version = self.get_latest_spark_version()
         import os
@@ -512,11 +586,23 @@ class ClustersClient(dbclient):
                 cluster_json = json.loads(fp.read())
         # set the latest spark release regardless of defined cluster json
         # cluster_json['spark_version'] = version['key']
+        return cluster_json
+
+    def launch_cluster(self, iam_role=None, enable_table_acls=False):
+        """ Launches a cluster to get DDL statements.
+        Returns a cluster_id """
+        cluster_json = self.get_migration_cluster_json(iam_role, enable_table_acls)
+        prewarmed_cid = self._get_prewarmed_cluster(cluster_json['cluster_name'])
+        if prewarmed_cid:
+            return prewarmed_cid
+        return self._launch_cluster(cluster_json)
+
+    def _launch_cluster(self, cluster_json):
         cluster_name = cluster_json['cluster_name']
-        existing_cid = self.get_cluster_id_by_name(cluster_name)
-        if existing_cid:
-            # if the cluster id exists, then a cluster exists in a terminated state. let's start it
-            cid = self.start_cluster_by_name(cluster_name)
+        existing_cluster = self.get_cluster_by_name(cluster_name)
+        if existing_cluster:
+            # if the cluster exists, start it unless it is running already
+            cid = self._start_cluster(existing_cluster)
             return cid
         else:
             logging.info("Starting cluster with name: {0} ".format(cluster_name))
@@ -526,21 +612,30 @@ class ClustersClient(dbclient):
             self.wait_for_cluster(c_info['cluster_id'])
             return c_info['cluster_id']
 
-    def log_cluster_configs(self, log_file='clusters.log', acl_log_file='acl_clusters.log', filter_user=None):
+    def get_principals_to_keep(self):
+        """
+        Resolve groups_to_keep with the group membership index of the export, which is built once and shared by all
+        filtered exports.
+        :return: tuple of the set of userNames and the set of groups to keep, both empty if groups_to_keep is not set
+        """
+        if not self.groups_to_keep:
+            return set(), set()
+        index = get_group_membership_index(self)
+        return index.users_in_groups(self.groups_to_keep), index.groups_within(self.groups_to_keep)
+
+    def log_cluster_configs(self, log_file='clusters.log', acl_log_file='acl_clusters.log', filter_user=None,
+                            num_parallel=4):
         """
         Log the current cluster configs in json file
         :param log_file: log the cluster configs
         :param acl_log_file: log the ACL definitions
         :param filter_user: user name to filter and log the cluster config
+        :param num_parallel: number of threads to fetch the cluster ACLs with
         :return:
         """
 
-        # get users list based on groups_to_keep
-        users_list = []
-        if self.groups_to_keep is not None:
-            all_users = self.get('/preview/scim/v2/Users').get('Resources', None)
-            users_list = list(set([user.get("emails")[0].get("value") for user in all_users
-                                   for group in user.get("groups") if group.get("display") in self.groups_to_keep]))
+        # get users and groups to keep based on groups_to_keep, including nested memberships
+        users_list, groups_list = self.get_principals_to_keep()
 
         cluster_log = self.get_export_dir() + log_file
         acl_cluster_log = self.get_export_dir() + acl_log_file
@@ -556,51 +651,73 @@ class ClustersClient(dbclient):
             # generate list of registered instance profiles to check cluster configs against
             nonempty_ip_list = list(filter(None, [x.get('instance_profile_arn', None) for x in ip_list]))
 
-        # filter on these items as MVP of the cluster configs
-        # https://docs.databricks.com/api/latest/clusters.html#request-structure
-        with open(cluster_log, 'w') as log_fp, open(acl_cluster_log, 'w') as acl_log_fp:
-            for cluster_json in cluster_list:
-                run_properties = set(list(cluster_json.keys())) - self.create_configs
-                for p in run_properties:
-                    del cluster_json[p]
-                if 'aws_attributes' in cluster_json:
-                    aws_conf = cluster_json.pop('aws_attributes')
-                    iam_role = aws_conf.get('instance_profile_arn', None)
-                    if iam_role and ip_list:
-                        if iam_role not in nonempty_ip_list:
-                            logging.info("Skipping log of default IAM role: " + iam_role)
-                            del aws_conf['instance_profile_arn']
-                            cluster_json['aws_attributes'] = aws_conf
-                    cluster_json['aws_attributes'] = aws_conf
-                cluster_perms = self.get_cluster_acls(cluster_json['cluster_id'], cluster_json['cluster_name'])
-
-                if users_list:
-                    acls = [acl for acl in cluster_perms.get("access_control_list") if
-                            (acl.get("group_name", "") in self.groups_to_keep) or
-                            (acl.get("user_name", "") in users_list) or
-                            (acl.get("group_name", "") == "users")]
-                    cluster_perms["access_control_list"] = acls
-
-                    if cluster_perms['http_status_code'] == 200 and acls:
-                        acl_log_fp.write(json.dumps(cluster_perms) + '\n')
-                    else:
-                        error_logger.error(f'Failed to get cluster ACL: {cluster_perms}')
+        # resume the logs of a previous export if its checkpoint exists, otherwise start over
+        resume = self._checkpoint_service.checkpoint_enabled and \
+            self._checkpoint_service.checkpoint_file_exists(wmconstants.WM_EXPORT, wmconstants.CLUSTER_OBJECT)
+        checkpoint_cluster_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_EXPORT, wmconstants.CLUSTER_OBJECT)
 
-                elif cluster_perms['http_status_code'] == 200:
-                    acl_log_fp.write(json.dumps(cluster_perms) + '\n')
+        def _log_cluster_helper(cluster_json, log_writer, acl_log_writer):
+            cluster_id = cluster_json['cluster_id']
+            run_properties = set(list(cluster_json.keys())) - self.create_configs
+            for p in run_properties:
+                del cluster_json[p]
+            if 'aws_attributes' in cluster_json:
+                aws_conf = cluster_json.pop('aws_attributes')
+                iam_role = aws_conf.get('instance_profile_arn', None)
+                if iam_role and ip_list:
+                    if iam_role not in nonempty_ip_list:
+                        logging.info("Skipping log of default IAM role: " + iam_role)
+                        del aws_conf['instance_profile_arn']
+                        cluster_json['aws_attributes'] = aws_conf
+                cluster_json['aws_attributes'] = aws_conf
+            cluster_perms = self.get_cluster_acls(cluster_json['cluster_id'], cluster_json['cluster_name'])
+
+            if users_list:
+                acls = [acl for acl in cluster_perms.get("access_control_list") if
+                        (acl.get("group_name", "") in groups_list) or
+                        (acl.get("user_name", "") in users_list) or
+                        (acl.get("group_name", "") == "users")]
+                cluster_perms["access_control_list"] = acls
+
+                if cluster_perms['http_status_code'] == 200 and acls:
+                    acl_log_writer.write(json.dumps(cluster_perms) + '\n')
                 else:
                     error_logger.error(f'Failed to get cluster ACL: {cluster_perms}')
 
-                if filter_user:
-                    if cluster_json['creator_user_name'] == filter_user:
-                        log_fp.write(json.dumps(cluster_json) + '\n')
-                elif users_list:
-                    if cluster_json.get('creator_user_name') in users_list:
-                        log_fp.write(json.dumps(cluster_json) + '\n')
-                else:
-                    log_fp.write(json.dumps(cluster_json) + '\n')
+            elif cluster_perms['http_status_code'] == 200:
+                acl_log_writer.write(json.dumps(cluster_perms) + '\n')
+            else:
+                error_logger.error(f'Failed to get cluster ACL: {cluster_perms}')
+
+            if filter_user:
+                if cluster_json['creator_user_name'] == filter_user:
+                    log_writer.write(json.dumps(cluster_json) + '\n')
+            elif users_list:
+                if cluster_json.get('creator_user_name') in users_list:
+                    log_writer.write(json.dumps(cluster_json) + '\n')
+            else:
+                log_writer.write(json.dumps(cluster_json) + '\n')
+            checkpoint_cluster_set.write(cluster_id)
 
-    def log_cluster_policies(self, log_file='cluster_policies.log', acl_log_file='acl_cluster_policies.log'):
+        # filter on these items as MVP of the cluster configs
+        # https://docs.databricks.com/api/latest/clusters.html#request-structure
+        file_mode = 'a' if resume else 'w'
+        log_writer = ThreadSafeWriter(cluster_log, file_mode)
+        acl_log_writer = ThreadSafeWriter(acl_cluster_log, file_mode)
+        try:
+            with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+                futures = [executor.submit(_log_cluster_helper, cluster_json, log_writer, acl_log_writer)
+                           for cluster_json in cluster_list
+                           if not checkpoint_cluster_set.contains(cluster_json['cluster_id'])]
+                concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                propagate_exceptions(futures)
+        finally:
+            log_writer.close()
+            acl_log_writer.close()
+
+    def log_cluster_policies(self, log_file='cluster_policies.log', acl_log_file='acl_cluster_policies.log',
+                             num_parallel=4):
         policies_log = self.get_export_dir() + log_file
         acl_policies_log = self.get_export_dir() + acl_log_file
         # log all cluster policy definitions
@@ -611,32 +728,43 @@ class ClustersClient(dbclient):
                 policy_ids[x.get('policy_id')] = x.get('name')
                 fp.write(json.dumps(x) + '\n')
 
-        # get users list based on groups_to_keep
-        users_list = []
-        if self.groups_to_keep is not None:
-            all_users = self.get('/preview/scim/v2/Users').get('Resources', None)
-            users_list = list(set([user.get("emails")[0].get("value") for user in all_users
-                                   for group in user.get("groups") if
-                                   group.get("display") in self.groups_to_keep]))
+        # get users and groups to keep based on groups_to_keep, including nested memberships
+        users_list, groups_list = self.get_principals_to_keep()
+
+        # the policy definitions are logged from one listing, the ACLs of a previous export are resumed
+        resume = self._checkpoint_service.checkpoint_enabled and \
+            self._checkpoint_service.checkpoint_file_exists(wmconstants.WM_EXPORT, wmconstants.CLUSTER_POLICY_OBJECT)
+        checkpoint_policy_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_EXPORT, wmconstants.CLUSTER_POLICY_OBJECT)
+
+        def _log_policy_acl_helper(pid, acl_writer):
+            api = f'/preview/permissions/cluster-policies/{pid}'
+            perms = self.get(api)
+            perms['name'] = policy_ids[pid]
+
+            # remove any ACLs that involve users/groups that have been filtered
+            if users_list:
+                acls = [acl for acl in perms.get("access_control_list") if
+                        (acl.get("group_name", "") in groups_list) or
+                        (acl.get("user_name", "") in users_list) or
+                        (acl.get("group_name", "") == "users")]
+                if acls:
+                    perms["access_control_list"] = acls
+                    acl_writer.write(json.dumps(perms) + '\n')
+            else:
+                acl_writer.write(json.dumps(perms) + '\n')
+            checkpoint_policy_set.write(pid)
 
         # log cluster policy ACLs, which takes a policy id as arguments
-        with open(acl_policies_log, 'w') as acl_fp:
-            for pid in policy_ids:
-                api = f'/preview/permissions/cluster-policies/{pid}'
-                perms = self.get(api)
-                perms['name'] = policy_ids[pid]
-
-                # remove any ACLs that involve users/groups that have been filtered
-                if users_list:
-                    acls = [acl for acl in perms.get("access_control_list") if
-                            (acl.get("group_name", "") in self.groups_to_keep) or
-                            (acl.get("user_name", "") in users_list) or
-                            (acl.get("group_name", "" == "users"))]
-                    if acls:
-                        perms["access_control_list"] = acls
-                        acl_fp.write(json.dumps(perms) + '\n')
-                else:
-                    acl_fp.write(json.dumps(perms) + '\n')
+        acl_writer = ThreadSafeWriter(acl_policies_log, 'a' if resume else 'w')
+        try:
+            with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+                futures = [executor.submit(_log_policy_acl_helper, pid, acl_writer) for pid in policy_ids
+                           if not checkpoint_policy_set.contains(pid)]
+                concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                propagate_exceptions(futures)
+        finally:
+            acl_writer.close()
 
     def log_instance_pools(self, log_file='instance_pools.log'):
         pool_log = self.get_export_dir() + log_file
@@ -687,11 +815,73 @@ class ClustersClient(dbclient):
                     clean_cluster_list.append(cluster)
         return clean_cluster_list
 
+    def prewarm_cluster(self, cluster_name=None, iam_role=None, enable_table_acls=False):
+        """
+        Start a cluster in the background, so that API only work can run while it starts.
+        launch_cluster and start_cluster_by_name of any client of the same workspace wait for the prewarmed cluster
+        instead of starting it again.
+        :param cluster_name: existing cluster to start, otherwise the migration cluster is launched
+        :return: future that resolves to the id of the running cluster
+        """
+        if cluster_name:
+            start_fn = functools.partial(self._start_cluster_by_name, cluster_name)
+        else:
+            cluster_json = self.get_migration_cluster_json(iam_role, enable_table_acls)
+            cluster_name = cluster_json['cluster_name']
+            start_fn = functools.partial(self._launch_cluster, cluster_json)
+        key = (self.get_url(), cluster_name)
+        with _prewarmed_clusters_lock:
+            if key not in _prewarmed_clusters:
+                logging.info(f"Prewarming cluster {cluster_name}")
+                future = concurrent.futures.Future()
+
+                def _start_cluster():
+                    try:
+                        future.set_result(start_fn())
+                    except Exception as e:
+                        future.set_exception(e)
+                # a daemon thread does not keep a failed pipeline from exiting while the cluster starts
+                threading.Thread(target=_start_cluster, name=f'prewarm-{cluster_name}', daemon=True).start()
+                _prewarmed_clusters[key] = future
+            return _prewarmed_clusters[key]
+
+    def _get_prewarmed_cluster(self, cluster_name):
+        """
+        Wait for the cluster if it was prewarmed.
+        :return: cluster id if the prewarmed cluster is running, None if it was not prewarmed or has stopped since
+        """
+        with _prewarmed_clusters_lock:
+            future = _prewarmed_clusters.get((self.get_url(), cluster_name), None)
+        if future is None:
+            return None
+        try:
+            cid = future.result()
+        except Exception as e:
+            logging.info(f"Prewarming cluster {cluster_name} failed, starting it again: {e}")
+            return None
+        # the cluster may have been terminated since, e.g. by auto termination
+        if self.get('/clusters/get', {'cluster_id': cid}).get('state', None) != 'RUNNING':
+            return None
+        return cid
+
     def start_cluster_by_name(self, cluster_name):
-        cid = self.get_cluster_id_by_name(cluster_name)
-        if cid is None:
+        prewarmed_cid = self._get_prewarmed_cluster(cluster_name)
+        if prewarmed_cid:
+            return prewarmed_cid
+        return self._start_cluster_by_name(cluster_name)
+
+    def _start_cluster_by_name(self, cluster_name):
+        cluster = self.get_cluster_by_name(cluster_name)
+        if cluster is None:
             raise Exception('Error: Cluster name does not exist')
-        print("Starting {0} with id {1}".format(cluster_name, cid))
+        return self._start_cluster(cluster)
+
+    def _start_cluster(self, cluster):
+        """ Starts the cluster listed by get_cluster_by_name, and waits until it is running """
+        cid = cluster['cluster_id']
+        if cluster.get('state', None) == 'RUNNING':
+            return cid
+        print("Starting {0} with id {1}".format(cluster['cluster_name'], cid))
         resp = self.post('/clusters/start', {'cluster_id': cid})
         if 'error_code' in resp:
             if resp.get('error_code', None) == 'INVALID_STATE':
@@ -702,51 +892,58 @@ class ClustersClient(dbclient):
         self.wait_for_cluster(cid)
         return cid
 
+    def submit_command_async(self, cid, ec_id, cmd):
+        """ Launches the spark command and returns a future of its results, polled by the command multiplexer """
+        return get_command_multiplexer(self).submit(cid, ec_id, cmd)
+
     def submit_command(self, cid, ec_id, cmd):
         # This launches spark commands and print the results. We can pull out the text results from the API
-        command_payload = {'language': 'python',
-                           'contextId': ec_id,
-                           'clusterId': cid,
-                           'command': cmd}
-        command = self.post('/commands/execute',
-                            json_params=command_payload,
-                            version="1.2")
-
-        com_id = command.get('id', None)
-        if not com_id:
-            logging.error(command)
-        # print('command_id : ' + com_id)
-        result_payload = {'clusterId': cid, 'contextId': ec_id, 'commandId': com_id}
-
-        resp = self.get('/commands/status', json_params=result_payload, version="1.2")
-        is_running = self.get_key(resp, 'status')
-
-        # loop through the status api to check for the 'running' state call and sleep 1 second
-        while (is_running == "Running") or (is_running == 'Queued'):
-            resp = self.get('/commands/status', json_params=result_payload, version="1.2")
-            is_running = self.get_key(resp, 'status')
-            time.sleep(1)
-        end_result_status = self.get_key(resp, 'status')
-        end_results = self.get_key(resp, 'results')
-        if end_results.get('resultType', None) == 'error':
-            logging.error(end_results.get('summary', None))
-        return end_results
+        return self.submit_command_async(cid, ec_id, cmd).result()
+
+    def get_remote_result(self, cid, ec_id, expression, error_logger=None):
+        """
+        Evaluates the python expression in the execution context and downloads its value through dbfs, which is not
+        bound by the output size limit of commands.
+        :return: value of the expression, which must be json serializable
+        """
+        return get_remote_result_transport(self, self._num_parallel).get(cid, ec_id, expression, error_logger)
+
+    def submit_pooled_command(self, cid, cmd):
+        """
+        Launches a self-contained spark command on an execution context of the pool, for the exclusive use of the
+        command until it finished. Blocks while all contexts of the pool are busy.
+        :return: future of the results of the command
+        """
+        pool = self.get_execution_context_pool(cid)
+        ec_id = pool.acquire()
+        try:
+            future = self.submit_command_async(cid, ec_id, cmd)
+        except Exception:
+            pool.release(ec_id)
+            raise
+        future.add_done_callback(lambda f: pool.release(ec_id))
+        return future
 
     def wait_for_cluster(self, cid):
-        c_state = self.get('/clusters/get', {'cluster_id': cid})
-        while c_state['state'] != 'RUNNING' and c_state['state'] != 'TERMINATED':
+        """ Waits until the cluster is running, with backoff between the polls of its state """
+        def _get_state():
             c_state = self.get('/clusters/get', {'cluster_id': cid})
-            print('Cluster state: {0}'.format(c_state['state']))
-            time.sleep(2)
-        if c_state['state'] == 'TERMINATED':
+            print('Cluster state: {0} {1}'.format(cid, c_state['state']))
+            return c_state['state']
+
+        poller = Poller(initial_interval=self.CLUSTER_POLLING_INTERVAL_SECONDS,
+                        max_interval=self.CLUSTER_MAX_POLLING_INTERVAL_SECONDS,
+                        timeout=self.CLUSTER_WAIT_TIMEOUT_SECONDS)
+        state = poller.wait(_get_state, lambda state: state in ('RUNNING', 'TERMINATED'), f'cluster {cid}')
+        if state == 'TERMINATED':
             raise RuntimeError("Cluster is terminated. Please check EVENT history for details")
         return cid
 
     @cached_property
     def service_principal_app_id_mapping(self):
-        return ScimClient.get_service_principal_app_id_mapping(self.get_export_dir())
+        return get_identity_directory(self).service_principal_app_ids()
 
     def build_acl_args(self, full_acl_list, error_logger, is_jobs=False):
         full_acl_list = ScimClient.map_service_principals_in_acl(full_acl_list, self.service_principal_app_id_mapping, error_logger)
-        super().build_acl_args(full_acl_list, is_jobs)
+        return super().build_acl_args(full_acl_list, is_jobs)
 
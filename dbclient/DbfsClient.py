@@ -1,4 +1,3 @@
-import ast
 import json
 import os
 import time
@@ -27,28 +26,17 @@ class DbfsClient(ClustersClient):
         cid = self.launch_cluster()
         end = timer()
         print("Cluster creation time: " + str(timedelta(seconds=end - start)))
-        time.sleep(5)
         ec_id = self.get_execution_context(cid)
 
         # get all dbfs mount metadata
         dbfs_mount_logfile = self.get_export_dir() + 'dbfs_mounts.log'
-        all_mounts_cmd = 'all_mounts = [{"path": x.mountPoint, "source": x.source, ' \
-                                        '"encryptionType": x.encryptionType} for x in dbutils.fs.mounts()]'
-        results = self.submit_command(cid, ec_id, all_mounts_cmd)
-        results = self.submit_command(cid, ec_id, 'print(len(all_mounts))')
-        # grab the number of mounts to bucket / batch the export
-        num_of_mounts = ast.literal_eval(results['data'])
-
-        batch_size = 100    # batch size to iterate over databases
-        num_of_buckets = (num_of_mounts // batch_size) + 1     # number of slices of the list to take
+        all_mounts_expr = '[{"path": x.mountPoint, "source": x.source, ' \
+                          '"encryptionType": x.encryptionType} for x in dbutils.fs.mounts()]'
+        all_mounts = self.get_remote_result(cid, ec_id, all_mounts_expr)
 
         with open(dbfs_mount_logfile, 'w') as fp_log:
-            for m in range(0, num_of_buckets):
-                mounts_slice = 'print(all_mounts[{0}:{1}])'.format(batch_size*m, batch_size*(m+1))
-                results = self.submit_command(cid, ec_id, mounts_slice)
-                mounts_slice_data = ast.literal_eval(results['data'])
-                for mount_path in mounts_slice_data:
-                    print("Mounts: {0}".format(mount_path))
-                    fp_log.write(json.dumps(mount_path))
-                    fp_log.write('\n')
+            for mount_path in all_mounts:
+                print("Mounts: {0}".format(mount_path))
+                fp_log.write(json.dumps(mount_path))
+                fp_log.write('\n')
         return True
@@ -241,7 +241,6 @@ class HiveClient(ClustersClient):
             cid = self.launch_cluster(current_iam)
         end = timer()
         logging.info("Cluster creation time: " + str(timedelta(seconds=end - start)))
-        time.sleep(5)
         ec_id = self.get_execution_context(cid)
         checkpoint_metastore_set = self._checkpoint_service.get_checkpoint_key_set(
             wmconstants.WM_EXPORT, wmconstants.METASTORE_TABLES)
@@ -282,7 +281,6 @@ class HiveClient(ClustersClient):
             cid = self.launch_cluster()
         end = timer()
         logging.info("Cluster creation time: " + str(timedelta(seconds=end - start)))
-        time.sleep(5)
         ec_id = self.get_execution_context(cid)
         # if metastore failed log path exists, cleanup before re-running
         success_metastore_log_path = self.get_export_dir() + success_log
@@ -425,59 +423,40 @@ class HiveClient(ClustersClient):
             self.repair_legacy_tables(cluster_name)
 
     def get_all_databases(self, error_logger, cid, ec_id):
-        # submit first command to find number of databases
         # DBR 7.0 changes databaseName to namespace for the return value of show databases
-        all_dbs_cmd = 'all_dbs = [x.databaseName for x in spark.sql("show databases").collect()]; print(len(all_dbs))'
-        results = self.submit_command(cid, ec_id, all_dbs_cmd)
-        if logging_utils.log_response_error(error_logger, results):
-            raise ValueError("Cannot identify number of databases due to the above error")
-        num_of_dbs = ast.literal_eval(results['data'])
-        batch_size = 100    # batch size to iterate over databases
-        num_of_buckets = (num_of_dbs // batch_size) + 1     # number of slices of the list to take
-
-        all_dbs = []
-        for m in range(0, num_of_buckets):
-            db_slice = 'print(all_dbs[{0}:{1}])'.format(batch_size*m, batch_size*(m+1))
-            results = self.submit_command(cid, ec_id, db_slice)
-            db_names = ast.literal_eval(results['data'])
-            for db in db_names:
-                all_dbs.append(db)
-                logging.info("Database: {0}".format(db))
+        all_dbs_expr = '[x.databaseName for x in spark.sql("show databases").collect()]'
+        try:
+            all_dbs = self.get_remote_result(cid, ec_id, all_dbs_expr, error_logger)
+        except ValueError:
+            raise ValueError("Cannot identify the databases due to the above error")
+        for db in all_dbs:
+            logging.info("Database: {0}".format(db))
         return all_dbs
 
     def log_all_tables(self, db_name, cid, ec_id, metastore_dir, error_logger, success_log_path, iam,
                        checkpoint_metastore_set, has_unicode=False):
         logging.info(f"Fetching tables from database: {db_name}")
-        all_tables_cmd = 'all_tables = [x.tableName for x in spark.sql("show tables in {0}").collect()]'.format(db_name)
-        results = self.submit_command(cid, ec_id, all_tables_cmd)
-        results = self.submit_command(cid, ec_id, 'print(len(all_tables))')
-        num_of_tables = ast.literal_eval(results['data'])
-
-        batch_size = 100    # batch size to iterate over databases
-        num_of_buckets = (num_of_tables // batch_size) + 1     # number of slices of the list to take
+        all_tables_expr = '[x.tableName for x in spark.sql("show tables in {0}").collect()]'.format(db_name)
+        table_names = self.get_remote_result(cid, ec_id, all_tables_expr, error_logger)
 
         with open(success_log_path, 'a') as sfp:
-            for m in range(0, num_of_buckets):
-                tables_slice = 'print(all_tables[{0}:{1}])'.format(batch_size*m, batch_size*(m+1))
-                results = self.submit_command(cid, ec_id, tables_slice)
-                table_names = ast.literal_eval(results['data'])
-                for table_name in table_names:
-                    full_table_name = f'{db_name}.{table_name}'
-                    if checkpoint_metastore_set.contains(full_table_name):
-                        is_successful = True
-                    else:
-                        is_successful = self.log_table_ddl(cid, ec_id, db_name, table_name, metastore_dir,
-                                                           error_logger, has_unicode)
-                        logging.info(f"Exported {full_table_name}")
-
-                    if is_successful:
-                        success_item = {'table': full_table_name, 'iam': iam}
-                        sfp.write(json.dumps(success_item))
-                        sfp.write('\n')
-                        self._persist_to_disk(sfp)
-                        checkpoint_metastore_set.write(full_table_name)
-                    else:
-                        logging.info("Logging failure")
+            for table_name in table_names:
+                full_table_name = f'{db_name}.{table_name}'
+                if checkpoint_metastore_set.contains(full_table_name):
+                    is_successful = True
+                else:
+                    is_successful = self.log_table_ddl(cid, ec_id, db_name, table_name, metastore_dir,
+                                                       error_logger, has_unicode)
+                    logging.info(f"Exported {full_table_name}")
+
+                if is_successful:
+                    success_item = {'table': full_table_name, 'iam': iam}
+                    sfp.write(json.dumps(success_item))
+                    sfp.write('\n')
+                    self._persist_to_disk(sfp)
+                    checkpoint_metastore_set.write(full_table_name)
+                else:
+                    logging.info("Logging failure")
         return True
 
     def log_table_ddl(self, cid, ec_id, db_name, table_name, metastore_dir, error_logger, has_unicode):
@@ -622,10 +601,14 @@ class HiveClient(ClustersClient):
             logging.info("No tables to repair")
             return
         with open(repair_table_list, 'r') as fp, open(failed_repair_table_log, 'w') as failed_log_p:
+            # tables are repaired concurrently on the execution context pool
+            repair_futures = []
             for line in fp:
                 fqdn_table = line.strip()
                 repair_cmd = f"""spark.sql("MSCK REPAIR TABLE {fqdn_table}")"""
-                resp = self.submit_command(cid, ec_id, repair_cmd)
+                repair_futures.append((fqdn_table, self.submit_pooled_command(cid, repair_cmd)))
+            for fqdn_table, future in repair_futures:
+                resp = future.result()
                 if resp.get('resultType', None) == 'error':
                     failed_repairs += 1
                     logging.info(f'Table failed repair: {fqdn_table}')
@@ -642,14 +625,12 @@ class HiveClient(ClustersClient):
                     return True
         return False
 
-    # We need to wait for the cluster to be ready to get the execution context, otherwise the API will fail.
-    # Once the cluster is available via the clusters api, we still need to wait a few seconds for the driver to come online.
+    # The execution context pool retries to create a context until the driver of the started cluster is online.
     def get_or_launch_cluster(self, cluster_name=None):
         if cluster_name:
             cid = self.start_cluster_by_name(cluster_name)
         else:
             cid = self.launch_cluster()
-        time.sleep(2)
         ec_id = self.get_execution_context(cid)
         return cid, ec_id
 
@@ -2,11 +2,28 @@ import os
 import logging
 import logging_utils
 from dbclient import *
+import copy
+import threading
 import wmconstants
+import concurrent
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from thread_safe_writer import ThreadSafeWriter
+from threading_utils import propagate_exceptions
+from functools import cached_property
+from group_membership import get_group_membership_index
+from id_translation import get_id_translation_cache
 
 class JobsClient(ClustersClient):
+    jobs_page_size = 25  # max limit supported by the API
 
-    def get_jobs_default_cluster_conf(self):
+    def __init__(self, configs, checkpoint_service):
+        super().__init__(configs, checkpoint_service)
+        self._jobs_list = None
+        self._jobs_list_lock = threading.Lock()
+
+    @cached_property
+    def _jobs_default_cluster_conf(self):
         if self.is_aws():
             cluster_json_file = 'data/default_jobs_cluster_aws.json'
         elif self.is_azure():
@@ -17,57 +34,77 @@ class JobsClient(ClustersClient):
             cluster_json = json.loads(fp.read())
             return cluster_json
 
+    def get_jobs_default_cluster_conf(self):
+        # callers modify the returned conf, e.g. when adjusting pool ids
+        return copy.deepcopy(self._jobs_default_cluster_conf)
+
+    def iter_jobs(self, print_json=False, num_parallel=None):
+        """
+        Iterate over all jobs, SINGLE_TASK jobs in their API 2.0 format and MULTI_TASK jobs with their task definitions.
+        All jobs are listed once with API 2.0, whose 'format' field tells SINGLE_TASK and MULTI_TASK jobs apart but
+        which returns MULTI_TASK jobs without their 'tasks'. They are then listed with API 2.1, which returns the
+        'tasks' field but reports every job as MULTI_TASK, and only "real" MULTI_TASK jobs are replaced by their 2.1
+        definition. The 2.1 pages are requested by offset from num_parallel threads, at most 2 * num_parallel pages
+        ahead of the consumer, and yielded in order until a page reports no more jobs.
+        :return: generator of job json objects
+        """
+        num_parallel = num_parallel if num_parallel else self._num_parallel
+        jobs_v20 = self.get('/jobs/list', version='2.0', print_json=print_json)
+        if logging_utils.check_error(jobs_v20):
+            raise Exception(f"Error: jobs listing failed\n{jobs_v20}")
+        jobs_by_id = {job.get('job_id'): job for job in jobs_v20.get('jobs', [])}
+
+        def _get_page(offset):
+            page = self.get('/jobs/list', {'expand_tasks': 'true', 'offset': offset, 'limit': self.jobs_page_size},
+                            version='2.1', print_json=print_json)
+            if logging_utils.check_error(page):
+                raise Exception(f"Error: jobs listing failed at offset {offset}\n{page}")
+            return page
+
+        with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            pending_pages = deque()
+            next_offset = 0
+            has_more = True
+            while has_more:
+                while len(pending_pages) < 2 * num_parallel:
+                    pending_pages.append(executor.submit(_get_page, next_offset))
+                    next_offset += self.jobs_page_size
+                page = pending_pages.popleft().result()
+                for job in page.get('jobs', []):
+                    job_v20 = jobs_by_id.pop(job.get('job_id'), None)
+                    # jobs created since the 2.0 listing are only known in the 2.1 format
+                    if job_v20 is None or job_v20['settings'].get('format') == 'MULTI_TASK':
+                        yield job
+                    else:
+                        yield job_v20
+                has_more = page.get('has_more', False)
+            # pages requested past the last one are empty
+            for future in pending_pages:
+                future.cancel()
+        # jobs that are missing in the 2.1 listing are still returned in the 2.0 format
+        yield from jobs_by_id.values()
+
     def get_jobs_list(self, print_json=False):
-        """ 
-        Returns an array of json objects for jobs. It might contain jobs in SINGLE_TASK and 
-        MULTI_TASK format. 
         """
-        jobsById = {}
-        # fetch all jobs using API 2.0. The 'format' field of each job can either be SINGLE_TASK 
-        # or MULTI_TASK. MULTI_TASK jobs, however, are returned without task definitions (the 
-        # 'tasks' field) on API 2.0.
-        res = self.get("/jobs/list", print_json, version='2.0')
-        for job in res.get('jobs', []):
-            jobsById[job.get('job_id')] = job
-
-        limit = 25 # max limit supported by the API
-        offset = 0
-        has_more = True
-        # fetch all jobs again, this time using API 2.1, in order to get MULTI_TASK jobs with 
-        # task definitions. Note that the 'format' field will be set as MULTI_TASK for all jobs 
-        # and the 'tasks' field will be present for all jobs as well
-        while has_more:
-            res = self.get(f'/jobs/list?expand_tasks=true&offset={offset}&limit={limit}', print_json, version='2.1')
-            offset += limit
-            has_more = res.get('has_more')
-            for job in res.get('jobs', []):
-                jobId = job.get('job_id')
-                # only replaces "real" MULTI_TASK jobs, as they contain the task definitions.
-                if jobsById[jobId]['settings'].get('format') == 'MULTI_TASK':
-                    jobsById[jobId] = job
-        return jobsById.values()
-
-    def get_job_id_by_name(self):
+        Returns a list of json objects for jobs in SINGLE_TASK and MULTI_TASK format, listed once with iter_jobs and
+        cached for this client.
+        Call invalidate_jobs_list after jobs were created, updated or deleted.
         """
-        get a dict mapping of job name to job id for the new job ids
-        :return:
+        with self._jobs_list_lock:
+            if self._jobs_list is None:
+                self._jobs_list = list(self.iter_jobs(print_json))
+            return self._jobs_list
+
+    def invalidate_jobs_list(self):
+        with self._jobs_list_lock:
+            self._jobs_list = None
+
+    def update_imported_job_names(self, error_logger, checkpoint_job_configs_set, imported_job_names, num_parallel=4):
         """
-        jobs = self.get_jobs_list()
-        job_ids = {}
-        for job in jobs:
-            job_ids[job['settings']['name']] = job['job_id']
-        return job_ids
-
-    def update_imported_job_names(self, error_logger, checkpoint_job_configs_set):
-        # loop through and update the job names to remove the custom delimiter + job_id suffix
-        current_jobs_list = self.get_jobs_list()
-        for job in current_jobs_list:
-            job_id = job['job_id']
-            job_name = job['settings']['name']
-            # job name was set to `old_job_name:::{job_id}` to support duplicate job names
-            # we need to parse the old job name and update the current jobs
-            if checkpoint_job_configs_set.contains(job_name):
-                continue
+        Remove the custom delimiter + job_id suffix from the names of the imported jobs
+        :param imported_job_names: dict of new job id -> job name set on import, i.e. `old_job_name:::{job_id}`
+        """
+        def _update_job_name_helper(job_id, job_name):
             old_job_name = job_name.split(':::')[0]
             new_settings = {'name': old_job_name}
             update_args = {'job_id': job_id, 'new_settings': new_settings}
@@ -78,13 +115,24 @@ class JobsClient(ClustersClient):
             else:
                 raise RuntimeError("Import job has failed. Refer to the previous log messages to investigate.")
 
-    def log_job_configs(self, users_list=None, groups_list = None, log_file='jobs.log', acl_file='acl_jobs.log'):
+        with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            # job name was set to `old_job_name:::{job_id}` to support duplicate job names
+            # jobs that were renamed by a previous run are checkpointed by that name
+            futures = [executor.submit(_update_job_name_helper, job_id, job_name)
+                       for job_id, job_name in imported_job_names.items()
+                       if ':::' in job_name and not checkpoint_job_configs_set.contains(job_name)]
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures)
+
+    def log_job_configs(self, users_list=None, groups_list = None, log_file='jobs.log', acl_file='acl_jobs.log',
+                        num_parallel=4):
         """
         log all job configs and the ACLs for each job
         :param users_list: a list of users / emails to filter the results upon (optional for group exports)
         :param groups_list: a list of groups to filter the results upon (resolves to users)
         :param log_file: log file to store job configs as json entries per line
         :param acl_file: log file to store job ACLs
+        :param num_parallel: number of threads to fetch the job ACLs with
         :return:
         """
         if users_list is None:
@@ -92,37 +140,116 @@ class JobsClient(ClustersClient):
 
         # if groups_to_keep is provided, get users_list based on groups_list
         if groups_list is not None:
-            all_users = self.get('/preview/scim/v2/Users').get('Resources', None)
-            users_list = list(set([user.get("emails")[0].get("value") for user in all_users
-                                   for group in user.get("groups") if group.get("display") in groups_list]))
+            users_list = get_group_membership_index(self).users_in_groups(groups_list)
 
         jobs_log = self.get_export_dir() + log_file
         acl_jobs_log = self.get_export_dir() + acl_file
         error_logger = logging_utils.get_error_logger(wmconstants.WM_EXPORT, wmconstants.JOB_OBJECT, self.get_export_dir())
+        # resume the logs of a previous export if its checkpoint exists, otherwise start over
+        resume = self._checkpoint_service.checkpoint_enabled and \
+            self._checkpoint_service.checkpoint_file_exists(wmconstants.WM_EXPORT, wmconstants.JOB_OBJECT)
+        checkpoint_job_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_EXPORT, wmconstants.JOB_OBJECT)
         # pinned by cluster_user is a flag per cluster
-        jl_full = self.get_jobs_list(False)
+        jl_full = self.iter_jobs()
         if users_list:
             # filter the jobs list to only contain users that exist within this list
-            jl = list(filter(lambda x: x.get('creator_user_name', '') in users_list, jl_full))
+            jl = filter(lambda x: x.get('creator_user_name', '') in users_list, jl_full)
         else:
             jl = jl_full
-        with open(jobs_log, "w") as log_fp, open(acl_jobs_log, 'w') as acl_fp:
-            for x in jl:
-                job_id = x['job_id']
-                new_job_name = x['settings']['name'] + ':::' + str(job_id)
-                # grab the settings obj
-                job_settings = x['settings']
-                # update the job name
-                job_settings['name'] = new_job_name
-                # reset the original struct with the new settings
-                x['settings'] = job_settings
-                log_fp.write(json.dumps(x) + '\n')
-                job_perms = self.get(f'/preview/permissions/jobs/{job_id}')
-                if not logging_utils.log_response_error(error_logger, job_perms):
-                    job_perms['job_name'] = new_job_name
-                    acl_fp.write(json.dumps(job_perms) + '\n')
-
-    def import_job_configs(self, log_file='jobs.log', acl_file='acl_jobs.log', job_map_file='job_id_map.log'):
+
+        def _log_job_helper(x, log_writer, acl_writer):
+            job_id = x['job_id']
+            new_job_name = x['settings']['name'] + ':::' + str(job_id)
+            # grab the settings obj
+            job_settings = x['settings']
+            # update the job name
+            job_settings['name'] = new_job_name
+            # reset the original struct with the new settings
+            x['settings'] = job_settings
+            job_perms = self.get(f'/preview/permissions/jobs/{job_id}')
+            log_writer.write(json.dumps(x) + '\n')
+            if not logging_utils.log_response_error(error_logger, job_perms):
+                job_perms['job_name'] = new_job_name
+                acl_writer.write(json.dumps(job_perms) + '\n')
+            checkpoint_job_set.write(str(job_id))
+
+        file_mode = 'a' if resume else 'w'
+        log_writer = ThreadSafeWriter(jobs_log, file_mode)
+        acl_writer = ThreadSafeWriter(acl_jobs_log, file_mode)
+        try:
+            with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+                futures = [executor.submit(_log_job_helper, x, log_writer, acl_writer) for x in jl
+                           if not checkpoint_job_set.contains(str(x['job_id']))]
+                concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                propagate_exceptions(futures)
+        finally:
+            log_writer.close()
+            acl_writer.close()
+
+    def adjust_ids_for_cluster(self, settings, job_creator, cluster_mapping, old_2_new_policy_ids):
+        """
+        The task setting may have existing_cluster_id/new_cluster/job_cluster_key for cluster settings.
+        The job level setting may have existing_cluster_id/new_cluster for cluster settings.
+        Adjust cluster settings for existing_cluster_id and new_cluster scenario.
+        :param settings: job_settings or task_settings
+        """
+        if 'existing_cluster_id' in settings:
+            old_cid = settings['existing_cluster_id']
+            # set new cluster id for existing cluster attribute
+            new_cid = cluster_mapping.get(old_cid, None)
+            if not new_cid:
+                logging.info("Existing cluster has been removed. Resetting job to use new cluster.")
+                settings.pop('existing_cluster_id')
+                settings['new_cluster'] = self.get_jobs_default_cluster_conf()
+            else:
+                settings['existing_cluster_id'] = new_cid
+        elif 'new_cluster' in settings:  # new cluster config
+            cluster_conf = settings['new_cluster']
+            if 'policy_id' in cluster_conf:
+                old_policy_id = cluster_conf['policy_id']
+                cluster_conf['policy_id'] = old_2_new_policy_ids[old_policy_id]
+            # check for instance pools and modify cluster attributes
+            if 'instance_pool_id' in cluster_conf:
+                new_cluster_conf = self.cleanup_cluster_pool_configs(cluster_conf, job_creator, True)
+            else:
+                new_cluster_conf = cluster_conf
+            settings['new_cluster'] = new_cluster_conf
+        return settings
+
+    def adjust_job_settings(self, job_conf, cluster_mapping, old_2_new_policy_ids):
+        """
+        Pause the schedule and map the cluster, policy and pool ids of an exported job to the new workspace
+        :return: the job settings to create / reset the job with
+        """
+        job_creator = job_conf.get('creator_user_name', '')
+        job_settings = job_conf['settings']
+        job_schedule = job_settings.get('schedule', None)
+        if job_schedule:
+            # set all imported jobs as paused
+            job_schedule['pause_status'] = 'PAUSED'
+            job_settings['schedule'] = job_schedule
+        if 'format' not in job_settings or job_settings.get('format') == 'SINGLE_TASK':
+            self.adjust_ids_for_cluster(job_settings, job_creator, cluster_mapping, old_2_new_policy_ids)
+        else:
+            mod_task_settings = []
+            for task_settings in job_settings.get('job_clusters', []):
+                mod_task_settings.append(self.adjust_ids_for_cluster(
+                    task_settings, job_creator, cluster_mapping, old_2_new_policy_ids))
+            if len(mod_task_settings) > 0:
+                job_settings['job_clusters'] = mod_task_settings
+                mod_task_settings = []
+
+            # multi-task jobs may have existing_cluster_id per task
+            for task_settings in job_settings.get('tasks', []):
+                mod_task_settings.append(self.adjust_ids_for_cluster(
+                    task_settings, job_creator, cluster_mapping, old_2_new_policy_ids))
+            if len(mod_task_settings) > 0:
+                job_settings['tasks'] = mod_task_settings
+        return job_settings
+
+    def import_job_configs(self, log_file='jobs.log', acl_file='acl_jobs.log', job_map_file='job_id_map.log',
+                           num_parallel=4):
         jobs_log = self.get_export_dir() + log_file
         acl_jobs_log = self.get_export_dir() + acl_file
         job_map_log = self.get_export_dir() + job_map_file
@@ -133,126 +260,164 @@ class JobsClient(ClustersClient):
             return
         # get an old cluster id to new cluster id mapping object
         cluster_mapping = self.get_cluster_id_mapping()
-        service_principal_app_id_mapping = ScimClient.get_service_principal_app_id_mapping(self.get_export_dir())
         old_2_new_policy_ids = self.get_new_policy_id_dict()  # dict { old_policy_id : new_policy_id }
+        # the job id map of a previous run is kept if the import resumes from its checkpoint
+        resume = self._checkpoint_service.checkpoint_enabled and \
+            self._checkpoint_service.checkpoint_file_exists(wmconstants.WM_IMPORT, wmconstants.JOB_OBJECT)
         checkpoint_job_configs_set = self._checkpoint_service.get_checkpoint_key_set(
             wmconstants.WM_IMPORT, wmconstants.JOB_OBJECT)
 
-        def adjust_ids_for_cluster(settings): #job_settings or task_settings
-            """
-            The task setting may have existing_cluster_id/new_cluster/job_cluster_key for cluster settings.
-            The job level setting may have existing_cluster_id/new_cluster for cluster settings.
-            Adjust cluster settings for existing_cluster_id and new_cluster scenario.
-            """
-            if 'existing_cluster_id' in settings:
-                old_cid = settings['existing_cluster_id']
-                # set new cluster id for existing cluster attribute
-                new_cid = cluster_mapping.get(old_cid, None)
-                if not new_cid:
-                    logging.info("Existing cluster has been removed. Resetting job to use new cluster.")
-                    settings.pop('existing_cluster_id')
-                    settings['new_cluster'] = self.get_jobs_default_cluster_conf()
-                else:
-                    settings['existing_cluster_id'] = new_cid
-            elif 'new_cluster' in settings:  # new cluster config
-                cluster_conf = settings['new_cluster']
-                if 'policy_id' in cluster_conf:
-                    old_policy_id = cluster_conf['policy_id']
-                    cluster_conf['policy_id'] = old_2_new_policy_ids[old_policy_id]
-                # check for instance pools and modify cluster attributes
-                if 'instance_pool_id' in cluster_conf:
-                    new_cluster_conf = self.cleanup_cluster_pool_configs(cluster_conf, job_creator, True)
-                else:
-                    new_cluster_conf = cluster_conf
-                settings['new_cluster'] = new_cluster_conf
-            return settings
+        def _create_job_helper(job_conf, job_map_writer):
+            job_settings = self.adjust_job_settings(job_conf, cluster_mapping, old_2_new_policy_ids)
 
-        with open(jobs_log, 'r') as fp, open(job_map_log, 'w') as jm_fp:
-            for line in fp:
-                job_conf = json.loads(line)
-                # need to do str(...), otherwise the job_id is recognized as integer which becomes
-                # str vs int which never matches.
-                # (in which case, the checkpoint never recognizes that the job_id is already checkpointed)
-                if 'job_id' in job_conf and checkpoint_job_configs_set.contains(str(job_conf['job_id'])):
-                    continue
-                job_creator = job_conf.get('creator_user_name', '')
-                job_settings = job_conf['settings']
-                job_schedule = job_settings.get('schedule', None)
-                if job_schedule:
-                    # set all imported jobs as paused
-                    job_schedule['pause_status'] = 'PAUSED'
-                    job_settings['schedule'] = job_schedule
-                if 'format' not in job_settings or job_settings.get('format') == 'SINGLE_TASK':
-                    adjust_ids_for_cluster(job_settings)
+            logging.info("Current Job Name: {0}".format(job_conf['settings']['name']))
+            # creator can be none if the user is no longer in the org. see our docs page
+            create_resp = self.post('/jobs/create', job_settings)
+            if logging_utils.check_error(create_resp):
+                logging.info("Resetting job to use default cluster configs due to expired configurations.")
+                if job_settings.get("format", "") == "MULTI_TASK":
+
+                    # if an MTJ has a cluster that no longer exists, use the default configuration for all tasks
+                    updated_tasks = []
+                    for task in job_settings.get("tasks"):
+                        if task.get("existing_cluster_id", None):
+                            task.pop("existing_cluster_id")
+                        task["new_cluster"] = self.get_jobs_default_cluster_conf()
+                        updated_tasks.append(task)
+                    job_settings["tasks"] = updated_tasks
                 else:
-                    mod_task_settings = []
-                    for task_settings in job_settings.get('job_clusters', []):
-                        mod_task_settings.append(adjust_ids_for_cluster(task_settings))
-                    if len(mod_task_settings) > 0:
-                        job_settings['job_clusters'] = mod_task_settings
-                        mod_task_settings = []
-
-                    # multi-task jobs may have existing_cluster_id per task
-                    for task_settings in job_settings.get('tasks', []):
-                        mod_task_settings.append(adjust_ids_for_cluster(task_settings))
-                    if len(mod_task_settings) > 0:
-                        job_settings['tasks'] = mod_task_settings
-
-                logging.info("Current Job Name: {0}".format(job_conf['settings']['name']))
-                # creator can be none if the user is no longer in the org. see our docs page
+                    job_settings['new_cluster'] = self.get_jobs_default_cluster_conf()
+
                 create_resp = self.post('/jobs/create', job_settings)
-                if logging_utils.check_error(create_resp):
-                    logging.info("Resetting job to use default cluster configs due to expired configurations.")
-                    if job_settings.get("format", "") == "MULTI_TASK":
-
-                        # if an MTJ has a cluster that no longer exists, use the default configuration for all tasks
-                        updated_tasks = []
-                        for task in job_settings.get("tasks"):
-                            if task.get("existing_cluster_id", None):
-                                task.pop("existing_cluster_id")
-                            task["new_cluster"] = self.get_jobs_default_cluster_conf()
-                            updated_tasks.append(task)
-                        job_settings["tasks"] = updated_tasks
-                    else:
-                        job_settings['new_cluster'] = self.get_jobs_default_cluster_conf()
+                if logging_utils.log_response_error(error_logger, create_resp):
+                    raise RuntimeError("Import job has failed. Refer to the previous log messages to investigate.")
 
-                    create_resp_retry = self.post('/jobs/create', job_settings)
-                    if not logging_utils.log_response_error(error_logger, create_resp_retry):
-                        if 'job_id' in job_conf:
-                            checkpoint_job_configs_set.write(job_conf["job_id"])
-                    else:
-                        raise RuntimeError("Import job has failed. Refer to the previous log messages to investigate.")
+            _job_map = {"old_id": job_conf["job_id"], "new_id": str(create_resp["job_id"])}
+            job_map_writer.write(json.dumps(_job_map) + '\n')
+            id_cache.add_job(job_map_log, _job_map["old_id"], _job_map["new_id"])
+            checkpoint_job_configs_set.write(job_conf["job_id"])
 
-                else:
-                    if 'job_id' in job_conf:
-                        checkpoint_job_configs_set.write(job_conf["job_id"])
-                    _job_map = {"old_id": job_conf["job_id"], "new_id": str(create_resp["job_id"])}
-                    jm_fp.write(json.dumps(_job_map) + '\n')
+        id_cache = get_id_translation_cache(self)
+        if not resume:
+            id_cache.reset_job_ids(job_map_log)
+        # job names carry the `:::{job_id}` suffix of the exported job until they are renamed
+        exported_job_names = {}
+        job_map_writer = ThreadSafeWriter(job_map_log, 'a' if resume else 'w')
+        try:
+            with open(jobs_log, 'r') as fp, ThreadPoolExecutor(max_workers=num_parallel) as executor:
+                futures = []
+                for line in fp:
+                    job_conf = json.loads(line)
+                    exported_job_names[str(job_conf['job_id'])] = job_conf['settings']['name']
+                    # need to do str(...), otherwise the job_id is recognized as integer which becomes
+                    # str vs int which never matches.
+                    # (in which case, the checkpoint never recognizes that the job_id is already checkpointed)
+                    if checkpoint_job_configs_set.contains(str(job_conf['job_id'])):
+                        continue
+                    futures.append(executor.submit(_create_job_helper, job_conf, job_map_writer))
+                concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                propagate_exceptions(futures)
+        finally:
+            job_map_writer.close()
+        self.invalidate_jobs_list()
 
+        # resolve the new job ids from the job id map instead of listing all jobs
+        job_id_map = id_cache.job_ids(job_map_log)
+
+        def _apply_acl_helper(acl_conf):
+            # object_id contains the `/jobs/{job_id}` path of the source workspace
+            old_job_id = acl_conf['object_id'].split('/')[-1]
+            current_job_id = job_id_map.get(old_job_id, None)
+            if not current_job_id:
+                error_logger.error(f'No imported job found to apply ACLs for job id {old_job_id}')
+                return
+            api = f'/preview/permissions/jobs/{current_job_id}'
+            # get acl permissions for jobs
+            acl = acl_conf['access_control_list']
+            # build_acl_args maps service principals to their new ids
+            acl_perms = self.build_acl_args(acl, error_logger, True)
+            acl_create_args = {'access_control_list': acl_perms}
+            acl_resp = self.patch(api, acl_create_args)
+            if not logging_utils.log_response_error(error_logger, acl_resp):
+                checkpoint_job_configs_set.write(acl_conf['object_id'])
+            else:
+                raise RuntimeError("Import job has failed. Refer to the previous log messages to investigate.")
 
         # update the jobs with their ACLs
-        with open(acl_jobs_log, 'r') as acl_fp:
-            job_id_by_name = self.get_job_id_by_name()
+        with open(acl_jobs_log, 'r') as acl_fp, ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            futures = []
             for line in acl_fp:
                 acl_conf = json.loads(line)
-                if 'object_id' in acl_conf and checkpoint_job_configs_set.contains(acl_conf['object_id']):
+                if checkpoint_job_configs_set.contains(acl_conf['object_id']):
                     continue
-                current_job_id = job_id_by_name[acl_conf['job_name']]
-                job_path = f'jobs/{current_job_id}'  # contains `/jobs/{job_id}` path
-                api = f'/preview/permissions/{job_path}'
-                # get acl permissions for jobs
-                acl = acl_conf['access_control_list']
-                # map service principals to their new ids
-                acl = ScimClient.map_service_principals_in_acl(acl, service_principal_app_id_mapping, error_logger)
-                acl_perms = self.build_acl_args(acl, error_logger, True)
-                acl_create_args = {'access_control_list': acl_perms}
-                acl_resp = self.patch(api, acl_create_args)
-                if not logging_utils.log_response_error(error_logger, acl_resp) and 'object_id' in acl_conf:
-                    checkpoint_job_configs_set.write(acl_conf['object_id'])
-                else:
-                    raise RuntimeError("Import job has failed. Refer to the previous log messages to investigate.")
+                futures.append(executor.submit(_apply_acl_helper, acl_conf))
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures)
         # update the imported job names
-        self.update_imported_job_names(error_logger, checkpoint_job_configs_set)
+        imported_job_names = {new_id: exported_job_names[old_id] for old_id, new_id in job_id_map.items()
+                              if old_id in exported_job_names}
+        self.update_imported_job_names(error_logger, checkpoint_job_configs_set, imported_job_names, num_parallel)
+        self.invalidate_jobs_list()
+
+    def update_job_configs(self, log_file='jobs_changed.log', acl_file='acl_jobs_changed.log',
+                           job_map_file='job_id_map_base.log'):
+        """
+        Reset jobs that were imported by a previous session with their latest exported settings and ACLs
+        :param log_file: exported job configs of jobs that already exist in the new workspace
+        :param acl_file: exported ACLs of jobs that already exist in the new workspace
+        :param job_map_file: old to new job id mapping written by the previous import
+        """
+        jobs_log = self.get_export_dir() + log_file
+        acl_jobs_log = self.get_export_dir() + acl_file
+        job_map_log = self.get_export_dir() + job_map_file
+        error_logger = logging_utils.get_error_logger(
+            wmconstants.WM_IMPORT, wmconstants.JOB_OBJECT, self.get_export_dir())
+        if not os.path.exists(job_map_log):
+            logging.info("No job id mapping of a previous import. Skipping job updates.")
+            return
+        # keys are normalized to str since the job id map stores the old ids as int
+        job_id_map = get_id_translation_cache(self).job_ids(job_map_log)
+        checkpoint_job_configs_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_IMPORT, wmconstants.JOB_OBJECT)
+
+        if os.path.exists(jobs_log):
+            cluster_mapping = self.get_cluster_id_mapping()
+            old_2_new_policy_ids = self.get_new_policy_id_dict()
+            with open(jobs_log, 'r') as fp:
+                for line in fp:
+                    job_conf = json.loads(line)
+                    old_job_id = str(job_conf['job_id'])
+                    if checkpoint_job_configs_set.contains(f'reset:{old_job_id}'):
+                        continue
+                    new_job_id = job_id_map.get(old_job_id, None)
+                    if not new_job_id:
+                        error_logger.error(f'No imported job found for job id {old_job_id}: {job_conf["settings"]["name"]}')
+                        continue
+                    job_settings = self.adjust_job_settings(job_conf, cluster_mapping, old_2_new_policy_ids)
+                    # the exported name carries the `:::{job_id}` suffix that is removed after creation
+                    job_settings['name'] = job_settings['name'].split(':::')[0]
+                    logging.info(f"Resetting job {new_job_id}: {job_settings['name']}")
+                    resp = self.post('/jobs/reset', {'job_id': new_job_id, 'new_settings': job_settings})
+                    if not logging_utils.log_response_error(error_logger, resp):
+                        checkpoint_job_configs_set.write(f'reset:{old_job_id}')
+            self.invalidate_jobs_list()
+
+        if os.path.exists(acl_jobs_log):
+            with open(acl_jobs_log, 'r') as acl_fp:
+                for line in acl_fp:
+                    acl_conf = json.loads(line)
+                    # object_id contains the `/jobs/{job_id}` path of the source workspace
+                    old_job_id = acl_conf['object_id'].split('/')[-1]
+                    if checkpoint_job_configs_set.contains(f'reset_acl:{old_job_id}'):
+                        continue
+                    new_job_id = job_id_map.get(old_job_id, None)
+                    if not new_job_id:
+                        error_logger.error(f'No imported job found to apply ACLs for job id {old_job_id}')
+                        continue
+                    acl_perms = self.build_acl_args(acl_conf['access_control_list'], error_logger, True)
+                    acl_resp = self.patch(f'/preview/permissions/jobs/{new_job_id}', {'access_control_list': acl_perms})
+                    if not logging_utils.log_response_error(error_logger, acl_resp):
+                        checkpoint_job_configs_set.write(f'reset_acl:{old_job_id}')
 
     def import_pause_status(self, log_file='jobs.log', job_map_file='job_id_map.log'):
         log_file = self.get_export_dir() + log_file
@@ -296,8 +461,10 @@ class JobsClient(ClustersClient):
                 update_job_conf = {'job_id': job_conf['job_id'],
                                    'new_settings': job_settings}
                 update_job_resp = self.post('/jobs/reset', update_job_conf)
+        self.invalidate_jobs_list()
 
     def delete_all_jobs(self):
         job_list = self.get('/jobs/list').get('jobs', [])
         for job in job_list:
             self.post('/jobs/delete', {'job_id': job['job_id']})
+        self.invalidate_jobs_list()
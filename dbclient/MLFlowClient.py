@@ -11,12 +11,17 @@ from mlflow.entities import ViewType, Metric, Param, RunTag
 from mlflow.exceptions import RestException
 import wmconstants
 from thread_safe_writer import ThreadSafeWriter
+from batched_sqlite_writer import BatchedSqliteWriter
+from artifact_copier import ArtifactCopier
 import concurrent
 from concurrent.futures import ThreadPoolExecutor
 import sqlite3
 from dbclient import *
 
 class MLFlowClient(dbclient):
+    # qmark style to avoid sql injection
+    RUNS_INSERT_SQL = "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)"
+
     def __init__(self, configs, checkpoint_service):
         super().__init__(configs)
         self._checkpoint_service = checkpoint_service
@@ -112,30 +117,41 @@ class MLFlowClient(dbclient):
             wmconstants.WM_EXPORT, wmconstants.MLFLOW_RUNS
         )
         start = timer()
+        error_logger = logging_utils.get_error_logger(
+            wmconstants.WM_EXPORT, wmconstants.MLFLOW_RUN_OBJECT, self.export_dir
+        )
+        start_time_epoch_ms = self._get_start_time_epoch_ms(start_date)
+        runs_writer = self._open_runs_writer(log_sql_file)
+        try:
+            with open(experiments_logfile, 'r') as fp:
+                with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+                    futures = [executor.submit(self._export_runs_in_an_experiment, start_time_epoch_ms, runs_writer, experiment_str, mlflow_runs_checkpointer, error_logger) for experiment_str in fp]
+                    results = concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                    for result in results.done:
+                        if result.exception() is not None:
+                            raise result.exception()
+        finally:
+            runs_writer.close()
+
+        end = timer()
+        logging.info("Complete MLflow Runs Export Time: " + str(timedelta(seconds=end - start)))
+
+    def _open_runs_writer(self, log_sql_file):
         con = sqlite3.connect(self.export_dir + log_sql_file)
         with con:
             con.execute('''
               CREATE TABLE IF NOT EXISTS runs (id TEXT UNIQUE, start_time INT, run_obj TEXT)
             ''')
         con.close()
+        # All runs are inserted by one writer thread, so that the threads searching runs never wait on the database lock
+        return BatchedSqliteWriter(self.export_dir + log_sql_file, self.RUNS_INSERT_SQL)
 
-        error_logger = logging_utils.get_error_logger(
-            wmconstants.WM_EXPORT, wmconstants.MLFLOW_RUN_OBJECT, self.export_dir
-        )
+    @staticmethod
+    def _get_start_time_epoch_ms(start_date):
         start_date = start_date if start_date else datetime.now() - timedelta(days=30)
-        start_time_epoch_ms = start_date.timestamp() * 1000
-        with open(experiments_logfile, 'r') as fp:
-            with ThreadPoolExecutor(max_workers=num_parallel) as executor:
-                futures = [executor.submit(self._export_runs_in_an_experiment, start_time_epoch_ms, log_sql_file, experiment_str, mlflow_runs_checkpointer, error_logger) for experiment_str in fp]
-                results = concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
-                for result in results.done:
-                    if result.exception() is not None:
-                        raise result.exception()
+        return start_date.timestamp() * 1000
 
-        end = timer()
-        logging.info("Complete MLflow Runs Export Time: " + str(timedelta(seconds=end - start)))
-
-    def _export_runs_in_an_experiment(self, start_time_in_ms, log_sql_file, experiment_str, checkpointer, error_logger):
+    def _export_runs_in_an_experiment(self, start_time_in_ms, runs_writer, experiment_str, checkpointer, error_logger):
         experiment_id = json.loads(experiment_str).get('experiment_id')
         logging.info("Working on runs for experiment_id: " + experiment_id)
         # We checkpoint by experiment_id
@@ -155,49 +171,94 @@ class MLFlowClient(dbclient):
                 error_logger.error(error.json)
                 is_there_exception = True
             else:
-                # With multi-threading, we need to give enough timeout for each thread's connection to be made
-                # Upon DatabaseLock timeout exception, one can simply rerun the command since the checkpoint saves the
-                # progress
-                con = sqlite3.connect(self.export_dir + log_sql_file, timeout=180)
-                with con:
-                    for run in runs:
-                        self._save_run_data_to_sql(con, run)
-                con.close()
+                # the next page is searched while the writer thread inserts this one
+                runs_writer.write([self._run_to_sql_row(run) for run in runs])
                 token = runs.token
                 page_continue = token is not None
 
         if not is_there_exception:
-            checkpointer.write(experiment_id)
+            # checkpoint the experiment only once all of its runs are committed
+            runs_writer.on_committed(lambda: checkpointer.write(experiment_id))
 
     @classmethod
-    def _save_run_data_to_sql(cls, con, run):
-        run_id = run.info.run_id
-        start_time = run.info.start_time
+    def _run_to_sql_row(cls, run):
         run_object = {
             "info": dict(run.info),
             "metrics": dict(run.data.metrics),
             "params": dict(run.data.params),
             "tags": dict(run.data.tags)
         }
-        # qmark style to avoid sql injection
-        con.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", (run_id, start_time, json.dumps(run_object)))
+        return run.info.run_id, run.info.start_time, json.dumps(run_object)
 
-    def export_mlflow_experiments(self, log_file='mlflow_experiments.log', log_dir=None):
+    def export_mlflow_experiments(self, log_file='mlflow_experiments.log', log_dir=None, export_acls=False,
+                                  export_runs=False, start_date=None, acl_log_file='mlflow_experiments_acls.log',
+                                  log_sql_file='mlflow_runs.db', num_parallel=4):
+        """
+        Exports the experiments page by page, each page is written to log_file as soon as it is listed.
+        With export_acls and export_runs, the permissions and runs of the listed experiments are exported by
+        num_parallel workers while the next pages are still being listed, the same as export_mlflow_experiments_acls
+        and export_mlflow_runs would do once the experiments are exported.
+        """
         mlflow_experiments_dir = log_dir if log_dir else self.export_dir
         os.makedirs(mlflow_experiments_dir, exist_ok=True)
         start = timer()
-        # We do not do any pagination since ST workspaces do not have that many experiments count.
-        # Max is ~6k experiments for the moment.
-        # Consider using pagination(https://www.mlflow.org/docs/latest/python_api/mlflow.tracking.html) if
-        # a workspace has explosive number of experiments. (e.g. 200K)
-        experiments = self.client.list_experiments(view_type=ViewType.ALL)
         experiments_logfile = mlflow_experiments_dir + log_file
-        with open(experiments_logfile, 'w') as fp:
-            for experiment in experiments:
-               fp.write(json.dumps(dict(experiment)) + '\n')
+        if export_acls:
+            acl_log_file_writer = ThreadSafeWriter(self.export_dir + acl_log_file, 'a')
+            acl_error_logger = logging_utils.get_error_logger(
+                wmconstants.WM_EXPORT, wmconstants.MLFLOW_EXPERIMENT_PERMISSION_OBJECT, self.get_export_dir())
+            acl_checkpoint_key_set = self._checkpoint_service.get_checkpoint_key_set(
+                wmconstants.WM_EXPORT, wmconstants.MLFLOW_EXPERIMENT_PERMISSION_OBJECT)
+        if export_runs:
+            runs_writer = self._open_runs_writer(log_sql_file)
+            runs_error_logger = logging_utils.get_error_logger(
+                wmconstants.WM_EXPORT, wmconstants.MLFLOW_RUN_OBJECT, self.export_dir)
+            runs_checkpointer = self._checkpoint_service.get_checkpoint_key_set(
+                wmconstants.WM_EXPORT, wmconstants.MLFLOW_RUNS)
+            start_time_epoch_ms = self._get_start_time_epoch_ms(start_date)
+        try:
+            with open(experiments_logfile, 'w') as fp:
+                with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+                    futures = set()
+                    for experiments in self._search_experiment_pages():
+                        for experiment in experiments:
+                            experiment_str = json.dumps(dict(experiment))
+                            fp.write(experiment_str + '\n')
+                            # bound the experiments held in memory by queued exports
+                            if len(futures) >= 2 * num_parallel:
+                                done, futures = concurrent.futures.wait(futures, return_when="FIRST_COMPLETED")
+                                propagate_exceptions(done)
+                            if export_acls:
+                                futures.add(executor.submit(self._get_mlflow_experiment_acls, acl_log_file_writer, experiment_str, acl_checkpoint_key_set, acl_error_logger))
+                            if export_runs:
+                                futures.add(executor.submit(self._export_runs_in_an_experiment, start_time_epoch_ms, runs_writer, experiment_str, runs_checkpointer, runs_error_logger))
+                        fp.flush()
+                        # raise the errors of the finished exports early, and keep only the pending ones
+                        done, futures = concurrent.futures.wait(futures, timeout=0)
+                        propagate_exceptions(done)
+                    concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                    propagate_exceptions(futures)
+        finally:
+            if export_acls:
+                acl_log_file_writer.close()
+            if export_runs:
+                runs_writer.close()
         end = timer()
         logging.info("Complete MLflow Experiments Export Time: " + str(timedelta(seconds=end - start)))
 
+    def _search_experiment_pages(self, max_results=1000):
+        """
+        Yields the experiments of all view types, one page at a time.
+        """
+        token = None
+        while True:
+            experiments = self.client.search_experiments(view_type=ViewType.ALL, max_results=max_results, page_token=token)
+            logging.info(f"Listed a page of {len(experiments)} MLflow experiments")
+            yield experiments
+            token = experiments.token
+            if not token:
+                return
+
     def import_mlflow_experiments(self, log_file='mlflow_experiments.log', id_map_file='mlflow_experiments_id_map.log',
                                   log_dir=None, num_parallel=4):
         mlflow_experiments_dir = log_dir if log_dir else self.export_dir
@@ -308,48 +369,86 @@ class MLFlowClient(dbclient):
             wmconstants.WM_IMPORT, wmconstants.MLFLOW_RUN_OBJECT + "_steps"
         )
 
+        artifact_copier = ArtifactCopier(src_client, self.client, self.export_dir + ml_run_artifacts_dir,
+                                         mlflow_runs_steps_checkpointer, num_parallel)
+
         start = timer()
 
         con = sqlite3.connect(mlflow_runs_file)
-        cur = con.execute("SELECT * FROM runs")
-        # TODO(kevin): make this configurable later
-        runs = cur.fetchmany(10000)
-        while(len(runs) > 0):
+        run_levels = self._get_run_levels(con, error_logger)
+        # Runs are imported level by level, so that the parent of every run is imported before the run itself.
+        con.execute("CREATE TEMP TABLE run_levels (id TEXT PRIMARY KEY, level INT)")
+        con.executemany("INSERT INTO run_levels VALUES (?, ?)",
+                        [(run_id, level) for run_id, level in run_levels.items() if level is not None])
+        num_levels = max([level for level in run_levels.values() if level is not None], default=-1) + 1
+        try:
             with ThreadPoolExecutor(max_workers=num_parallel) as executor:
-                # run_id = run[0]
-                # start_time = run[1]
-                # run_obj = json.loads(run[2])
-                futures = [executor.submit(self._create_run_and_log, src_client, mlflow_runs_file, run[0], run[1], json.loads(run[2]), experiment_id_map, self.export_dir + ml_run_artifacts_dir, error_logger, mlflow_runs_checkpointer, mlflow_runs_steps_checkpointer) for run in runs]
-                concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
-                propagate_exceptions(futures)
-
-            runs = cur.fetchmany(10000)
+                for level in range(num_levels):
+                    logging.info(f"Importing runs of level {level} of {num_levels} of the parent run forest")
+                    cur = con.execute("SELECT runs.* FROM runs JOIN run_levels ON runs.id = run_levels.id "
+                                      "WHERE run_levels.level = ?", [level])
+                    futures = set()
+                    # TODO(kevin): make this configurable later
+                    runs = cur.fetchmany(10000)
+                    while len(runs) > 0:
+                        for run in runs:
+                            # bound the runs held in memory by queued tasks, the workers keep running across batches
+                            if len(futures) >= 2 * num_parallel:
+                                done, futures = concurrent.futures.wait(futures, return_when="FIRST_COMPLETED")
+                                propagate_exceptions(done)
+                            # run_id = run[0]
+                            # start_time = run[1]
+                            # run_obj = json.loads(run[2])
+                            futures.add(executor.submit(self._create_run_and_log, run[0], run[1], json.loads(run[2]), experiment_id_map, artifact_copier, error_logger, mlflow_runs_checkpointer, mlflow_runs_steps_checkpointer))
+                        runs = cur.fetchmany(10000)
+                    concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+                    propagate_exceptions(futures)
+        finally:
+            artifact_copier.close()
         shutil.copy(mlflow_runs_checkpointer.get_file_path(), self.export_dir + run_id_map_log)
         con.close()
         end = timer()
         logging.info("Complete MLflow Runs Import Time: " + str(timedelta(end - start)))
 
-    def _create_run_and_log(self, src_client, mlflow_runs_file, run_id, start_time, run_obj, experiment_id_map, ml_run_artifacts_dir, error_logger, checkpointer, steps_checkpointer):
-        if checkpointer.check_contains_otherwise_mark_in_use(run_id):
-            return checkpointer.get(run_id)
-        try:
-            self._create_run_and_log_after_checkpointer(src_client, mlflow_runs_file, run_id, start_time, run_obj, experiment_id_map, ml_run_artifacts_dir, error_logger, checkpointer, steps_checkpointer)
-        # Upon failure, always release the lock on the run_id key in checkpointer to avoid blocking other threads.
-        except RestException as error:
-            logging.error(f"Importing runs failed for run_id: {run_id}. Logging it to the error file...")
-            error_logger.error(error.json)
-            checkpointer.remove(run_id)
-            return None
-        except Exception as error:
-            checkpointer.remove(run_id)
-            raise error
-
-    def _create_run_and_log_after_checkpointer(self, src_client, mlflow_runs_file, run_id, start_time, run_obj, experiment_id_map, ml_run_artifacts_dir, error_logger, checkpointer, steps_checkpointer):
+    @staticmethod
+    def _get_run_levels(con, error_logger):
+        """
+        Reads the parent of every run in runs.db once and resolves the forest of parent and child runs.
+        :return: dict of run_id -> level in the forest, 0 for runs without a parent. The level is None for runs whose
+        parent is missing from runs.db or that are in a cycle; they are logged to the error file.
         """
-        If "mlflow.parentRunId" does not exist in tags, create the run and then log metrics, params, and tags
-        If exists in tags, recursively call _create_run on the parent run object.
+        parents = dict(con.execute("""SELECT id, json_extract(run_obj, '$.tags."mlflow.parentRunId"') FROM runs"""))
+        levels = {}
+        for run_id in parents:
+            # walk up to the first run with a known level, or the root
+            chain = []
+            current = run_id
+            while True:
+                if current in levels:
+                    level = levels[current]
+                    break
+                if current not in parents or current in chain:
+                    level = None
+                    break
+                chain.append(current)
+                if parents[current] is None:
+                    level = -1
+                    break
+                current = parents[current]
+            for i, chain_run_id in enumerate(reversed(chain)):
+                levels[chain_run_id] = None if level is None else level + 1 + i
+                if level is None:
+                    error_logger.error(f"Run: {chain_run_id} failed to be imported as its parent run "
+                                       f"{parents[chain_run_id]} is missing from the exported runs or in a cycle.")
+        return levels
+
+    def _create_run_and_log(self, run_id, start_time, run_obj, experiment_id_map, artifact_copier, error_logger, checkpointer, steps_checkpointer):
+        """
+        Create the run and then log metrics, params, and tags. The parent run, if any, must be imported already.
         :return: id of the newly imported run
         """
+        if checkpointer.contains(run_id):
+            return checkpointer.get(run_id)
         experiment_id = run_obj['info']['experiment_id']
         if experiment_id not in experiment_id_map:
             message = (f"Run: {run_id} originally belongs to experiment_id {experiment_id}, but {experiment_id} "
@@ -364,30 +463,24 @@ class MLFlowClient(dbclient):
         params = run_obj['params']
         if "mlflow.parentRunId" in tags:
             parent_run_id = tags["mlflow.parentRunId"]
-            con = sqlite3.connect(mlflow_runs_file)
-            cur = con.execute("SELECT * FROM runs WHERE id=?", [parent_run_id])
-            parent_run = cur.fetchone()
-            con.close()
-
-            parent_run_id = parent_run[0]
-            parent_start_time = parent_run[1]
-            parent_run_obj = json.loads(parent_run[2])
-
-            new_parent_run_id = self._create_run_and_log(src_client, mlflow_runs_file, parent_run_id, parent_start_time, parent_run_obj, experiment_id_map, ml_run_artifacts_dir, error_logger, checkpointer, steps_checkpointer)
-            if not new_parent_run_id:
+            if not checkpointer.contains(parent_run_id):
                 message = (f"Run: {run_id} failed to be imported as its parent run failed to be imported.")
                 error_logger.error(message)
-                checkpointer.remove(run_id)
                 return None
-            tags["mlflow.parentRunId"] = new_parent_run_id
+            tags["mlflow.parentRunId"] = checkpointer.get(parent_run_id)
 
-        new_run_id = self._create_run_and_log_helper(src_client, imported_experiment_id, run_id, start_time, metrics, params, tags, ml_run_artifacts_dir, steps_checkpointer)
+        try:
+            new_run_id = self._create_run_and_log_helper(imported_experiment_id, run_id, start_time, metrics, params, tags, artifact_copier, steps_checkpointer)
+        except RestException as error:
+            logging.error(f"Importing runs failed for run_id: {run_id}. Logging it to the error file...")
+            error_logger.error(error.json)
+            return None
 
         logging.info(f"Successfully imported run: {run_id} into target workspace as {new_run_id}")
         checkpointer.write(run_id, new_run_id)
         return new_run_id
 
-    def _create_run_and_log_helper(self, src_client, experiment_id, run_id, start_time, metrics, params, tags, ml_run_artifacts_dir, steps_checkpointer):
+    def _create_run_and_log_helper(self, experiment_id, run_id, start_time, metrics, params, tags, artifact_copier, steps_checkpointer):
         creation_checkpoint_key = run_id + "_create_run"
         log_batch_checkpoint_key = run_id + "_log_batch"
         run_artifacts_checkpoint_key = run_id + "_artifacts"
@@ -416,30 +509,11 @@ class MLFlowClient(dbclient):
             steps_checkpointer.write(log_batch_checkpoint_key, new_run_id)
 
         if not steps_checkpointer.contains(run_artifacts_checkpoint_key):
-            self._download_and_upload_run_artifacts(src_client, run_id, new_run_id, ml_run_artifacts_dir)
+            artifact_copier.copy(run_id, new_run_id)
             steps_checkpointer.write(run_artifacts_checkpoint_key, new_run_id)
 
         return new_run_id
 
-    def _download_and_upload_run_artifacts(self, src_client, old_run_id, new_run_id, ml_run_artifacts_dir):
-        # Download artifacts into temp directory: ml_run_artifacts/$run_id_temp and then upload to the destination
-        # workspace. After uploading, remove the temp dir along with the artifacts.
-        temp_artifact_dir = ml_run_artifacts_dir + old_run_id + "_temp/"
-        shutil.rmtree(temp_artifact_dir, ignore_errors=True)
-        os.makedirs(temp_artifact_dir)
-        try:
-            artifacts = src_client.list_artifacts(old_run_id)
-            if len(artifacts) == 0:
-                return
-
-            logging.info(f"Downloading run artifacts for run_id: {old_run_id}")
-            src_client.download_artifacts(old_run_id, "", temp_artifact_dir)
-
-            logging.info(f"Uploading run artifacts for run_id: {old_run_id} -> {new_run_id}")
-            self.client.log_artifacts(new_run_id, temp_artifact_dir)
-        finally:
-            shutil.rmtree(temp_artifact_dir)
-
     def _load_experiment_id_map(self, experiment_id_map_log):
         id_map = {}
         # Parallelize this operation if this is too slow.
@@ -5,54 +5,60 @@ import os
 import json
 import wmconstants
 import concurrent
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from thread_safe_writer import ThreadSafeWriter
 from threading_utils import propagate_exceptions
+from identity_directory import get_identity_directory
+from group_membership import get_group_membership_index
 
 class ScimClient(dbclient):
     def __init__(self, configs, checkpoint_service):
         super().__init__(configs)
         self._checkpoint_service = checkpoint_service
         self.groups_to_keep = configs.get("groups_to_keep", False)
+        # max number of members added to a group by a single PATCH
+        self.group_member_chunk_size = configs.get("group_member_chunk_size", 500)
 
     def get_active_users(self):
-        users = self.get('/preview/scim/v2/Users').get('Resources', None)
+        users = list(self.scim_iterator('/preview/scim/v2/Users'))
         return users if users else None
 
     def log_all_users(self, log_file='users.log'):
         user_log = self.get_export_dir() + log_file
-        users = self.get('/preview/scim/v2/Users').get('Resources', None)
-        if users:
-            with open(user_log, "w") as fp:
-                for x in users:
-                    fullname = x.get('name', None)
-
-                    # if a group list has been passed, check to see if current user is part of groups
-                    if self.groups_to_keep:
-                        user_groups = [g['display'] for g in x.get('groups')]
-                        if not set(user_groups).intersection(set(self.groups_to_keep)):
-                            continue
-
-                    if fullname:
-                        given_name = fullname.get('givenName', None)
-                        # if user is an admin, skip this user entry
-                        if x['userName'] == 'admin' and given_name == 'Administrator':
-                            continue
-                    fp.write(json.dumps(x) + '\n')
-        else:
+        num_users = 0
+        # if a group list has been passed, keep the direct and nested members of those groups
+        users_to_keep = get_group_membership_index(self).users_in_groups(self.groups_to_keep) \
+            if self.groups_to_keep else None
+        with open(user_log, "w") as fp:
+            # users are streamed page by page into the log
+            for x in self.scim_iterator('/preview/scim/v2/Users'):
+                num_users += 1
+                fullname = x.get('name', None)
+
+                if users_to_keep is not None and x['userName'] not in users_to_keep:
+                    continue
+
+                if fullname:
+                    given_name = fullname.get('givenName', None)
+                    # if user is an admin, skip this user entry
+                    if x['userName'] == 'admin' and given_name == 'Administrator':
+                        continue
+                fp.write(json.dumps(x) + '\n')
+        if not num_users:
             logging.info("Users returned an empty object")
 
     def log_all_service_principals(self, log_file='service_principals.log'):
         sp_log = self.get_export_dir() + log_file
-        service_principals = self.get('/preview/scim/v2/ServicePrincipals').get('Resources', None)
-        if service_principals:
-            with open(sp_log, "w") as fp:
-                for x in service_principals:
-                    if x["active"] == True:
-                        fp.write(json.dumps(x) + '\n')
-                    else:
-                        logging.info(f"Skipping inactive service principal {x['applicationId']} - {x['displayName']}")
-        else:
+        num_service_principals = 0
+        with open(sp_log, "w") as fp:
+            for x in self.scim_iterator('/preview/scim/v2/ServicePrincipals'):
+                num_service_principals += 1
+                if x["active"] == True:
+                    fp.write(json.dumps(x) + '\n')
+                else:
+                    logging.info(f"Skipping inactive service principal {x['applicationId']} - {x['displayName']}")
+        if not num_service_principals:
             logging.info("ServicePrincipals returned an empty object")
 
     def log_single_user(self, user_email, log_file='single_user.log'):
@@ -120,15 +126,52 @@ class ScimClient(dbclient):
                 service_principals[name] = sp
         return True
 
-    def add_username_to_group(self, group_json):
+    def get_users_index(self, attributes=None):
+        """
+        build an in-memory index of all users from a single listing
+        :param attributes: optional comma separated user attributes to list, e.g. 'userName'
+        :return: dict of { user_id : user_json }
+        """
+        params = {'attributes': attributes} if attributes else None
+        return {user['id']: user for user in self.scim_iterator('/preview/scim/v2/Users', params)}
+
+    def fill_users_index(self, users_index, user_ids, num_parallel=4):
+        """
+        fetch the users that are missing in the index, e.g. created after the listing, in parallel
+        :return: users_index including the users that were found
+        """
+        missing_ids = set(user_ids) - set(users_index.keys())
+        if not missing_ids:
+            return users_index
+        logging.info(f"Fetching {len(missing_ids)} users missing in the users index")
+        with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            futures = {m_id: executor.submit(self.get, f'/preview/scim/v2/Users/{m_id}') for m_id in missing_ids}
+            concurrent.futures.wait(futures.values(), return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures.values())
+        for m_id, future in futures.items():
+            user_resp = future.result()
+            if 'userName' in user_resp:
+                user_resp.pop('http_status_code', None)
+                users_index[m_id] = user_resp
+        return users_index
+
+    @staticmethod
+    def get_group_user_ids(group_list):
+        return [m['value'] for group in group_list for m in group.get('members', [])
+                if ScimClient.is_member_a_user(m)]
+
+    def add_username_to_group(self, group_json, users_index=None):
         # add the userName field to json since ids across environments may not match
         members = group_json.get('members', [])
         new_members = []
         for m in members:
             m_id = m['value']
             if self.is_member_a_user(m):
-                user_resp = self.get('/preview/scim/v2/Users/{0}'.format(m_id))
-                m['userName'] = user_resp['userName']
+                if users_index is not None and m_id in users_index:
+                    m['userName'] = users_index[m_id]['userName']
+                else:
+                    user_resp = self.get('/preview/scim/v2/Users/{0}'.format(m_id))
+                    m['userName'] = user_resp['userName']
                 m['type'] = 'user'
             elif self.is_member_a_group(m):
                 m['type'] = 'group'
@@ -140,20 +183,21 @@ class ScimClient(dbclient):
         group_json['members'] = new_members
         return group_json
 
-    def log_all_groups(self, group_log_dir='groups/'):
+    def log_all_groups(self, group_log_dir='groups/', num_parallel=4):
         group_dir = self.get_export_dir() + group_log_dir
         os.makedirs(group_dir, exist_ok=True)
-        group_list = self.get("/preview/scim/v2/Groups").get('Resources', [])
+        # if groups_to_keep is defined, keep those groups and the groups nested in them
+        groups_to_keep = get_group_membership_index(self).groups_within(self.groups_to_keep) \
+            if self.groups_to_keep else None
+        group_list = [x for x in self.scim_iterator("/preview/scim/v2/Groups")
+                      if groups_to_keep is None or x['displayName'] in groups_to_keep]
+        # resolve member ids to userNames from one listing instead of one GET per member
+        users_index = self.fill_users_index(self.get_users_index('userName'), self.get_group_user_ids(group_list),
+                                            num_parallel)
         for x in group_list:
             group_name = x['displayName']
-
-            # if groups_to_keep is defined, check to see if current group is a member
-            if self.groups_to_keep:
-                if group_name not in self.groups_to_keep:
-                    continue
-
             with open(group_dir + group_name, "w") as fp:
-                fp.write(json.dumps(self.add_username_to_group(x)))
+                fp.write(json.dumps(self.add_username_to_group(x, users_index)))
 
     @staticmethod
     def build_group_dict(group_list):
@@ -162,7 +206,8 @@ class ScimClient(dbclient):
             group_dict[group.get('displayName')] = group
         return group_dict
 
-    def log_groups_from_list(self, group_name_list, group_log_dir='groups/', users_logfile='users.log'):
+    def log_groups_from_list(self, group_name_list, group_log_dir='groups/', users_logfile='users.log',
+                             num_parallel=4):
         """
         take a list of groups and log all the members
         :param group_name_list: a list obj of group names
@@ -172,28 +217,31 @@ class ScimClient(dbclient):
         """
         group_dir = self.get_export_dir() + group_log_dir
         os.makedirs(group_dir, exist_ok=True)
-        group_list = self.get("/preview/scim/v2/Groups").get('Resources', [])
+        group_list = list(self.scim_iterator("/preview/scim/v2/Groups"))
         group_dict = self.build_group_dict(group_list)
+        # members and their user records are resolved from one listing instead of one GET per member
+        users_index = self.fill_users_index(self.get_users_index(), self.get_group_user_ids(group_list), num_parallel)
+        # nested groups are resolved once, so groups shared by several parents or cycles are logged only once
+        nested_group_names = get_group_membership_index(self).groups_within(group_name_list)
         member_id_list = []
-        for group_name in group_name_list:
+        for group_name in sorted(nested_group_names):
             group_details = group_dict[group_name]
             members_list = group_details.get('members', [])
             filtered_users = list(filter(lambda y: 'Users' in y.get('$ref', None), members_list))
-            filtered_sub_groups = list(filter(lambda y: 'Groups' in y.get('$ref', None), members_list))
-            if filtered_sub_groups:
-                sub_group_names = list(map(lambda z: z.get('display'), filtered_sub_groups))
-                group_name_list.extend(sub_group_names)
             member_id_list.extend(list(map(lambda y: y['value'], filtered_users)))
             with open(group_dir + group_name, "w") as fp:
                 group_details.pop('roles', None)  # removing the roles field from the groups arg
-                fp.write(json.dumps(self.add_username_to_group(group_details)))
+                fp.write(json.dumps(self.add_username_to_group(group_details, users_index)))
         users_log = self.get_export_dir() + users_logfile
         user_names_list = []
         with open(users_log, 'w') as u_fp:
-            for mid in member_id_list:
-                logging.info('Exporting', mid)
-                api = f'/preview/scim/v2/Users/{mid}'
-                user_resp = self.get(api)
+            # users that are members of several of the groups are logged once
+            for mid in dict.fromkeys(member_id_list):
+                logging.info(f'Exporting {mid}')
+                if mid in users_index:
+                    user_resp = dict(users_index[mid])
+                else:
+                    user_resp = self.get(f'/preview/scim/v2/Users/{mid}')
                 user_resp.pop('roles', None)  # remove roles since those can change during the migration
                 user_resp.pop('http_status_code', None)  # remove unnecessary params
                 user_names_list.append(user_resp.get('userName'))
@@ -202,13 +250,10 @@ class ScimClient(dbclient):
 
     def get_user_id_mapping(self):
         # return a dict of the userName to id mapping of the new env
-        user_list = self.get('/preview/scim/v2/Users').get('Resources', None)
-        if user_list:
-            user_id_dict = {}
-            for user in user_list:
-                user_id_dict[user['userName']] = user['id']
-            return user_id_dict
-        return None
+        user_id_dict = {}
+        for user in self.scim_iterator('/preview/scim/v2/Users', {'attributes': 'userName'}):
+            user_id_dict[user['userName']] = user['id']
+        return user_id_dict if user_id_dict else None
 
     @staticmethod
     def get_service_principal_id_mapping(export_dir, sp_mapping_logfile='service_principals_id_mapping.log'):
@@ -245,8 +290,7 @@ class ScimClient(dbclient):
         # return a dict of the current service principal app mapping to the id and app id in the new env
         # raises an exception if there is a duplicate name
         sp_app_id_dict = {}
-        sp_list = self.get('/preview/scim/v2/ServicePrincipals').get('Resources', {})
-        for sp in sp_list:
+        for sp in self.scim_iterator('/preview/scim/v2/ServicePrincipals', {'attributes': 'displayName,applicationId'}):
             if sp['displayName'] in sp_app_id_dict:
                 raise Exception(f"Duplicate service principal name {sp['displayName']} in destination workspace")
             sp_app_id_dict[sp['displayName']] = {'id': sp['id'], 'applicationId': sp['applicationId']}
@@ -282,51 +326,89 @@ class ScimClient(dbclient):
                                        "value": entitlements_list}]}
         return assign_args
 
-    def assign_group_entitlements(self, group_dir, error_logger):
+    def _read_group_files(self, group_dir):
+        for group_name in self.listdir(group_dir):
+            with open(group_dir + group_name, 'r') as fp:
+                group_data = json.loads(fp.read())
+            group_data['displayName'] = group_name
+            yield group_data
+
+    def assign_group_entitlements(self, group_dir, error_logger, num_parallel=4):
         # assign group role ACLs, which are only available via SCIM apis
-        group_ids = self.get_current_group_ids()
         if not os.path.exists(group_dir):
             logging.info("No groups defined. Skipping group entitlement assignment")
             return
-        groups = self.listdir(group_dir)
-        for group_name in groups:
-            with open(group_dir + group_name, 'r') as fp:
-                group_data = json.loads(fp.read())
-                entitlements = group_data.get('entitlements', None)
-                if entitlements:
-                    g_id = group_ids[group_name]
-                    update_entitlements = self.assign_entitlements_args(entitlements)
-                    up_resp = self.patch(f'/preview/scim/v2/Groups/{g_id}', update_entitlements)
-                    logging_utils.log_response_error(error_logger, up_resp)
-
-    def assign_group_roles(self, group_dir, error_logger):
+        current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/Groups')
+        group_ids = {group['displayName']: group_id for group_id, group in current_assignments.items()}
+        self.assign_missing_values('/preview/scim/v2/Groups', self._read_group_files(group_dir),
+                                   lambda group: group_ids.get(group['displayName']), current_assignments,
+                                   ['entitlements'], error_logger, num_parallel)
+
+    def assign_group_roles(self, group_dir, error_logger, num_parallel=4):
         # assign group role ACLs, which are only available via SCIM apis
-        group_ids = self.get_current_group_ids()
         if not os.path.exists(group_dir):
             logging.info("No groups defined. Skipping group entitlement assignment")
             return
-        groups = self.listdir(group_dir)
-        for group_name in groups:
-            with open(group_dir + group_name, 'r') as fp:
-                group_data = json.loads(fp.read())
-                roles = group_data.get('roles', None)
-                if roles:
-                    g_id = group_ids[group_name]
-                    update_roles = self.assign_roles_args(roles)
-                    up_resp = self.patch(f'/preview/scim/v2/Groups/{g_id}', update_roles)
-                    logging_utils.log_response_error(error_logger, up_resp)
-                entitlements = group_data.get('entitlements', None)
-                if entitlements:
-                    g_id = group_ids[group_name]
-                    update_entitlements = self.assign_entitlements_args(entitlements)
-                    up_resp = self.patch(f'/preview/scim/v2/Groups/{g_id}', update_entitlements)
-                    logging_utils.log_response_error(error_logger, up_resp)
+        current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/Groups')
+        group_ids = {group['displayName']: group_id for group_id, group in current_assignments.items()}
+        self.assign_missing_values('/preview/scim/v2/Groups', self._read_group_files(group_dir),
+                                   lambda group: group_ids.get(group['displayName']), current_assignments,
+                                   ['roles', 'entitlements'], error_logger, num_parallel)
+
+    def get_current_roles_and_entitlements(self, endpoint):
+        """
+        read the current roles and entitlements of all users, service principals or groups from one paged listing
+        :param endpoint: SCIM list endpoint, e.g. /preview/scim/v2/Users
+        :return: dict of { id : {'displayName': str, 'roles': set of values, 'entitlements': set of values} }
+        """
+        attributes = 'roles,entitlements,displayName' if endpoint.endswith('/Groups') else 'roles,entitlements'
+        current_assignments = {}
+        for principal in self.scim_iterator(endpoint, {'attributes': attributes}):
+            current_assignments[principal['id']] = {
+                'displayName': principal.get('displayName'),
+                'roles': set(x['value'] for x in principal.get('roles', [])),
+                'entitlements': set(x['value'] for x in principal.get('entitlements', [])),
+            }
+        return current_assignments
+
+    def assign_missing_values(self, endpoint, principals, get_current_id, current_assignments, attributes,
+                              error_logger, num_parallel=4):
+        """
+        add the roles / entitlements of exported principals that the current principals are missing, in parallel.
+        A PATCH is only sent when something is missing.
+        :param principals: iterable of exported principal json
+        :param get_current_id: function of an exported principal json to its id in the new env, or None to skip it
+        :param current_assignments: output of get_current_roles_and_entitlements
+        :param attributes: list of 'roles' and / or 'entitlements'
+        """
+        with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            futures = []
+            for principal in principals:
+                current_id = get_current_id(principal)
+                if current_id is None:
+                    continue
+                current = current_assignments.get(current_id, {})
+                for attribute in attributes:
+                    saved_values = [x['value'] for x in principal.get(attribute) or []]
+                    values_needed = [v for v in saved_values if v not in current.get(attribute, set())]
+                    if values_needed:
+                        futures.append(executor.submit(self._patch_values, endpoint, current_id, attribute,
+                                                       values_needed, error_logger))
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures)
+
+    def _patch_values(self, endpoint, current_id, attribute, values, error_logger):
+        if attribute == 'roles':
+            patch_args = self.add_roles_arg(values)
+        else:
+            patch_args = self.assign_entitlements_args([{'value': v} for v in values])
+        update_resp = self.patch(f'{endpoint}/{current_id}', patch_args)
+        logging_utils.log_response_error(error_logger, update_resp)
 
     def get_current_group_ids(self):
         # return a dict of group displayName and id mappings
-        groups = self.get('/preview/scim/v2/Groups').get('Resources', None)
         group_ids = {}
-        for group in groups:
+        for group in self.scim_iterator('/preview/scim/v2/Groups', {'attributes': 'displayName'}):
             group_ids[group['displayName']] = group['id']
         return group_ids
 
@@ -346,137 +428,92 @@ class ScimClient(dbclient):
         }
         return patch_roles_arg
 
-    def assign_user_entitlements(self, current_user_ids, error_logger, user_log_file='users.log'):
+    @staticmethod
+    def _read_json_lines(log_file):
+        with open(log_file, 'r') as fp:
+            for line in fp:
+                yield json.loads(line)
+
+    def assign_user_entitlements(self, current_user_ids, error_logger, user_log_file='users.log', num_parallel=4,
+                                 current_assignments=None):
         """
         assign user entitlements to allow cluster create, job create, sql analytics etc
         :param user_log_file:
         :param current_user_ids: dict of the userName to id mapping of the new env
+        :param current_assignments: current roles and entitlements, listed if not passed
         :return:
         """
         user_log = self.get_export_dir() + user_log_file
         if not os.path.exists(user_log):
             logging.info("Skipping user entitlement assignment. Logfile does not exist")
             return
-        with open(user_log, 'r') as fp:
-            # loop through each user in the file
-            for line in fp:
-                user = json.loads(line)
-                userName = user['userName']
-                if userName not in current_user_ids:
-                    continue
-                # add the users entitlements
-                user_entitlements = user.get('entitlements', None)
-                # get the current registered user id
-                user_id = current_user_ids[user['userName']]
-                if user_entitlements:
-                    entitlements_args = self.assign_entitlements_args(user_entitlements)
-                    update_resp = self.patch(f'/preview/scim/v2/Users/{user_id}', entitlements_args)
-                    logging_utils.log_response_error(error_logger, update_resp)
-
-    def assign_service_principal_entitlements(self, current_service_principal_ids, error_logger, service_principal_log_file='service_principals.log'):
+        if current_assignments is None:
+            current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/Users')
+        self.assign_missing_values('/preview/scim/v2/Users', self._read_json_lines(user_log),
+                                   lambda user: current_user_ids.get(user['userName']), current_assignments,
+                                   ['entitlements'], error_logger, num_parallel)
+
+    def assign_service_principal_entitlements(self, current_service_principal_ids, error_logger,
+                                              service_principal_log_file='service_principals.log', num_parallel=4,
+                                              current_assignments=None):
         """
         assign service principal entitlements to allow cluster create, job create, sql analytics etc
         :param service_principal_log_file: exported service principal log file
-        :param current_service_principal_app_ids: dict of the app id mapping to the new env
+        :param current_service_principal_ids: dict of the mapping from origin id to the id in the new env
+        :param current_assignments: current roles and entitlements, listed if not passed
         """
         sp_log = self.get_export_dir() + service_principal_log_file
         if not os.path.exists(sp_log):
             logging.info("Skipping service principal entitlement assignment. Logfile does not exist")
             return
-        with open(sp_log, 'r') as fp:
-            # loop through each service principal in the file
-            for line in fp:
-                sp = json.loads(line)
-                sp_id = sp['id']
-                if sp_id not in current_service_principal_ids:
-                    continue
-                # add the service principal entitlements
-                sp_entitlements = sp.get('entitlements', None)
-                # get the current service principal app id
-                new_id = current_service_principal_ids[sp_id]
-                if sp_entitlements:
-                    entitlements_args = self.assign_entitlements_args(sp_entitlements)
-                    update_resp = self.patch(f'/preview/scim/v2/ServicePrincipals/{new_id}', entitlements_args)
-                    logging_utils.log_response_error(error_logger, update_resp)
-
-    def assign_user_roles(self, current_user_ids, error_logger, user_log_file='users.log'):
+        if current_assignments is None:
+            current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/ServicePrincipals')
+        self.assign_missing_values('/preview/scim/v2/ServicePrincipals', self._read_json_lines(sp_log),
+                                   lambda sp: current_service_principal_ids.get(sp['id']), current_assignments,
+                                   ['entitlements'], error_logger, num_parallel)
+
+    def assign_user_roles(self, current_user_ids, error_logger, user_log_file='users.log', num_parallel=4,
+                          current_assignments=None):
         """
         assign user roles that are missing after adding group assignment
         Note: There is a limitation in the exposed API. If a user is assigned a role permission & the permission
         is granted via a group, we can't distinguish the difference. Only group assignment will be migrated.
         :param user_log_file: logfile of all user properties
         :param current_user_ids: dict of the userName to id mapping of the new env
+        :param current_assignments: current roles and entitlements, listed if not passed
         :return:
         """
         user_log = self.get_export_dir() + user_log_file
         if not os.path.exists(user_log):
             logging.info("Skipping user entitlement assignment. Logfile does not exist")
             return
-        # keys to filter from the user log to get the user / role mapping
-        old_role_keys = ('userName', 'roles')
-        cur_role_keys = ('schemas', 'userName', 'entitlements', 'roles', 'groups')
-        # get current user id of the new environment, k,v = email, id
-        with open(user_log, 'r') as fp:
-            # loop through each user in the file
-            for line in fp:
-                user = json.loads(line)
-                user_roles = {k: user[k] for k in old_role_keys if k in user}
-                userName = user['userName']
-                if userName not in current_user_ids:
-                    continue
-                # get the current registered user id
-                user_id = current_user_ids[user['userName']]
-                # get the current users settings
-                cur_user = self.get('/preview/scim/v2/Users/{0}'.format(user_id))
-                # get the current users IAM roles
-                current_roles = cur_user.get('roles', None)
-                if current_roles:
-                    cur_role_values = set([x['value'] for x in current_roles])
-                else:
-                    cur_role_values = set()
-                # get the users saved IAM roles from the export
-                saved_roles = user_roles.get('roles', None)
-                if saved_roles:
-                    saved_role_values = set([y['value'] for y in saved_roles])
-                else:
-                    saved_role_values = set()
-                roles_needed = list(saved_role_values - cur_role_values)
-                if roles_needed:
-                    # get the json to add the roles to the user profile
-                    patch_roles = self.add_roles_arg(roles_needed)
-                    update_resp = self.patch(f'/preview/scim/v2/Users/{user_id}', patch_roles)
-                    logging_utils.log_response_error(error_logger, update_resp)
-
-    def assign_service_principal_roles(self, current_service_principal_ids, error_logger, service_principal_log_file='service_principals.log'):
+        if current_assignments is None:
+            current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/Users')
+        self.assign_missing_values('/preview/scim/v2/Users', self._read_json_lines(user_log),
+                                   lambda user: current_user_ids.get(user['userName']), current_assignments,
+                                   ['roles'], error_logger, num_parallel)
+
+    def assign_service_principal_roles(self, current_service_principal_ids, error_logger,
+                                       service_principal_log_file='service_principals.log', num_parallel=4,
+                                       current_assignments=None):
         """
         assign service principal roles that are missing after adding group assignment
         Note: There is a limitation in the exposed API. If a service principal is assigned a role permission & the permission
         is granted via a group, we can't distinguish the difference. Only group assignment will be migrated.
         :param service_principal_log_file: logfile of all service principal properties
         :param current_service_principal_ids: dict of the mapping from origin id to the id in the new env
+        :param current_assignments: current roles and entitlements, listed if not passed
         :return:
         """
         sp_log = self.get_export_dir() + service_principal_log_file
         if not os.path.exists(sp_log):
             logging.info("Skipping service principal entitlement assignment. Logfile does not exist")
             return
-        with open(sp_log, 'r') as fp:
-            for line in fp:
-                sp = json.loads(line)
-                if sp['id'] not in current_service_principal_ids:
-                    continue
-                sp_roles = sp.get("roles", {})
-                role_values = set([y['value'] for y in sp_roles])
-                cur_sp_id = current_service_principal_ids[sp['id']]
-                cur_sp = self.get(f"/preview/scim/v2/ServicePrincipals/{cur_sp_id}")
-                cur_roles = cur_sp.get('roles', {})
-                cur_role_values = set([x['value'] for x in cur_roles])
-                roles_needed = list(role_values - cur_role_values)
-                if roles_needed:
-                    # get the json to add the roles to the user profile
-                    patch_roles = self.add_roles_arg(roles_needed)
-                    update_resp = self.patch(f'/preview/scim/v2/ServicePrincipals/{cur_sp_id}', patch_roles)
-                    logging_utils.log_response_error(error_logger, update_resp)
+        if current_assignments is None:
+            current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/ServicePrincipals')
+        self.assign_missing_values('/preview/scim/v2/ServicePrincipals', self._read_json_lines(sp_log),
+                                   lambda sp: current_service_principal_ids.get(sp['id']), current_assignments,
+                                   ['roles'], error_logger, num_parallel)
 
     @staticmethod
     def get_member_args(member_id_list):
@@ -517,67 +554,130 @@ class ScimClient(dbclient):
             return True
         return False
 
-    def import_groups(self, group_dir, current_user_ids, error_logger):
+    def import_groups(self, group_dir, error_logger, num_parallel=4):
+        """
+        create all groups, then add their members. Both steps run on a pool of num_parallel workers, and the members
+        of a group are added by PATCHes of at most group_member_chunk_size members each.
+        Group creation is checkpointed per group; membership is checkpointed per chunk and per group once all of its
+        chunks are added, so an interrupted import resumes partway through a group.
+        """
         checkpoint_groups_set = self._checkpoint_service.get_checkpoint_key_set(
             wmconstants.WM_IMPORT, wmconstants.GROUP_OBJECT)
+        checkpoint_members_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_IMPORT, wmconstants.GROUP_MEMBERS_OBJECT)
         # list all the groups and create groups first
         if not os.path.exists(group_dir):
             logging.info("No groups to import.")
             return
         groups = self.listdir(group_dir)
-        for x in groups:
-            if not checkpoint_groups_set.contains(x):
-                logging.info('Creating group: {0}'.format(x))
-                # set the create args displayName property aka group name
-                create_args = {
-                    "schemas": ["urn:ietf:params:scim:schemas:core:2.0:Group"],
-                    "displayName": x
-                }
-                group_resp = self.post('/preview/scim/v2/Groups', create_args)
-                if not logging_utils.log_response_error(error_logger, group_resp):
-                    checkpoint_groups_set.write(x)
-
-        # dict of { group_name : group_id }
+        with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            futures = [executor.submit(self._create_group_helper, x, checkpoint_groups_set, error_logger)
+                       for x in groups]
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures)
+
+        # the groups were just created, so the identity directory is rebuilt once to include them
+        identities = get_identity_directory(self, refresh=True)
         groups = self.listdir(group_dir)
-        current_group_ids = self.get_current_group_ids()
-        current_service_principal_ids = self.get_service_principal_id_mapping(self.get_export_dir())
+        # dict of { email : user_id }
+        current_user_ids = identities.user_ids()
+        # dict of { group_name : group_id }
+        current_group_ids = identities.group_ids()
+        current_service_principal_ids = identities.service_principal_ids()
         # dict of { old_user_id : email }
-        old_user_emails = self.get_old_user_emails()
+        old_user_emails = identities.source_user_names()
+        chunks = []
+        remaining_chunks = {}
         for group_name in groups:
+            if checkpoint_members_set.contains(group_name):
+                continue
             with open(group_dir + group_name, 'r') as fp:
                 members = json.loads(fp.read()).get('members', None)
-                logging.info(f"Importing group {group_name} :")
-                if members:
-                    # grab a list of ids to add either groups or users to this current group
-                    member_id_list = []
-                    for m in members:
-                        if self.is_user(m):
-                            try:
-                                old_email = old_user_emails[m['value']]
-                                this_user_id = current_user_ids.get(old_email, '')
-                                if not this_user_id:
-                                    error_logger.error(f'Unable to find user {old_email} in the new workspace. '
-                                                     f'This users email case has changed and needs to be updated with '
-                                                     f'the --replace-old-email and --update-new-email options')
-                                member_id_list.append(this_user_id)
-                            except KeyError:
-                                error_logger.error(f"Error adding member {m} to group {group_name}")
-                        elif self.is_group(m):
-                            this_group_id = current_group_ids.get(m['display'])
-                            member_id_list.append(this_group_id)
-                        elif self.is_member_a_service_principal(m):
-                            if m['value'] not in current_service_principal_ids:
-                                error_logger.error(f"Service Principal {m['display']} ({m['value']}) has no mapping (not migrated) so it can't be added to group {group_name}")
-                                continue
-                            this_service_principal_id = current_service_principal_ids[m['value']]
-                            member_id_list.append(this_service_principal_id)
-                        else:
-                            logging.info(
-                                "Skipping other identities not within users/service_principal_users/groups")
-                    add_members_json = self.get_member_args(member_id_list)
-                    group_id = current_group_ids[group_name]
-                    add_resp = self.patch('/preview/scim/v2/Groups/{0}'.format(group_id), add_members_json)
-                    logging_utils.log_response_error(error_logger, add_resp)
+            if not members:
+                checkpoint_members_set.write(group_name)
+                continue
+            logging.info(f"Importing group {group_name} :")
+            member_id_list = self._get_group_member_ids(group_name, members, current_user_ids, current_group_ids,
+                                                        current_service_principal_ids, old_user_emails, error_logger)
+            group_chunks = [member_id_list[i:i + self.group_member_chunk_size]
+                            for i in range(0, len(member_id_list), self.group_member_chunk_size)]
+            if not group_chunks:
+                # none of the members could be mapped, there is nothing left to add on a resumed import
+                checkpoint_members_set.write(group_name)
+                continue
+            remaining_chunks[group_name] = len(group_chunks)
+            chunks.extend((group_name, chunk_index, chunk) for chunk_index, chunk in enumerate(group_chunks))
+
+        lock = threading.Lock()
+
+        def _add_members_helper(group_name, chunk_index, member_ids):
+            # group names are file names in group_dir, so they cannot contain '/' and the keys cannot collide
+            chunk_key = f"{group_name}/{chunk_index}"
+            if not checkpoint_members_set.contains(chunk_key):
+                add_members_json = self.get_member_args(member_ids)
+                group_id = current_group_ids[group_name]
+                add_resp = self.patch('/preview/scim/v2/Groups/{0}'.format(group_id), add_members_json)
+                if logging_utils.log_response_error(error_logger, add_resp):
+                    return
+                checkpoint_members_set.write(chunk_key)
+            with lock:
+                remaining_chunks[group_name] -= 1
+                group_done = remaining_chunks[group_name] == 0
+            if group_done:
+                checkpoint_members_set.write(group_name)
+
+        with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            futures = [executor.submit(_add_members_helper, group_name, chunk_index, chunk)
+                       for group_name, chunk_index, chunk in chunks]
+            concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(futures)
+
+    def _create_group_helper(self, group_name, checkpoint_groups_set, error_logger):
+        if not checkpoint_groups_set.contains(group_name):
+            logging.info('Creating group: {0}'.format(group_name))
+            # set the create args displayName property aka group name
+            create_args = {
+                "schemas": ["urn:ietf:params:scim:schemas:core:2.0:Group"],
+                "displayName": group_name
+            }
+            group_resp = self.post('/preview/scim/v2/Groups', create_args)
+            if not logging_utils.log_response_error(error_logger, group_resp):
+                checkpoint_groups_set.write(group_name)
+
+    def _get_group_member_ids(self, group_name, members, current_user_ids, current_group_ids,
+                              current_service_principal_ids, old_user_emails, error_logger):
+        # grab a list of ids to add either groups or users to this current group
+        member_id_list = []
+        for m in members:
+            if self.is_user(m):
+                try:
+                    old_email = old_user_emails[m['value']]
+                    this_user_id = current_user_ids.get(old_email, '')
+                    if not this_user_id:
+                        error_logger.error(f'Unable to find user {old_email} in the new workspace. '
+                                           f'This users email case has changed and needs to be updated with '
+                                           f'the --replace-old-email and --update-new-email options')
+                        continue
+                    member_id_list.append(this_user_id)
+                except KeyError:
+                    error_logger.error(f"Error adding member {m} to group {group_name}")
+            elif self.is_group(m):
+                this_group_id = current_group_ids.get(m['display'])
+                if not this_group_id:
+                    error_logger.error(f"Group {m['display']} not found in the new workspace so it can't be added to "
+                                       f"group {group_name}")
+                    continue
+                member_id_list.append(this_group_id)
+            elif self.is_member_a_service_principal(m):
+                if m['value'] not in current_service_principal_ids:
+                    error_logger.error(f"Service Principal {m['display']} ({m['value']}) has no mapping (not migrated) so it can't be added to group {group_name}")
+                    continue
+                this_service_principal_id = current_service_principal_ids[m['value']]
+                member_id_list.append(this_service_principal_id)
+            else:
+                logging.info(
+                    "Skipping other identities not within users/service_principal_users/groups")
+        return member_id_list
 
     def import_users(self, user_log, error_logger, checkpoint_set, num_parallel):
         # first create the user identities with the required fields
@@ -684,16 +784,20 @@ class ScimClient(dbclient):
             wmconstants.WM_IMPORT, wmconstants.USER_OBJECT, self.get_export_dir())
 
         self.import_users(user_log, user_error_logger, checkpoint_users_set, num_parallel)
-        current_user_ids = self.get_user_id_mapping()
+        current_user_ids = get_identity_directory(self, refresh=True).user_ids()
         self.log_failed_users(current_user_ids, user_log, user_error_logger)
+        # current roles and entitlements of all users, read once for both assignments
+        current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/Users')
         # assign the users to IAM roles if on AWS
         if self.is_aws():
             logging.info("Update user role assignments")
-            self.assign_user_roles(current_user_ids, user_error_logger, user_log_file)
+            self.assign_user_roles(current_user_ids, user_error_logger, user_log_file, num_parallel,
+                                   current_assignments)
 
         # need to separate role assignment and entitlements to support Azure
         logging.info("Updating users entitlements")
-        self.assign_user_entitlements(current_user_ids, user_error_logger, user_log_file)
+        self.assign_user_entitlements(current_user_ids, user_error_logger, user_log_file, num_parallel,
+                                      current_assignments)
 
     def import_all_service_principals(self, service_principals_log_file='service_principals.log', map_existing_by_name=False, num_parallel=4):
         checkpoint_sp_set = self._checkpoint_service.get_checkpoint_key_set(
@@ -702,29 +806,32 @@ class ScimClient(dbclient):
         sp_error_logger = logging_utils.get_error_logger(
             wmconstants.WM_IMPORT, wmconstants.SERVICE_PRINCIPAL_OBJECT, self.get_export_dir())
         self.import_service_principals(sp_log, sp_error_logger, checkpoint_sp_set, map_existing_by_name, num_parallel)
-        current_sp_ids = self.get_service_principal_id_mapping(self.get_export_dir())
+        current_sp_ids = get_identity_directory(self, refresh=True).service_principal_ids()
         self.log_failed_service_principals(current_sp_ids, sp_log, sp_error_logger)
 
+        # current roles and entitlements of all service principals, read once for both assignments
+        current_assignments = self.get_current_roles_and_entitlements('/preview/scim/v2/ServicePrincipals')
         # assign the service principals to IAM roles if on AWS
         if self.is_aws():
             logging.info("Update service principal role assignments")
-            self.assign_service_principal_roles(current_sp_ids, sp_error_logger, service_principals_log_file)
+            self.assign_service_principal_roles(current_sp_ids, sp_error_logger, service_principals_log_file,
+                                                num_parallel, current_assignments)
 
         # need to separate role assignment and entitlements to support Azure
         logging.info("Updating service principal entitlements")
-        self.assign_service_principal_entitlements(current_sp_ids, sp_error_logger, service_principals_log_file)
+        self.assign_service_principal_entitlements(current_sp_ids, sp_error_logger, service_principals_log_file,
+                                                   num_parallel, current_assignments)
 
-    def import_all_groups(self, group_log_dir='groups/'):
+    def import_all_groups(self, group_log_dir='groups/', num_parallel=4):
         group_error_logger = logging_utils.get_error_logger(
             wmconstants.WM_IMPORT, wmconstants.GROUP_OBJECT, self.get_export_dir())
         group_dir = self.get_export_dir() + group_log_dir
-        current_user_ids = self.get_user_id_mapping()
-        self.import_groups(group_dir, current_user_ids, group_error_logger)
+        self.import_groups(group_dir, group_error_logger, num_parallel)
         # assign the users to IAM roles if on AWS
         if self.is_aws():
             logging.info("Update group role assignments")
-            self.assign_group_roles(group_dir, group_error_logger)
+            self.assign_group_roles(group_dir, group_error_logger, num_parallel)
 
         # need to separate role assignment and entitlements to support Azure
         logging.info("Updating groups entitlements")
-        self.assign_group_entitlements(group_dir, group_error_logger)
+        self.assign_group_entitlements(group_dir, group_error_logger, num_parallel)
@@ -17,19 +17,22 @@ class SecretsClient(ClustersClient):
         secrets_list = self.get('/secrets/list', {'scope': scope_name}).get('secrets', [])
         return secrets_list
 
-    def get_secret_value(self, scope_name, secret_key, cid, ec_id, error_logger):
-        cmd_set_value = f"value = dbutils.secrets.get(scope = '{scope_name}', key = '{secret_key}')"
-        cmd_convert_b64 = "import base64; b64_value = base64.b64encode(value.encode('ascii'))"
-        cmd_get_b64 = "print(b64_value.decode('ascii'))"
-        results_set = self.submit_command(cid, ec_id, cmd_set_value)
-        results_convert = self.submit_command(cid, ec_id, cmd_convert_b64)
-        results_get = self.submit_command(cid, ec_id, cmd_get_b64)
-        if logging_utils.log_response_error(error_logger, results_set) \
-                or logging_utils.log_response_error(error_logger, results_convert) \
-                or logging_utils.log_response_error(error_logger, results_get):
+    @staticmethod
+    def get_secret_value_cmd(scope_name, secret_key):
+        return f"import base64\n" \
+               f"value = dbutils.secrets.get(scope = '{scope_name}', key = '{secret_key}')\n" \
+               f"print(base64.b64encode(value.encode('ascii')).decode('ascii'))"
+
+    @staticmethod
+    def get_b64_value(results, error_logger):
+        if logging_utils.log_response_error(error_logger, results):
             return None
         else:
-            return results_get.get('data')
+            return results.get('data')
+
+    def get_secret_value(self, scope_name, secret_key, cid, ec_id, error_logger):
+        results = self.submit_command(cid, ec_id, self.get_secret_value_cmd(scope_name, secret_key))
+        return self.get_b64_value(results, error_logger)
 
     def log_all_secrets(self, cluster_name=None, log_dir='secret_scopes/'):
         scopes_dir = self.get_export_dir() + log_dir
@@ -39,8 +42,6 @@ class SecretsClient(ClustersClient):
         os.makedirs(scopes_dir, exist_ok=True)
         start = timer()
         cid = self.start_cluster_by_name(cluster_name) if cluster_name else self.launch_cluster()
-        time.sleep(5)
-        ec_id = self.get_execution_context(cid)
         for scope_json in scopes_list:
             scope_name = scope_json.get('name')
             secrets_list = self.get_secrets(scope_name)
@@ -49,9 +50,12 @@ class SecretsClient(ClustersClient):
             scopes_logfile = scopes_dir + scope_name
             try:
                 with open(scopes_logfile, 'w') as fp:
-                    for secret_json in secrets_list:
-                        secret_name = secret_json.get('key')
-                        b64_value = self.get_secret_value(scope_name, secret_name, cid, ec_id, error_logger)
+                    # the values of all secrets of the scope are fetched concurrently on the execution context pool
+                    secret_futures = [(secret_json.get('key'), self.submit_pooled_command(
+                        cid, self.get_secret_value_cmd(scope_name, secret_json.get('key'))))
+                        for secret_json in secrets_list]
+                    for secret_name, future in secret_futures:
+                        b64_value = self.get_b64_value(future.result(), error_logger)
                         s_json = {'name': secret_name, 'value': b64_value}
                         fp.write(json.dumps(s_json) + '\n')
             except ValueError as error:
@@ -3,6 +3,7 @@ import base64
 import shutil
 import wmconstants
 import logging_utils
+from poller import Poller
 import logging
 
 # noinspection SpellCheckingInspection
@@ -36,6 +37,8 @@ class TableACLsClient(ClustersClient):
 
     CLUSTER_LAUNCH_POLLING_INTERVAL_SECONDS = 5
     NOTEBOOK_RUN_POLLING_INTERVAL_SECONDS = 2
+    NOTEBOOK_RUN_MAX_POLLING_INTERVAL_SECONDS = 60
+    NOTEBOOK_RUN_TIMEOUT_SECONDS = 24 * 3600
     BUFFER_SIZE_BYTES = 1024 * 1024  # 1MB limit for dbfs blocks in API
     DB_ADMIN_SUFFIX = "+dbadmin@databricks.com"
 
@@ -130,33 +133,27 @@ class TableACLsClient(ClustersClient):
         }
         self.post("/dbfs/delete", dbfs_delete_params)
 
-    def wait_for_notebook_to_terminate(self, run_id, max_num_retries = 5):
+    def wait_for_notebook_to_terminate(self, run_id, max_num_retries=5):
         """
         Polls a job run until the job terminates
         :param run_id: the run to wait to terminate for
+        :param max_num_retries: number of failed polls to retry
         :return: result object of the run; successfull if res["state"]["result_state"] == "SUCCESS"
         """
-        cur_num_retries = 0
-        while True:  # TODO add a timeout here
-            try:
-                res = self.get('/jobs/runs/get', {'run_id': run_id}, print_json=False)
-                if self.is_verbose():
-                    print(f"polling for job to finish: {res['run_page_url']}")
-                if res["http_status_code"] != 200 or res["state"]['life_cycle_state'] == 'TERMINATED' or \
-                        res["state"]['life_cycle_state'] == "INTERNAL_ERROR":
-                    break
-                time.sleep(self.NOTEBOOK_RUN_POLLING_INTERVAL_SECONDS)
-            except Exception as e:
-                print(f"caught Exception while polling for job to finish: {str(e)}")
-                if cur_num_retries < max_num_retries:
-                    #TODO sleep some time, backoff more for retries - make this configurable
-                    time.sleep(self.NOTEBOOK_RUN_POLLING_INTERVAL_SECONDS * (cur_num_retries+3))
-                    cur_num_retries = cur_num_retries+1
-                else:
-                    print(f"max num retries exceeeded : giving up {str(e)}")
-                    raise
-
-        return res
+        def _get_run():
+            res = self.get('/jobs/runs/get', {'run_id': run_id}, print_json=False)
+            if self.is_verbose():
+                print(f"polling for job to finish: {res.get('run_page_url', None)}")
+            return res
+
+        def _is_terminated(res):
+            return res["http_status_code"] != 200 or \
+                res["state"]['life_cycle_state'] in ('TERMINATED', 'SKIPPED', 'INTERNAL_ERROR')
+
+        poller = Poller(initial_interval=self.NOTEBOOK_RUN_POLLING_INTERVAL_SECONDS,
+                        max_interval=self.NOTEBOOK_RUN_MAX_POLLING_INTERVAL_SECONDS,
+                        timeout=self.NOTEBOOK_RUN_TIMEOUT_SECONDS, max_errors=max_num_retries)
+        return poller.wait(_get_run, _is_terminated, f'notebook run {run_id}')
 
     def run_notebook_on_cluster(self, cid, notebook_path, notebook_params):
         runs_submit_params = {
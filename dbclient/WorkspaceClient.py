@@ -11,8 +11,12 @@ from threading_utils import propagate_exceptions
 from timeit import default_timer as timer
 from datetime import timedelta
 import logging_utils
+from identity_directory import get_identity_directory
+from group_membership import get_group_membership_index
 import logging
 import os
+import shutil
+import threading
 
 WS_LIST = "/workspace/list"
 WS_STATUS = "/workspace/get-status"
@@ -79,10 +83,18 @@ class WorkspaceClient(dbclient):
         :param nb_full_path: full destination path, e.g. /Users/foo@db.com/bar.dbc . Includes extension / type
         :return: return the full input args to upload to the destination system
         """
-        fp = open(full_local_path, "rb")
+        with open(full_local_path, "rb") as fp:
+            return self.get_import_args(fp.read(), nb_full_path)
+
+    def get_import_args(self, content, nb_full_path):
+        """
+        helper function to define the import parameters to upload notebook contents held in memory
+        :param content: raw bytes of the notebook in the configured file format
+        :param nb_full_path: full destination path, e.g. /Users/foo@db.com/bar.dbc . Includes extension / type
+        """
         (nb_path_dest, nb_type) = os.path.splitext(nb_full_path)
         in_args = {
-            "content": base64.encodebytes(fp.read()).decode('utf-8'),
+            "content": base64.encodebytes(content).decode('utf-8'),
             "path": nb_path_dest,
             "format": self.get_file_format()
         }
@@ -332,11 +344,15 @@ class WorkspaceClient(dbclient):
                     workspace_dir_error_logger.exception(e)
 
 
-    def download_notebooks(self, ws_log_file='user_workspace.log', ws_dir='artifacts/', num_parallel=4):
+    def download_notebooks(self, ws_log_file='user_workspace.log', ws_dir='artifacts/', num_parallel=4,
+                           baseline_dir=None, deleted_log_file='deleted_notebooks.log'):
         """
         Loop through all notebook paths in the logfile and download individual notebooks
         :param ws_log_file: logfile for all notebook paths in the workspace
         :param ws_dir: export directory to store all notebooks
+        :param baseline_dir: export dir of a previous session. If set, notebooks whose modified_at matches the
+        baseline listing are hard-linked from the baseline ws_dir instead of downloaded, and paths that no longer
+        exist are written to deleted_log_file
         :return: None
         """
         checkpoint_notebook_set = self._checkpoint_service.get_checkpoint_key_set(
@@ -347,16 +363,89 @@ class WorkspaceClient(dbclient):
         num_notebooks = 0
         if not os.path.exists(ws_log):
             raise Exception("Run --workspace first to download full log of all notebooks.")
+        baseline_items = self.load_baseline_modified_at(baseline_dir, ws_log_file) if baseline_dir else {}
+        current_paths = set()
+        num_linked = 0
+        num_checkpointed = 0
         with open(ws_log, "r") as fp:
             # notebook log metadata file now contains object_id to help w/ ACL exports
             # pull the path from the data to download the individual notebook contents
             with ThreadPoolExecutor(max_workers=num_parallel) as executor:
-                futures = [executor.submit(self.download_notebook_helper, notebook_data, checkpoint_notebook_set, notebook_error_logger, self.get_export_dir() + ws_dir) for notebook_data in fp]
+                futures = []
+                for notebook_data in fp:
+                    notebook = json.loads(notebook_data)
+                    current_paths.add(notebook['path'])
+                    if checkpoint_notebook_set.contains(notebook['path']):
+                        # exported by an interrupted run of this session, it is neither downloaded nor linked again
+                        num_checkpointed += 1
+                        continue
+                    modified_at = notebook.get('modified_at', None)
+                    if modified_at is not None and baseline_items.get(notebook['path']) == modified_at and \
+                            self.link_unchanged_notebook(notebook['path'], baseline_dir + ws_dir,
+                                                         self.get_export_dir() + ws_dir, checkpoint_notebook_set):
+                        num_linked += 1
+                        continue
+                    futures.append(executor.submit(self.download_notebook_helper, notebook_data, checkpoint_notebook_set, notebook_error_logger, self.get_export_dir() + ws_dir))
                 for future in concurrent.futures.as_completed(futures):
                     dl_resp = future.result()
                     if 'error' not in dl_resp:
                         num_notebooks += 1
-        return num_notebooks
+        if baseline_dir:
+            deleted_paths = sorted(set(baseline_items.keys()) - current_paths)
+            with open(self.get_export_dir() + deleted_log_file, 'w') as deleted_fp:
+                for deleted_path in deleted_paths:
+                    deleted_fp.write(json.dumps({'path': deleted_path}) + '\n')
+            logging.info(f"Incremental export against {baseline_dir}: {num_notebooks} notebooks downloaded, "
+                         f"{num_linked} unchanged notebooks linked, {num_checkpointed} notebooks already exported, "
+                         f"{len(deleted_paths)} deleted notebooks logged to {deleted_log_file}")
+        return num_notebooks + num_linked + num_checkpointed
+
+    @staticmethod
+    def load_baseline_modified_at(baseline_dir, ws_log_file='user_workspace.log'):
+        """
+        read the notebook listing of a previous session
+        :return: dict of notebook path -> modified_at. The modified_at of a notebook is None when the baseline
+        listing predates modified_at logging
+        """
+        baseline_log = baseline_dir + ws_log_file
+        if not os.path.exists(baseline_log):
+            raise ValueError(f"Baseline notebook listing {baseline_log} does not exist.")
+        baseline_items = {}
+        with open(baseline_log, 'r') as fp:
+            for notebook_data in fp:
+                notebook = json.loads(notebook_data)
+                baseline_items[notebook['path']] = notebook.get('modified_at', None)
+        return baseline_items
+
+    def _notebook_file_extensions(self):
+        file_format = self.get_file_format()
+        if file_format == 'SOURCE':
+            return ['py', 'scala', 'sql', 'r']
+        if file_format == 'JUPYTER':
+            return ['ipynb']
+        return [file_format.lower()]
+
+    def link_unchanged_notebook(self, notebook_path, baseline_artifacts_dir, artifacts_dir, checkpoint_notebook_set):
+        """
+        hard-link a notebook exported by a previous session into this session's artifacts dir
+        falls back to a copy if the sessions live on different filesystems
+        :return: True if the notebook was linked, False if the baseline has no file for the current notebook format
+        """
+        for file_ext in self._notebook_file_extensions():
+            baseline_file = baseline_artifacts_dir.rstrip('/') + notebook_path + '.' + file_ext
+            if not os.path.exists(baseline_file):
+                continue
+            save_filename = artifacts_dir.rstrip('/') + notebook_path + '.' + file_ext
+            os.makedirs(os.path.dirname(save_filename), exist_ok=True)
+            if os.path.exists(save_filename):
+                os.remove(save_filename)
+            try:
+                os.link(baseline_file, save_filename)
+            except OSError:
+                shutil.copy2(baseline_file, save_filename)
+            checkpoint_notebook_set.write(notebook_path)
+            return True
+        return False
 
     def download_notebook_helper(self, notebook_data, checkpoint_notebook_set, error_logger, export_dir='artifacts/'):
         """
@@ -395,6 +484,156 @@ class WorkspaceClient(dbclient):
         checkpoint_notebook_set.write(notebook_path)
         return {'path': notebook_path}
 
+    def pass_through_notebooks(self, dst_ws_c, ws_log_file='user_workspace.log', num_parallel=4, queue_size=64,
+                               archive_missing=False, local_dir=None):
+        """
+        Stream the notebooks in the logfile from this workspace into the destination workspace without landing them
+        on local disk. Notebooks are exported and imported by separate thread pools, each bound by the rate limit of
+        its own client, and at most queue_size notebooks are held in memory between the two.
+        Exports are checkpointed only when local_dir is set, i.e. when the notebook landed on disk and a resumed run
+        can import it from there. Imports are checkpointed by source notebook path.
+        :param dst_ws_c: WorkspaceClient of the destination workspace
+        :param archive_missing: whether to move notebooks of users missing in the destination to /Archive/
+        :param local_dir: optional directory to also save the exported notebooks to, e.g. the session artifacts/
+        :return: number of notebooks imported
+        """
+        ws_log = self.get_export_dir() + ws_log_file
+        if not os.path.exists(ws_log):
+            raise Exception("Run --workspace first to download full log of all notebooks.")
+        checkpoint_export_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_EXPORT, wmconstants.WORKSPACE_NOTEBOOK_OBJECT)
+        checkpoint_import_set = self._checkpoint_service.get_checkpoint_key_set(
+            wmconstants.WM_IMPORT, wmconstants.WORKSPACE_NOTEBOOK_OBJECT)
+        export_error_logger = logging_utils.get_error_logger(
+            wmconstants.WM_EXPORT, wmconstants.WORKSPACE_NOTEBOOK_OBJECT, self.get_export_dir())
+        import_error_logger = logging_utils.get_error_logger(
+            wmconstants.WM_IMPORT, wmconstants.WORKSPACE_NOTEBOOK_OBJECT, self.get_export_dir())
+        in_flight = threading.BoundedSemaphore(queue_size)
+        users_exist = {}
+        # dir -> future of whether mkdirs of the dir succeeded, so that each dir is created once
+        created_dirs = {}
+        created_dirs_lock = threading.Lock()
+        import_futures = []
+
+        def _mkdirs(upload_dir):
+            while True:
+                with created_dirs_lock:
+                    mkdirs_future = created_dirs.get(upload_dir)
+                    if mkdirs_future is None:
+                        created_dirs[upload_dir] = concurrent.futures.Future()
+                        break
+                # another import is creating the dir, the notebook is imported once the dir exists
+                if mkdirs_future.result():
+                    return
+            mkdirs_error = True
+            try:
+                resp_mkdirs = dst_ws_c.post(WS_MKDIRS, {'path': upload_dir})
+                mkdirs_error = 'error_code' in resp_mkdirs
+                if mkdirs_error:
+                    resp_mkdirs['path'] = upload_dir
+                    logging_utils.log_response_error(import_error_logger, resp_mkdirs)
+            finally:
+                with created_dirs_lock:
+                    mkdirs_future = created_dirs[upload_dir]
+                    # the dir is marked as created only once mkdirs succeeded, a failed dir is retried by the next import
+                    if mkdirs_error:
+                        created_dirs.pop(upload_dir)
+                mkdirs_future.set_result(not mkdirs_error)
+
+        def _read_local_notebook(notebook_path):
+            for file_ext in self._notebook_file_extensions():
+                local_file = local_dir.rstrip('/') + notebook_path + '.' + file_ext
+                if os.path.exists(local_file):
+                    with open(local_file, 'rb') as fp:
+                        return fp.read(), file_ext
+            return None, None
+
+        def _import_helper(notebook_path, content, file_type):
+            try:
+                upload_path = dst_ws_c.get_pass_through_path(notebook_path, archive_missing, users_exist)
+                if upload_path is None:
+                    logging.info(f"User {self.get_user(notebook_path)} is missing in the destination workspace. "
+                                 f"Re-run with --archive-missing to import {notebook_path} into /Archive/")
+                    return False
+                upload_dir = os.path.dirname(upload_path)
+                if upload_dir != '/' and not self.is_user_ws_root(upload_dir):
+                    _mkdirs(upload_dir)
+                nb_input_args = dst_ws_c.get_import_args(content, upload_path + '.' + file_type)
+                if self.is_verbose():
+                    logging.info("Uploading: {0}".format(nb_input_args['path']))
+                resp_upload = dst_ws_c.post(WS_IMPORT, nb_input_args)
+                if 'error_code' in resp_upload:
+                    resp_upload['path'] = upload_path
+                    logging_utils.log_response_error(import_error_logger, resp_upload)
+                    return False
+                checkpoint_import_set.write(notebook_path)
+                return True
+            finally:
+                in_flight.release()
+
+        def _export_helper(notebook_path):
+            handed_over = False
+            try:
+                if checkpoint_import_set.contains(notebook_path):
+                    return
+                content, file_type = None, None
+                if local_dir and checkpoint_export_set.contains(notebook_path):
+                    content, file_type = _read_local_notebook(notebook_path)
+                if content is None:
+                    if self.is_verbose():
+                        logging.info("Downloading: {0}".format(notebook_path))
+                    resp = self.get(WS_EXPORT, {'path': notebook_path, 'format': self.get_file_format()})
+                    if 'error' in resp or 'error_code' in resp:
+                        resp['path'] = notebook_path
+                        logging_utils.log_response_error(export_error_logger, resp)
+                        return
+                    content, file_type = base64.b64decode(resp['content']), resp.get('file_type')
+                    if local_dir:
+                        save_filename = local_dir.rstrip('/') + notebook_path + '.' + file_type
+                        os.makedirs(os.path.dirname(save_filename), exist_ok=True)
+                        with open(save_filename, "wb") as f:
+                            f.write(content)
+                        checkpoint_export_set.write(notebook_path)
+                import_futures.append(import_executor.submit(_import_helper, notebook_path, content, file_type))
+                handed_over = True
+            finally:
+                if not handed_over:
+                    in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=num_parallel) as import_executor:
+            with ThreadPoolExecutor(max_workers=num_parallel) as export_executor:
+                export_futures = []
+                with open(ws_log, 'r') as fp:
+                    for notebook_data in fp:
+                        # blocks while queue_size notebooks are exported but not imported yet
+                        in_flight.acquire()
+                        export_futures.append(
+                            export_executor.submit(_export_helper, json.loads(notebook_data)['path']))
+                concurrent.futures.wait(export_futures, return_when="FIRST_EXCEPTION")
+                propagate_exceptions(export_futures)
+            concurrent.futures.wait(import_futures, return_when="FIRST_EXCEPTION")
+            propagate_exceptions(import_futures)
+        num_imported = sum(1 for future in import_futures if future.result())
+        logging.info(f"Passed through {num_imported} notebooks into {dst_ws_c.get_url()}")
+        return num_imported
+
+    def get_pass_through_path(self, notebook_path, archive_missing, users_exist):
+        """
+        map a source notebook path to its path in this workspace
+        :param users_exist: cache of user name -> whether the user home exists in this workspace
+        :return: the path to import to, or None if the user is missing and archive_missing is not set
+        """
+        if not self.is_user_ws_item(notebook_path):
+            return notebook_path
+        ws_user = self.get_user(notebook_path)
+        if ws_user not in users_exist:
+            users_exist[ws_user] = self.does_user_exist(ws_user)
+        if users_exist[ws_user]:
+            return notebook_path
+        if archive_missing:
+            return notebook_path.replace('Users', 'Archive', 1)
+        return None
+
     def filter_workspace_items(self, item_list, item_type):
         """
         Helper function to filter on different workspace types.
@@ -406,8 +645,14 @@ class WorkspaceClient(dbclient):
         if item_type not in supported_types:
             raise ValueError('Unsupported type provided: {0}.\n. Supported types: {1}'.format(item_type,
                                                                                               str(supported_types)))
-        filtered_list = list(self.my_map(lambda y: {'path': y.get('path', None),
-                                                    'object_id': y.get('object_id', None)},
+        def _filter_item(item):
+            filtered_item = {'path': item.get('path', None), 'object_id': item.get('object_id', None)}
+            # modified_at is used to detect unchanged notebooks in incremental exports
+            if 'modified_at' in item:
+                filtered_item['modified_at'] = item['modified_at']
+            return filtered_item
+
+        filtered_list = list(self.my_map(_filter_item,
                                          filter(lambda x: x.get('object_type', None) == item_type, item_list)))
         return filtered_list
 
@@ -482,8 +727,9 @@ class WorkspaceClient(dbclient):
             # should be no notebooks, but lets filter and can check later
             notebooks = self.filter_workspace_items(items, 'NOTEBOOK')
             libraries = self.filter_workspace_items(items, 'LIBRARY')
-            # only get user list if we are filtering by group
-            ws_users = self.get('/preview/scim/v2/Users').get('Resources', None) if self.groups_to_keep else []
+            # only resolve the users to keep if we are filtering by group
+            users_to_keep = get_group_membership_index(self).users_in_groups(self.groups_to_keep) \
+                if self.groups_to_keep else set()
             for x in notebooks:
                 # notebook objects has path and object_id
                 nb_path = x.get('path')
@@ -491,8 +737,7 @@ class WorkspaceClient(dbclient):
                 # if the current user is not in kept groups, skip this nb
                 if self.groups_to_keep and self.is_user_ws_item(nb_path):
                     nb_user = self.get_user(nb_path)
-                    user_groups = [group.get("display") for user in ws_users if user.get("emails")[0].get("value") == nb_user for group in user.get("groups")]
-                    if not set(user_groups).intersection(set(self.groups_to_keep)):
+                    if nb_user not in users_to_keep:
                         if self.is_verbose():
                             logging.info("Skipped notebook path due to group exclusion: {0}".format(x.get('path')))
                         continue
@@ -509,8 +754,7 @@ class WorkspaceClient(dbclient):
                 # if the current user is not in kept groups, skip this lib
                 if self.groups_to_keep and self.is_user_ws_item(lib_path):
                     nb_user = self.get_user(lib_path)
-                    user_groups = [group.get("display") for user in ws_users if user.get("emails")[0].get("value") == nb_user for group in user.get("groups")]
-                    if not set(user_groups).intersection(set(self.groups_to_keep)):
+                    if nb_user not in users_to_keep:
                         if self.is_verbose():
                             logging.info("Skipped library path due to group exclusion: {0}".format(lib_path))
                         continue
@@ -538,9 +782,7 @@ class WorkspaceClient(dbclient):
                     # if the current user is not in kept groups, skip this dir
                     if self.groups_to_keep and self.is_user_ws_item(dir_path):
                         dir_user = self.get_user(dir_path)
-                        user_groups = [group.get("display") for user in ws_users if
-                                       user.get("emails")[0].get("value") == dir_user for group in user.get("groups")]
-                        if not set(user_groups).intersection(set(self.groups_to_keep)):
+                        if dir_user not in users_to_keep:
                             if self.is_verbose():
                                 logging.info("Skipped directory due to group exclusion: {0}".format(dir_path))
                             continue
@@ -565,18 +807,22 @@ class WorkspaceClient(dbclient):
         obj_id = resp.get('object_id', None)
         return obj_id
 
-    def log_acl_to_file(self, artifact_type, read_log_filename, writer, error_logger, num_parallel):
+    def log_acl_to_file(self, artifact_type, read_log_filename, writer, error_logger, num_parallel,
+                        inherited_writer=None):
         """
         generic function to log the notebook/directory ACLs to specific file names
         :param artifact_type: set('notebooks', 'directories') ACLs to be logged
         :param read_log_filename: the list of the notebook paths / object ids
         :param write_log_filename: output file to store object_id acls
         :param error_logger: logger to log errors
+        :param inherited_writer: if set, objects whose ACLs are fully inherited are written here as
+        {path, object_id} instead of to writer, since there is nothing to apply for them on import
+        :return: number of objects pruned to the inherited log
         """
         read_log_path = self.get_export_dir() + read_log_filename
         if not os.path.exists(read_log_path):
             logging.info(f"No log exists for {read_log_path}. Skipping ACL export ...")
-            return
+            return 0
 
         def _acl_log_helper(json_data):
             data = json.loads(json_data)
@@ -592,13 +838,38 @@ class WorkspaceClient(dbclient):
             if logging_utils.log_response_error(error_logger, acl_resp):
                 return
             acl_resp.pop('http_status_code')
+            if inherited_writer and not self.has_explicit_acl(acl_resp.get('access_control_list')):
+                inherited_writer.write(json.dumps({'path': acl_resp['path'],
+                                                   'object_id': acl_resp.get('object_id')}) + '\n')
+                return True
             writer.write(json.dumps(acl_resp) + '\n')
+            return False
 
         with open(read_log_path, 'r') as read_fp:
             with ThreadPoolExecutor(max_workers=num_parallel) as executor:
                 futures = [executor.submit(_acl_log_helper, json_data) for json_data in read_fp]
                 concurrent.futures.wait(futures, return_when="FIRST_EXCEPTION")
                 propagate_exceptions(futures)
+        return sum(1 for future in futures if future.result())
+
+    def _log_acls_with_pruning(self, artifact_type, read_log_filename, acl_log_filename, object_type, num_parallel):
+        """
+        log the ACLs of an artifact type, pruning objects with fully inherited permissions into
+        {acl_log_filename without .log}_inherited.log
+        :return: number of pruned objects
+        """
+        error_logger = logging_utils.get_error_logger(wmconstants.WM_EXPORT, object_type, self.get_export_dir())
+        inherited_log_filename = acl_log_filename.replace('.log', '_inherited.log')
+        acl_writer = ThreadSafeWriter(self.get_export_dir() + acl_log_filename, "w")
+        inherited_writer = ThreadSafeWriter(self.get_export_dir() + inherited_log_filename, "w")
+        try:
+            num_pruned = self.log_acl_to_file(artifact_type, read_log_filename, acl_writer, error_logger,
+                                              num_parallel, inherited_writer)
+        finally:
+            acl_writer.close()
+            inherited_writer.close()
+        logging.info(f"Pruned {num_pruned} {artifact_type} with inherited-only permissions to {inherited_log_filename}")
+        return num_pruned
 
     def log_all_workspace_acls(self, workspace_log_file='user_workspace.log',
                                dir_log_file='user_dirs.log',
@@ -606,6 +877,7 @@ class WorkspaceClient(dbclient):
                                num_parallel=4):
         """
         loop through all notebooks and directories to store their associated ACLs
+        notebooks and directories that only inherit permissions are pruned to acl_*_inherited.log
         :param workspace_log_file: input file for user notebook listing
         :param dir_log_file: input file for user directory listing
         :param repo_log_file: input file for repo listing
@@ -613,27 +885,20 @@ class WorkspaceClient(dbclient):
         # define log file names for notebooks, folders, and libraries
         logging.info("Exporting the notebook permissions")
         start = timer()
-        acl_notebooks_error_logger = logging_utils.get_error_logger(
-            wmconstants.WM_EXPORT, wmconstants.WORKSPACE_NOTEBOOK_ACL_OBJECT, self.get_export_dir())
-        acl_notebooks_writer = ThreadSafeWriter(self.get_export_dir() + "acl_notebooks.log", "w")
-        try:
-            self.log_acl_to_file('notebooks', workspace_log_file, acl_notebooks_writer, acl_notebooks_error_logger, num_parallel)
-        finally:
-            acl_notebooks_writer.close()
+        num_pruned = self._log_acls_with_pruning('notebooks', workspace_log_file, 'acl_notebooks.log',
+                                                 wmconstants.WORKSPACE_NOTEBOOK_ACL_OBJECT, num_parallel)
         end = timer()
         logging.info("Complete Notebook ACLs Export Time: " + str(timedelta(seconds=end - start)))
 
         logging.info("Exporting the directories permissions")
         start = timer()
-        acl_directory_error_logger = logging_utils.get_error_logger(
-            wmconstants.WM_EXPORT, wmconstants.WORKSPACE_DIRECTORY_ACL_OBJECT, self.get_export_dir())
-        acl_directory_writer = ThreadSafeWriter(self.get_export_dir() + "acl_directories.log", "w")
-        try:
-            self.log_acl_to_file('directories', dir_log_file, acl_directory_writer, acl_directory_error_logger, num_parallel)
-        finally:
-            acl_directory_writer.close()
+        num_pruned += self._log_acls_with_pruning('directories', dir_log_file, 'acl_directories.log',
+                                                  wmconstants.WORKSPACE_DIRECTORY_ACL_OBJECT, num_parallel)
         end = timer()
         logging.info("Complete Directories ACLs Export Time: " + str(timedelta(seconds=end - start)))
+        # each pruned object saves a get-status and a permissions PATCH call during import
+        logging.info(f"Pruned {num_pruned} objects with inherited-only ACLs, "
+                     f"avoiding {num_pruned * 2} API calls during import")
 
         logging.info("Exporting the repo permissions")
         start = timer()
@@ -650,7 +915,7 @@ class WorkspaceClient(dbclient):
 
     @cached_property
     def service_principal_app_id_mapping(self):
-        return ScimClient.get_service_principal_app_id_mapping(self.get_export_dir())
+        return get_identity_directory(self).service_principal_app_ids()
 
     def apply_acl_on_object(self, acl_str, error_logger, checkpoint_key_set):
         """
@@ -673,6 +938,13 @@ class WorkspaceClient(dbclient):
                 checkpoint_key_set.write(obj_path)
                 return
 
+            # ACLs exported before inherited entries were pruned still carry them; skip these before
+            # spending a get-status call on the destination
+            if not self.has_explicit_acl(object_acl.get('access_control_list')):
+                logging.info(f"Only inherited permissions for path: {obj_path}. Skipping..")
+                checkpoint_key_set.write(obj_path)
+                return
+
             if self.is_user_ws_item(obj_path):
                 ws_user = self.get_user(obj_path)
                 if not self.does_user_exist(ws_user):
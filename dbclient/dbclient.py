@@ -11,6 +11,9 @@ from requests.packages.urllib3 import Retry
 import threading
 import logging_utils
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading_utils import RateLimiter
 
 global pprint_j
 
@@ -49,6 +52,9 @@ class dbclient:
     # 502: Bad Gateway
     http_error_codes = [401, 500, 502] + http_retry_codes
 
+    # number of resources requested per page of a SCIM listing
+    scim_page_size = 100
+
     def __init__(self, configs):
         self._profile = configs['profile']
         self._token = ''
@@ -68,6 +74,10 @@ class dbclient:
         self._retry_total = configs['retry_total']
         self._retry_backoff = configs['retry_backoff']
         self._timeout = configs['timeout']
+        self._num_parallel = configs.get('num_parallel', 4)
+        # optional client side limit on the requests sent to this workspace, shared by all threads of the client
+        max_requests_per_second = configs.get('max_requests_per_second', 0)
+        self._rate_limiter = RateLimiter(max_requests_per_second) if max_requests_per_second else None
         if configs['debug']:
             logging.getLogger("urllib3").setLevel(logging.DEBUG)
         if self._verify_ssl:
@@ -194,10 +204,15 @@ class dbclient:
             self._local.session = session
         return self._local.session
 
+    def _throttle(self):
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
+
     def get(self, endpoint, json_params=None, version='2.0', print_json=False, do_not_throw=False):
         if version:
             ver = version
         while True:
+            self._throttle()
             full_endpoint = self._url + '/api/{0}'.format(ver) + endpoint
             if self.is_verbose():
                 print("Get: {0}".format(full_endpoint))
@@ -231,6 +246,7 @@ class dbclient:
         if version:
             ver = version
         while True:
+            self._throttle()
             full_endpoint = self._url + '/api/{0}'.format(ver) + endpoint
             if self.is_verbose():
                 print("{0}: {1}".format(http_type, full_endpoint))
@@ -304,6 +320,42 @@ class dbclient:
             to_return.append(F(elem))
         return to_return
 
+    def scim_iterator(self, endpoint, params=None, num_parallel=None):
+        """
+        Iterate over all resources of a SCIM list endpoint, e.g. /preview/scim/v2/Users, page by page.
+        The first page returns the total number of resources, after which the remaining pages are fetched by
+        num_parallel threads. Pages are yielded in order, and at most 2 * num_parallel of them are held in memory.
+        :param params: extra query params, e.g. {'attributes': 'id,userName'} or {'excludedAttributes': 'roles'}
+        :return: generator of resource json objects
+        """
+        params = dict(params) if params else {}
+        num_parallel = num_parallel if num_parallel else self._num_parallel
+
+        def _get_page(start_index, count):
+            page = self.get(endpoint, dict(params, startIndex=start_index, count=count))
+            if logging_utils.check_error(page):
+                raise Exception(f"Error: SCIM listing of {endpoint} failed at startIndex {start_index}\n{page}")
+            return page.get('Resources', [])
+
+        first_page = self.get(endpoint, dict(params, startIndex=1, count=self.scim_page_size))
+        if logging_utils.check_error(first_page):
+            raise Exception(f"Error: SCIM listing of {endpoint} failed\n{first_page}")
+        resources = first_page.get('Resources', [])
+        yield from resources
+        total_results = first_page.get('totalResults', len(resources))
+        # the server may return fewer resources per page than requested
+        page_size = len(resources)
+        if not page_size or total_results <= page_size:
+            return
+        with ThreadPoolExecutor(max_workers=num_parallel) as executor:
+            pending_pages = deque()
+            for start_index in range(1 + page_size, total_results + 1, page_size):
+                pending_pages.append(executor.submit(_get_page, start_index, page_size))
+                if len(pending_pages) >= 2 * num_parallel:
+                    yield from pending_pages.popleft().result()
+            while pending_pages:
+                yield from pending_pages.popleft().result()
+
     def whoami(self):
         """
         get current user userName from SCIM API
@@ -352,6 +404,23 @@ class dbclient:
                 acls_list.append(update_admin)
         return acls_list
 
+    @staticmethod
+    def has_explicit_acl(full_acl_list):
+        """
+        Check whether an ACL listing has any entry that build_acl_args would apply on import.
+        Objects where every entry is inherited (or only grants the admins group) carry nothing to migrate.
+        :param full_acl_list: access_control_list from the permissions API
+        :return: True if at least one entry is explicitly set on the object
+        """
+        for member in full_acl_list or []:
+            all_permissions = member.get('all_permissions', [{}])[0]
+            if all_permissions.get('inherited'):
+                continue
+            if member.get('group_name') == 'admins':
+                continue
+            return True
+        return False
+
     def set_export_dir(self, dir_location):
         self._export_dir = dir_location
 
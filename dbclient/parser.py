@@ -443,6 +443,11 @@ def build_client_config(profile, url, token, args):
     config['retry_total'] = args.retry_total
     config['retry_backoff'] = args.retry_backoff
     config['map_service_principals_by_name'] = args.map_service_principals_by_name
+    # these options only exist in the migration pipeline so we check for existence
+    if 'max_requests_per_second' in args:
+        config['max_requests_per_second'] = args.max_requests_per_second
+    if 'group_member_chunk_size' in args:
+        config['group_member_chunk_size'] = args.group_member_chunk_size
     return config
 
 
@@ -556,6 +561,53 @@ def get_pipeline_parser() -> argparse.ArgumentParser:
     parser.add_argument('--exclude-work-item-prefixes', nargs='+', type=str, default=[],
                         help='List of prefixes to skip export for log_all_workspace_items')
 
+    parser.add_argument('--incremental-from-session', action='store', default='',
+                        help='Session of a previous export used as baseline. Only notebooks that are new or whose '
+                             'modified_at changed are downloaded; unchanged ones are hard-linked from the baseline. '
+                             'Only used for --export-pipeline.')
+
+    parser.add_argument('--delta-from-session', action='store', default='',
+                        help='Session that was imported last. Only the groups, notebooks, workspace ACLs, clusters '
+                             'and jobs that were added or changed since that session are imported. '
+                             'Only used for --import-pipeline.')
+
+    parser.add_argument('--sync', action='store_true', default=False,
+                        help='Keep exporting the changes from --profile and importing them into '
+                             '--destination-profile every --sync-interval-minutes, e.g. during a cutover window. '
+                             'The first cycle imports the changes since --delta-from-session, later cycles continue '
+                             'from the last synced session.')
+
+    parser.add_argument('--destination-profile', action='store', default='',
+                        help='Profile of the destination workspace. Only used for --sync and --pass-through-notebooks.')
+
+    parser.add_argument('--sync-interval-minutes', type=float, default=30.0,
+                        help='Minutes between the start of two sync cycles. Only used for --sync.')
+
+    parser.add_argument('--sync-cycles', type=int, default=0,
+                        help='Number of sync cycles to run before exiting, 0 to run until interrupted. '
+                             'Only used for --sync.')
+
+    parser.add_argument('--pass-through-notebooks', action='store_true', default=False,
+                        help='Stream notebooks from --profile into --destination-profile without landing them on '
+                             'local disk. Users and groups must already exist in the destination workspace.')
+
+    parser.add_argument('--keep-local-artifacts', action='store_true', default=False,
+                        help='Also save the notebooks streamed by --pass-through-notebooks to the artifacts/ dir of '
+                             'the session, so that a resumed session does not export them again.')
+
+    parser.add_argument('--pass-through-queue-size', type=int, default=64,
+                        help='Maximum number of notebooks held in memory between export and import. '
+                             'Only used for --pass-through-notebooks.')
+
+    parser.add_argument('--max-requests-per-second', type=float, default=0,
+                        help='Limit of API requests per second sent to --profile, 0 for no limit.')
+
+    parser.add_argument('--destination-max-requests-per-second', type=float, default=0,
+                        help='Limit of API requests per second sent to --destination-profile, 0 for no limit.')
+
+    parser.add_argument('--group-member-chunk-size', type=int, default=500,
+                        help='Maximum number of members added to a group by a single request during group import.')
+
     parser.add_argument('--groups-to-keep', nargs='+', type=str, default=[],
                         help='List of groups (and therefore users/notebooks) to keep if specified')
 
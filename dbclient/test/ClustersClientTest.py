@@ -1,7 +1,9 @@
 import json
 import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock
+from checkpoint_service import CheckpointService
 from dbclient import ClustersClient
 from dbclient.test.TestUtils import TEST_CONFIG
 
@@ -162,6 +164,113 @@ class TestClustersClient(unittest.TestCase):
         self.assertEqual(expected_user_ids, output_user_ids)
         self.assertEqual(expected_cluster_ids, output_cluster_ids)
 
+    def test_import_cluster_configs_in_parallel(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        with open(export_dir + 'clusters.log', 'w') as fp:
+            for i in range(6):
+                fp.write(json.dumps({'cluster_id': f'old-{i}', 'cluster_name': f'c{i}', 'creator_user_name': 'a@b.com',
+                                     'pinned_by_user_name': 'a@b.com'}) + '\n')
+        with open(export_dir + 'acl_clusters.log', 'w') as fp:
+            for i in range(6):
+                fp.write(json.dumps({'object_id': f'/clusters/old-{i}', 'cluster_name': f'c{i}',
+                                     'access_control_list': []}) + '\n')
+        config = dict(TEST_CONFIG, export_dir=export_dir)
+        clustersClient = ClustersClient(config, CheckpointService(config))
+        clustersClient.get_cluster_list = MagicMock(return_value=[])
+        clustersClient.get_new_policy_id_dict = MagicMock(return_value={})
+        clustersClient._log_cluster_ids_and_original_creators = MagicMock()
+        clustersClient.build_acl_args = MagicMock(return_value=[])
+        clustersClient.put = MagicMock(return_value={'http_status_code': 200})
+        clustersClient.post = MagicMock(side_effect=lambda endpoint, json_params: {
+            'cluster_id': 'new-' + json_params['cluster_name'] if endpoint == '/clusters/create'
+            else json_params['cluster_id'], 'http_status_code': 200})
+
+        clustersClient.import_cluster_configs(num_parallel=3)
+
+        calls_by_cluster = {}
+        for c in clustersClient.post.call_args_list:
+            cluster = 'new-' + c.args[1]['cluster_name'] if c.args[0] == '/clusters/create' else c.args[1]['cluster_id']
+            calls_by_cluster.setdefault(cluster, []).append(c.args[0])
+        # each cluster is created, then stopped, then pinned
+        self.assertEqual(calls_by_cluster, {f'new-c{i}': ['/clusters/create', '/clusters/delete', '/clusters/pin']
+                                            for i in range(6)})
+        self.assertEqual(sorted(c.args[0] for c in clustersClient.put.call_args_list),
+                         [f'/preview/permissions/clusters/new-c{i}' for i in range(6)])
+
+    def test_start_cluster_by_name_waits_for_prewarmed_cluster(self):
+        config = dict(TEST_CONFIG, url='https://prewarm.cloud.databricks.com')
+        clustersClient = ClustersClient(config, CheckpointService(config))
+        clustersClient.get_cluster_by_name = MagicMock(
+            return_value={'cluster_id': 'c1', 'cluster_name': 'migration', 'state': 'TERMINATED'})
+        clustersClient.post = MagicMock(return_value={'http_status_code': 200})
+        clustersClient.wait_for_cluster = MagicMock(return_value='c1')
+        clustersClient.get = MagicMock(return_value={'cluster_id': 'c1', 'state': 'RUNNING'})
+
+        future = clustersClient.prewarm_cluster(cluster_name='migration')
+        self.assertIs(clustersClient.prewarm_cluster(cluster_name='migration'), future)
+        self.assertEqual(future.result(), 'c1')
+        self.assertEqual(clustersClient.start_cluster_by_name('migration'), 'c1')
+        clustersClient.post.assert_called_once_with('/clusters/start', {'cluster_id': 'c1'})
+
+        # a prewarmed cluster that terminated since is started again
+        clustersClient.get = MagicMock(return_value={'cluster_id': 'c1', 'state': 'TERMINATED'})
+        self.assertEqual(clustersClient.start_cluster_by_name('migration'), 'c1')
+        self.assertEqual(clustersClient.post.call_count, 2)
+
+    def test_wait_for_cluster(self):
+        clustersClient = ClustersClient(TEST_CONFIG, CheckpointService(TEST_CONFIG))
+        clustersClient.CLUSTER_POLLING_INTERVAL_SECONDS = 0.01
+        states = iter(['PENDING', 'PENDING', 'RUNNING'])
+        clustersClient.get = MagicMock(side_effect=lambda endpoint, json_params=None: {'state': next(states)})
+        self.assertEqual(clustersClient.wait_for_cluster('c1'), 'c1')
+        self.assertEqual(clustersClient.get.call_count, 3)
+
+        clustersClient.get = MagicMock(return_value={'state': 'TERMINATED'})
+        with self.assertRaises(RuntimeError):
+            clustersClient.wait_for_cluster('c1')
+
+
+    def test_update_cluster_configs_edits_clusters_in_place(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        clusters = [
+            {'cluster_id': 'old1', 'cluster_name': 'c1', 'creator_user_name': 'a@b.com', 'policy_id': 'old_p1',
+             'custom_tags': {'team': 'x'}, 'pinned_by_user_name': 'a@b.com'},
+            {'cluster_id': 'old2', 'cluster_name': 'missing', 'creator_user_name': 'a@b.com'},
+        ]
+        with open(export_dir + 'clusters_changed.log', 'w') as fp:
+            for cluster in clusters:
+                fp.write(json.dumps(cluster) + '\n')
+        config = dict(TEST_CONFIG, export_dir=export_dir, use_checkpoint=True)
+
+        def _new_client():
+            clustersClient = ClustersClient(config, CheckpointService(config))
+            clustersClient.get_cluster_list = MagicMock(return_value=[{'cluster_name': 'c1', 'cluster_id': 'new1'}])
+            clustersClient.get_new_policy_id_dict = MagicMock(return_value={'old_p1': 'new_p1'})
+            clustersClient.post = MagicMock(return_value={'http_status_code': 200})
+            return clustersClient
+        clustersClient = _new_client()
+
+        clustersClient.update_cluster_configs()
+
+        clustersClient.post.assert_called_once_with('/clusters/edit', {
+            'cluster_id': 'new1', 'cluster_name': 'c1', 'policy_id': 'new_p1',
+            'custom_tags': {'team': 'x', 'OriginalCreator': 'a@b.com'}})
+        with open(export_dir + 'app_logs/failed_import_clusters.log') as fp:
+            self.assertIn('Cluster missing does not exist in the new env', fp.read())
+
+        # the edit is checkpointed
+        clustersClient = _new_client()
+        clustersClient.update_cluster_configs()
+        clustersClient.post.assert_not_called()
+
+    def test_adjust_cluster_conf_tags_the_original_creator(self):
+        clustersClient = ClustersClient(TEST_CONFIG, CheckpointService(TEST_CONFIG))
+        self.assertEqual(clustersClient.adjust_cluster_conf({'cluster_name': 'c1', 'creator_user_name': 'a@b.com'}, {}),
+                         {'cluster_name': 'c1', 'custom_tags': {'OriginalCreator': 'a@b.com'}})
+        clustersClient.cleanup_cluster_pool_configs = MagicMock(return_value={'instance_pool_id': 'new_pool'})
+        self.assertEqual(clustersClient.adjust_cluster_conf(
+            {'creator_user_name': 'a@b.com', 'instance_pool_id': 'old_pool'}, {}), {'instance_pool_id': 'new_pool'})
+        clustersClient.cleanup_cluster_pool_configs.assert_called_once_with({'instance_pool_id': 'old_pool'}, 'a@b.com')
 
 if __name__ == '__main__':
     unittest.main()
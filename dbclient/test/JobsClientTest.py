@@ -0,0 +1,189 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from checkpoint_service import CheckpointService
+from dbclient import JobsClient
+from dbclient.test.TestUtils import TEST_CONFIG
+
+
+class TestJobsClient(unittest.TestCase):
+
+    def _mock_jobs_listing(self, jobsClient, jobs_v20, jobs_v21):
+        def _get(endpoint, json_params=None, version='2.0', print_json=False):
+            if version == '2.0':
+                return {'jobs': jobs_v20, 'http_status_code': 200}
+            offset = json_params['offset']
+            return {'jobs': jobs_v21[offset:offset + json_params['limit']],
+                    'has_more': offset + json_params['limit'] < len(jobs_v21), 'http_status_code': 200}
+        jobsClient.get = MagicMock(side_effect=_get)
+
+    def test_get_jobs_list_pages_and_caches(self):
+        jobsClient = JobsClient(TEST_CONFIG, MagicMock())
+        jobsClient.jobs_page_size = 2
+        jobs = [{'job_id': i, 'settings': {'name': f'job{i}', 'format': 'MULTI_TASK', 'tasks': []}} for i in range(5)]
+        self._mock_jobs_listing(jobsClient, jobs, jobs)
+
+        self.assertEqual(list(jobsClient.get_jobs_list()), jobs)
+        listed_offsets = [c.args[1]['offset'] for c in jobsClient.get.call_args_list if c.kwargs['version'] == '2.1']
+        self.assertTrue({0, 2, 4}.issubset(listed_offsets))
+        self.assertEqual(len([c for c in jobsClient.get.call_args_list if c.kwargs['version'] == '2.0']), 1)
+
+        # the listing is reused until it is invalidated
+        num_calls = jobsClient.get.call_count
+        jobsClient.get_jobs_list()
+        self.assertEqual(jobsClient.get.call_count, num_calls)
+        jobsClient.invalidate_jobs_list()
+        jobsClient.get_jobs_list()
+        self.assertGreater(jobsClient.get.call_count, num_calls)
+
+    def test_get_jobs_list_keeps_single_task_jobs_in_the_2_0_format(self):
+        jobsClient = JobsClient(TEST_CONFIG, MagicMock())
+        jobsClient.jobs_page_size = 2
+        single_task_v20 = {'job_id': 1, 'settings': {'name': 'single', 'format': 'SINGLE_TASK',
+                                                     'notebook_task': {'notebook_path': '/nb'},
+                                                     'existing_cluster_id': 'c1'}}
+        multi_task_v20 = {'job_id': 2, 'settings': {'name': 'multi', 'format': 'MULTI_TASK'}}
+        # API 2.1 reports every job as MULTI_TASK with its tasks
+        single_task_v21 = {'job_id': 1, 'settings': {'name': 'single', 'format': 'MULTI_TASK', 'tasks': [
+            {'task_key': 'single', 'notebook_task': {'notebook_path': '/nb'}, 'existing_cluster_id': 'c1'}]}}
+        multi_task_v21 = {'job_id': 2, 'settings': {'name': 'multi', 'format': 'MULTI_TASK', 'tasks': [
+            {'task_key': 'a'}, {'task_key': 'b', 'depends_on': [{'task_key': 'a'}]}]}}
+        created_since_v21 = {'job_id': 3, 'settings': {'name': 'new', 'format': 'MULTI_TASK', 'tasks': []}}
+        self._mock_jobs_listing(jobsClient, [single_task_v20, multi_task_v20],
+                                [single_task_v21, multi_task_v21, created_since_v21])
+
+        self.assertEqual(list(jobsClient.get_jobs_list()), [single_task_v20, multi_task_v21, created_since_v21])
+
+    def test_log_job_configs_resumes_from_checkpoint(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        config = dict(TEST_CONFIG, export_dir=export_dir, use_checkpoint=True)
+        jobs = [{'job_id': i, 'settings': {'name': f'job{i}'}} for i in range(4)]
+
+        def _get(endpoint, json_params=None, version='2.0', print_json=False):
+            if endpoint == '/jobs/list':
+                return {'jobs': [json.loads(json.dumps(job)) for job in jobs], 'has_more': False,
+                        'http_status_code': 200}
+            job_id = int(endpoint.split('/')[-1])
+            if job_id == 3 and not resumed:
+                raise Exception('failed to get ACLs')
+            return {'object_id': f'/jobs/{job_id}', 'access_control_list': [], 'http_status_code': 200}
+
+        resumed = False
+        jobsClient = JobsClient(config, CheckpointService(config))
+        jobsClient.get = MagicMock(side_effect=_get)
+        with self.assertRaises(Exception):
+            jobsClient.log_job_configs(num_parallel=2)
+
+        resumed = True
+        jobsClient = JobsClient(config, CheckpointService(config))
+        jobsClient.get = MagicMock(side_effect=_get)
+        jobsClient.log_job_configs(num_parallel=2)
+        with open(export_dir + 'jobs.log') as fp:
+            logged_ids = sorted(json.loads(line)['job_id'] for line in fp)
+        with open(export_dir + 'acl_jobs.log') as fp:
+            acl_names = sorted(json.loads(line)['job_name'] for line in fp)
+        self.assertEqual(logged_ids, [0, 1, 2, 3])
+        self.assertEqual(acl_names, [f'job{i}:::{i}' for i in range(4)])
+        # only the job that failed is fetched again
+        acl_calls = [c.args[0] for c in jobsClient.get.call_args_list if c.args[0] != '/jobs/list']
+        self.assertEqual(acl_calls, ['/preview/permissions/jobs/3'])
+
+    def test_import_job_configs_uses_job_id_map(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        with open(export_dir + 'jobs.log', 'w') as fp:
+            for i in range(3):
+                fp.write(json.dumps({'job_id': i, 'settings': {'name': f'job{i}:::{i}'}}) + '\n')
+        with open(export_dir + 'acl_jobs.log', 'w') as fp:
+            for i in range(3):
+                fp.write(json.dumps({'object_id': f'/jobs/{i}', 'access_control_list': []}) + '\n')
+        config = dict(TEST_CONFIG, export_dir=export_dir)
+        jobsClient = JobsClient(config, CheckpointService(config))
+        jobsClient.get_cluster_id_mapping = MagicMock(return_value={})
+        jobsClient.get_new_policy_id_dict = MagicMock(return_value={})
+        jobsClient.get_jobs_default_cluster_conf = MagicMock(return_value={})
+        jobsClient.build_acl_args = MagicMock(return_value=[])
+        jobsClient.get = MagicMock()
+        jobsClient.patch = MagicMock(return_value={'http_status_code': 200})
+        failed_once = set()
+
+        def _post(endpoint, json_params):
+            if endpoint == '/jobs/create':
+                old_id = int(json_params['name'].split(':::')[1])
+                # the first job is only created with the default cluster config
+                if old_id == 0 and old_id not in failed_once:
+                    failed_once.add(old_id)
+                    return {'error_code': 'INVALID_PARAMETER_VALUE', 'http_status_code': 400}
+                return {'job_id': 100 + old_id, 'http_status_code': 200}
+            return {'http_status_code': 200}
+        jobsClient.post = MagicMock(side_effect=_post)
+
+        jobsClient.import_job_configs(num_parallel=2)
+
+        with open(export_dir + 'job_id_map.log') as fp:
+            job_id_map = {json.loads(line)['old_id']: json.loads(line)['new_id'] for line in fp}
+        self.assertEqual(job_id_map, {0: '100', 1: '101', 2: '102'})
+        jobsClient.get.assert_not_called()
+        self.assertEqual(sorted(c.args[0] for c in jobsClient.patch.call_args_list),
+                         [f'/preview/permissions/jobs/{100 + i}' for i in range(3)])
+        renames = sorted((c.args[1]['job_id'], c.args[1]['new_settings']['name'])
+                         for c in jobsClient.post.call_args_list if c.args[0] == '/jobs/update')
+        self.assertEqual(renames, [(f'{100 + i}', f'job{i}') for i in range(3)])
+
+
+    def test_update_job_configs_resets_changed_jobs(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        schedule = {'quartz_cron_expression': '0 0 * * * ?', 'pause_status': 'UNPAUSED'}
+        jobs = [
+            {'job_id': 1, 'creator_user_name': 'a@b.com',
+             'settings': {'name': 'job1:::1', 'existing_cluster_id': 'old_c1', 'schedule': schedule}},
+            {'job_id': 2, 'creator_user_name': 'a@b.com',
+             'settings': {'name': 'job2:::2', 'format': 'MULTI_TASK',
+                          'tasks': [{'task_key': 't1', 'existing_cluster_id': 'removed_c'}],
+                          'job_clusters': [{'job_cluster_key': 'jc', 'new_cluster': {'policy_id': 'old_p1'}}]}},
+            # not imported by the previous session
+            {'job_id': 3, 'settings': {'name': 'job3:::3'}},
+        ]
+        with open(export_dir + 'jobs_changed.log', 'w') as fp:
+            for job in jobs:
+                fp.write(json.dumps(job) + '\n')
+        with open(export_dir + 'acl_jobs_changed.log', 'w') as fp:
+            fp.write(json.dumps({'object_id': '/jobs/1', 'access_control_list': []}) + '\n')
+        with open(export_dir + 'job_id_map_base.log', 'w') as fp:
+            for old_id in [1, 2]:
+                fp.write(json.dumps({'old_id': old_id, 'new_id': 100 + old_id}) + '\n')
+        config = dict(TEST_CONFIG, export_dir=export_dir, use_checkpoint=True)
+
+        def _new_client():
+            jobsClient = JobsClient(config, CheckpointService(config))
+            jobsClient.get_cluster_id_mapping = MagicMock(return_value={'old_c1': 'new_c1'})
+            jobsClient.get_new_policy_id_dict = MagicMock(return_value={'old_p1': 'new_p1'})
+            jobsClient.get_jobs_default_cluster_conf = MagicMock(return_value={'spark_version': 'default'})
+            jobsClient.build_acl_args = MagicMock(return_value=[{'user_name': 'a@b.com'}])
+            jobsClient.post = MagicMock(return_value={'http_status_code': 200})
+            jobsClient.patch = MagicMock(return_value={'http_status_code': 200})
+            return jobsClient
+        jobsClient = _new_client()
+
+        jobsClient.update_job_configs()
+
+        resets = {c.args[1]['job_id']: c.args[1]['new_settings'] for c in jobsClient.post.call_args_list}
+        self.assertEqual(sorted(resets), [101, 102])
+        self.assertEqual(resets[101], {'name': 'job1', 'existing_cluster_id': 'new_c1',
+                                       'schedule': dict(schedule, pause_status='PAUSED')})
+        # tasks on a cluster that no longer exists run on the default job cluster
+        self.assertEqual(resets[102]['tasks'], [{'task_key': 't1', 'new_cluster': {'spark_version': 'default'}}])
+        self.assertEqual(resets[102]['job_clusters'][0]['new_cluster'], {'policy_id': 'new_p1'})
+        jobsClient.patch.assert_called_once_with('/preview/permissions/jobs/101',
+                                                 {'access_control_list': [{'user_name': 'a@b.com'}]})
+        with open(export_dir + 'app_logs/failed_import_jobs.log') as fp:
+            self.assertIn('No imported job found for job id 3', fp.read())
+
+        # the resets and ACLs are checkpointed
+        jobsClient = _new_client()
+        jobsClient.update_job_configs()
+        jobsClient.post.assert_not_called()
+        jobsClient.patch.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,13 @@ import os
 import sqlite3
 from dbclient import MLFlowClient
 from dbclient.test.TestUtils import TEST_CONFIG
-from checkpoint_service import CheckpointService, CheckpointKeyMap
+from checkpoint_service import CheckpointService
 import json
+import tempfile
 import concurrent.futures
 from unittest.mock import MagicMock
-from mlflow.entities import Metric, Param, RunTag, RunData, RunInfo, Run
+from mlflow.entities import Metric, Param, RunTag, RunData, RunInfo, Run, Experiment, ExperimentTag
+from mlflow.store.entities.paged_list import PagedList
 
 MLFLOW_TEST_FILE = "dbclient/test/mlflow_runs_test.db"
 
@@ -61,7 +63,7 @@ class MLFlowClientTest(unittest.TestCase):
     def _insert_run_data(self, run):
         con = sqlite3.connect(MLFLOW_TEST_FILE, timeout=30)
         with con:
-            MLFlowClient._save_run_data_to_sql(con, run)
+            con.execute(MLFlowClient.RUNS_INSERT_SQL, MLFlowClient._run_to_sql_row(run))
 
 
     def test_save_run_data_to_sql(self):
@@ -187,33 +189,95 @@ class MLFlowClientTest(unittest.TestCase):
             assert(dict(runs_dict[id].data.params) == fetched_run_params)
             assert(dict(runs_dict[id].data.tags) == fetched_run_tags)
 
-    def test_create_run_and_log_thread_safety(self):
-        checkpoint_service = MagicMock()
-        mlflow_client = MLFlowClient(TEST_CONFIG, checkpoint_service)
+    def test_import_mlflow_runs_imports_parents_first(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        config = dict(TEST_CONFIG, export_dir=export_dir, use_checkpoint=True)
+        mlflow_client = MLFlowClient(config, CheckpointService(config))
+        with open(export_dir + 'mlflow_experiments_id_map.log', 'w') as fp:
+            fp.write(json.dumps({"old_id": "experiment_id", "new_id": "experiment_id_new"}) + "\n")
 
         runs_dict = {}
-        unique_num_runs = 100
-        # Create duplicate run_id runs
-        runs = [self._generate_run(i, runs_dict) for i in range(1, 1 + unique_num_runs)]
-        runs += [self._generate_run(i, runs_dict) for i in range(1, 1 + unique_num_runs - 50)]
-        runs += [self._generate_run(i, runs_dict) for i in range(1, 1 + unique_num_runs)]
-        runs += [self._generate_run(i, runs_dict) for i in range(1, 1 + unique_num_runs - 25)]
-
-        # sort it by the run_id, so that threads have higher chance to access the same run_id during testing.
-        runs = sorted(runs, key=lambda run: run.info.run_id)
-        experiment_id_map = {
-            "experiment_id": "experiment_id_new"
+        runs = [self._generate_run(i, runs_dict) for i in range(1, 6)]
+        # run_id_1 <- run_id_2 <- run_id_3, run_id_1 <- run_id_4, and run_id_5 has a parent that was not exported
+        parents = {"run_id_2": "run_id_1", "run_id_3": "run_id_2", "run_id_4": "run_id_1", "run_id_5": "missing"}
+        con = sqlite3.connect(export_dir + 'mlflow_runs.db')
+        with con:
+            con.execute("CREATE TABLE runs (id TEXT UNIQUE, start_time INT, run_obj TEXT)")
+            for run in reversed(runs):
+                run_obj = self._run_to_dict(run)
+                if run.info.run_id in parents:
+                    run_obj['tags']["mlflow.parentRunId"] = parents[run.info.run_id]
+                con.execute("INSERT INTO runs VALUES (?, ?, ?)", (run.info.run_id, run.info.start_time, json.dumps(run_obj)))
+        con.close()
+
+        imported = []
+
+        def _create_run_and_log_helper(experiment_id, run_id, start_time, metrics, params, tags, artifact_copier, steps_checkpointer):
+            imported.append((run_id, tags.get("mlflow.parentRunId")))
+            return "new_" + run_id
+        mlflow_client._create_run_and_log_helper = MagicMock(side_effect=_create_run_and_log_helper)
+        mlflow_client.import_mlflow_runs(config, num_parallel=2)
+
+        self.assertEqual(sorted(imported[:1]), [("run_id_1", None)])
+        self.assertEqual(sorted(imported[1:3]), [("run_id_2", "new_run_id_1"), ("run_id_4", "new_run_id_1")])
+        self.assertEqual(imported[3:], [("run_id_3", "new_run_id_2")])
+        with open(export_dir + 'mlflow_runs_id_map.log', 'r') as fp:
+            self.assertEqual(len(fp.readlines()), 4)
+
+        # a resumed import skips the runs that are already imported
+        mlflow_client.import_mlflow_runs(config, num_parallel=2)
+        self.assertEqual(len(imported), 4)
+
+    def test_export_mlflow_experiments_pages_and_exports_acls_and_runs(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        config = dict(TEST_CONFIG, export_dir=export_dir)
+        mlflow_client = MLFlowClient(config, CheckpointService(config))
+        pages = {
+            None: PagedList([Experiment("1", "exp1", "", "active", [ExperimentTag("mlflow.experimentType", "MLFLOW_EXPERIMENT")])], "page2"),
+            "page2": PagedList([Experiment("2", "exp2", "", "active", [ExperimentTag("mlflow.experimentType", "NOTEBOOK")])], None),
         }
-        error_logger = None
-        checkpointer = CheckpointKeyMap("dbclient/test/test_ml_run_import_checkpoint_temp.log")
-        mlflow_client._create_run_and_log_helper = MagicMock()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=30) as executor:
-            futures = [executor.submit(mlflow_client._create_run_and_log(mlflow_client, "", run.info.run_id, run.info.start_time, self._run_to_dict(run), experiment_id_map, "", error_logger, checkpointer, checkpointer)) for run in runs]
-            concurrent.futures.wait(futures)
+        mlflow_client.client = MagicMock()
+        mlflow_client.client.search_experiments.side_effect = lambda view_type, max_results, page_token: pages[page_token]
+        runs_dict = {}
+        mlflow_client.client.search_runs.side_effect = lambda experiment_id, filter_string, run_view_type, max_results, page_token: \
+            PagedList([self._generate_run(int(experiment_id), runs_dict)], None)
+        mlflow_client.get = MagicMock(side_effect=lambda endpoint, do_not_throw: {"object_id": endpoint, "http_status_code": 200})
+
+        mlflow_client.export_mlflow_experiments(export_acls=True, export_runs=True, num_parallel=2)
+
+        self.assertEqual(mlflow_client.client.search_experiments.call_count, 2)
+        with open(export_dir + 'mlflow_experiments.log', 'r') as fp:
+            self.assertEqual([json.loads(line)['experiment_id'] for line in fp], ["1", "2"])
+        # only MLFLOW_EXPERIMENT permissions are exported
+        with open(export_dir + 'mlflow_experiments_acls.log', 'r') as fp:
+            self.assertEqual([json.loads(line)['object_id'] for line in fp], ["/permissions/experiments/1"])
+        con = sqlite3.connect(export_dir + 'mlflow_runs.db')
+        self.assertEqual(sorted(row[0] for row in con.execute("SELECT id FROM runs")), ["run_id_1", "run_id_2"])
+        con.close()
+
+    def test_export_mlflow_experiments_raises_run_export_error(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        config = dict(TEST_CONFIG, export_dir=export_dir)
+        mlflow_client = MLFlowClient(config, CheckpointService(config))
+        pages = {
+            None if page == 0 else f"page{page}": PagedList(
+                [Experiment(str(page * 5 + i), f"exp{page * 5 + i}", "", "active", []) for i in range(5)],
+                f"page{page + 1}" if page < 2 else None)
+            for page in range(3)
+        }
+        mlflow_client.client = MagicMock()
+        mlflow_client.client.search_experiments.side_effect = lambda view_type, max_results, page_token: pages[page_token]
+        runs_dict = {}
 
-        assert(mlflow_client._create_run_and_log_helper.call_count == unique_num_runs)
+        def _search_runs(experiment_id, filter_string, run_view_type, max_results, page_token):
+            if experiment_id == "7":
+                raise ValueError("search runs failed")
+            return PagedList([self._generate_run(int(experiment_id), runs_dict)], None)
+        mlflow_client.client.search_runs.side_effect = _search_runs
 
-        os.remove("dbclient/test/test_ml_run_import_checkpoint_temp.log")
+        # the error of any experiment fails the export, wherever the listing is when it happens
+        with self.assertRaises(ValueError):
+            mlflow_client.export_mlflow_experiments(export_runs=True, num_parallel=2)
 
     # TODO(kevin): Add more unit tests later
     def test_export_mlflow_experiment_acls_skip(self):
@@ -1,3 +1,6 @@
+import json
+import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock
 from dbclient import ScimClient
@@ -20,6 +23,112 @@ class TestScimClient(unittest.TestCase):
         self.assertEqual(old_user_map['29'], 'sourav.khandelwal@databricks.com')
         self.assertEqual(old_user_map['20'], 'test@databricks.com')
 
+    def test_log_all_groups_resolves_members_from_users_index(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        scimClient = ScimClient(dict(TEST_CONFIG, export_dir=export_dir), MagicMock())
+        group = {'displayName': 'g1', 'members': [
+            {'value': '1', '$ref': 'Users/1'}, {'value': '2', '$ref': 'Users/2'}, {'value': '3', '$ref': 'Groups/3'}]}
+        responses = {
+            '/preview/scim/v2/Groups': {'Resources': [group]},
+            '/preview/scim/v2/Users': {'Resources': [{'id': '1', 'userName': 'a@b.com'}]},
+            '/preview/scim/v2/Users/2': {'id': '2', 'userName': 'new@b.com'},
+        }
+        scimClient.get = MagicMock(side_effect=lambda endpoint, *args, **kwargs: responses[endpoint])
+
+        scimClient.log_all_groups(num_parallel=2)
+
+        # one listing, plus one GET for the user missing in it
+        self.assertEqual(sorted(call[0][0] for call in scimClient.get.call_args_list),
+                         ['/preview/scim/v2/Groups', '/preview/scim/v2/Users', '/preview/scim/v2/Users/2'])
+        with open(os.path.join(export_dir, 'groups', 'g1')) as fp:
+            members = json.loads(fp.read())['members']
+        self.assertEqual([m.get('userName') for m in members], ['a@b.com', 'new@b.com', None])
+        self.assertEqual([m['type'] for m in members], ['user', 'user', 'group'])
+
+    def test_import_groups_chunks_member_patches(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        os.makedirs(export_dir + 'groups')
+        members = [{'value': str(i), '$ref': f'Users/{i}'} for i in range(5)]
+        with open(export_dir + 'groups/g1', 'w') as fp:
+            fp.write(json.dumps({'displayName': 'g1', 'members': members}))
+        with open(export_dir + 'users.log', 'w') as fp:
+            for i in range(5):
+                fp.write(json.dumps({'id': str(i), 'userName': f'user{i}@b.com'}) + '\n')
+        with open(export_dir + 'service_principals_id_mapping.log', 'w') as fp:
+            pass
+        checkpoint_set = MagicMock()
+        # the first chunk was added by an interrupted import
+        checkpoint_set.contains.side_effect = lambda key: key == 'g1/0'
+        checkpoint_service = MagicMock()
+        checkpoint_service.get_checkpoint_key_set.return_value = checkpoint_set
+        scimClient = ScimClient(dict(TEST_CONFIG, export_dir=export_dir, group_member_chunk_size=2),
+                                checkpoint_service)
+        listings = {'/preview/scim/v2/Groups': [{'id': '100', 'displayName': 'g1'}],
+                    '/preview/scim/v2/Users': [{'id': f'new{i}', 'userName': f'user{i}@b.com'} for i in range(5)]}
+        scimClient.get = MagicMock(side_effect=lambda endpoint, *args, **kwargs: {'Resources': listings[endpoint]})
+        scimClient.post = MagicMock(return_value={'http_status_code': 200})
+        scimClient.patch = MagicMock(return_value={'http_status_code': 200})
+
+        scimClient.import_groups(export_dir + 'groups/', MagicMock(), num_parallel=2)
+
+        patched = sorted([m['value'] for m in call[0][1]['Operations'][0]['value']['members']]
+                         for call in scimClient.patch.call_args_list)
+        # the identity directory is listed once, after the groups were created
+        self.assertEqual(sorted(call[0][0] for call in scimClient.get.call_args_list),
+                         ['/preview/scim/v2/Groups', '/preview/scim/v2/Users'])
+        self.assertEqual(patched, [['new2', 'new3'], ['new4']])
+        # the same mock serves the group creation and membership checkpoints
+        written = [call[0][0] for call in checkpoint_set.write.call_args_list]
+        self.assertEqual(sorted(key for key in written if '/' in key), ['g1/1', 'g1/2'])
+        self.assertEqual(written[-1], 'g1')
+
+    def test_import_groups_checkpoints_groups_without_mappable_members(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        os.makedirs(export_dir + 'groups')
+        with open(export_dir + 'groups/g1', 'w') as fp:
+            fp.write(json.dumps({'displayName': 'g1', 'members': [{'value': '0', '$ref': 'Users/0'}]}))
+        with open(export_dir + 'groups/g2', 'w') as fp:
+            fp.write(json.dumps({'displayName': 'g2'}))
+        with open(export_dir + 'users.log', 'w') as fp:
+            fp.write(json.dumps({'id': '0', 'userName': 'user0@b.com'}) + '\n')
+        with open(export_dir + 'service_principals_id_mapping.log', 'w') as fp:
+            pass
+        groups_set = MagicMock()
+        groups_set.contains.return_value = False
+        members_set = MagicMock()
+        members_set.contains.return_value = False
+        checkpoint_service = MagicMock()
+        checkpoint_service.get_checkpoint_key_set.side_effect = [groups_set, members_set]
+        scimClient = ScimClient(dict(TEST_CONFIG, export_dir=export_dir), checkpoint_service)
+        listings = {'/preview/scim/v2/Groups': [{'id': '100', 'displayName': 'g1'}, {'id': '101', 'displayName': 'g2'}],
+                    '/preview/scim/v2/Users': []}
+        scimClient.get = MagicMock(side_effect=lambda endpoint, *args, **kwargs: {'Resources': listings[endpoint]})
+        scimClient.post = MagicMock(return_value={'http_status_code': 200})
+        scimClient.patch = MagicMock(return_value={'http_status_code': 200})
+
+        # user0 was not migrated, so g1 has no member to add
+        scimClient.import_groups(export_dir + 'groups/', MagicMock(), num_parallel=2)
+
+        scimClient.patch.assert_not_called()
+        self.assertEqual(sorted(call[0][0] for call in members_set.write.call_args_list), ['g1', 'g2'])
+
+    def test_assign_user_roles_patches_only_missing_roles(self):
+        export_dir = tempfile.mkdtemp() + '/'
+        with open(export_dir + 'users.log', 'w') as fp:
+            fp.write(json.dumps({'id': '1', 'userName': 'a@b.com', 'roles': [{'value': 'r1'}, {'value': 'r2'}]}) + '\n')
+            fp.write(json.dumps({'id': '2', 'userName': 'c@b.com', 'roles': [{'value': 'r1'}]}) + '\n')
+            fp.write(json.dumps({'id': '3', 'userName': 'missing@b.com', 'roles': [{'value': 'r1'}]}) + '\n')
+        scimClient = ScimClient(dict(TEST_CONFIG, export_dir=export_dir), MagicMock())
+        scimClient.get = MagicMock(return_value={'Resources': [
+            {'id': 'new1', 'roles': [{'value': 'r1'}]}, {'id': 'new2', 'roles': [{'value': 'r1'}]}]})
+        scimClient.patch = MagicMock(return_value={'http_status_code': 200})
+
+        scimClient.assign_user_roles({'a@b.com': 'new1', 'c@b.com': 'new2'}, MagicMock(), num_parallel=2)
+
+        # the current roles are read from one listing
+        scimClient.get.assert_called_once()
+        scimClient.patch.assert_called_once_with('/preview/scim/v2/Users/new1', scimClient.add_roles_arg(['r2']))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
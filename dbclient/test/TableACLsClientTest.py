@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from checkpoint_service import CheckpointService
+from dbclient import TableACLsClient
+from dbclient.test.TestUtils import TEST_CONFIG
+
+
+class TestTableACLsClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TableACLsClient(TEST_CONFIG, CheckpointService(TEST_CONFIG))
+        self.sleep_patch = patch('poller.time.sleep')
+        self.sleep = self.sleep_patch.start()
+
+    def tearDown(self):
+        self.sleep_patch.stop()
+
+    def _run(self, life_cycle_state, result_state=None):
+        state = {'life_cycle_state': life_cycle_state}
+        if result_state:
+            state['result_state'] = result_state
+        return {'http_status_code': 200, 'state': state}
+
+    def test_wait_for_notebook_to_terminate(self):
+        runs = iter([self._run('PENDING'), self._run('RUNNING'), self._run('TERMINATED', 'SUCCESS')])
+        self.client.get = MagicMock(side_effect=lambda endpoint, json_params, print_json: next(runs))
+        res = self.client.wait_for_notebook_to_terminate(42)
+        self.assertEqual(res['state']['result_state'], 'SUCCESS')
+        self.assertEqual(self.client.get.call_count, 3)
+        self.client.get.assert_called_with('/jobs/runs/get', {'run_id': 42}, print_json=False)
+
+    def test_wait_for_notebook_to_terminate_returns_failed_polls(self):
+        self.client.get = MagicMock(return_value={'http_status_code': 404, 'error_code': 'RESOURCE_DOES_NOT_EXIST'})
+        self.assertEqual(self.client.wait_for_notebook_to_terminate(42)['http_status_code'], 404)
+
+    def test_wait_for_notebook_to_terminate_retries_errors(self):
+        responses = iter([ConnectionError('reset'), self._run('INTERNAL_ERROR')])
+
+        def _get(endpoint, json_params, print_json):
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        self.client.get = MagicMock(side_effect=_get)
+        self.assertEqual(self.client.wait_for_notebook_to_terminate(42, max_num_retries=1)['state'],
+                         {'life_cycle_state': 'INTERNAL_ERROR'})
+
+        self.client.get = MagicMock(side_effect=ConnectionError('reset'))
+        with self.assertRaises(ConnectionError):
+            self.client.wait_for_notebook_to_terminate(42, max_num_retries=2)
+        self.assertEqual(self.client.get.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
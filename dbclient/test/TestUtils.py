@@ -3,6 +3,8 @@ TEST_CONFIG = {
     'url': 'test_url',
     'export_dir': './',
     'is_aws': 'True',
+    'is_azure': False,
+    'is_gcp': False,
     'skip_failed': True,
     'verbose': False,
     'verify_ssl': False,
@@ -13,5 +15,8 @@ TEST_CONFIG = {
     'profile': "test_profile",
     'retry_total': 1,
     'retry_backoff': 2,
-    'debug': False
-}
\ No newline at end of file
+    'debug': False,
+    'timeout': 300.0,
+    'skip_missing_users': False,
+    'map_service_principals_by_name': False
+}
@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from dbclient import WorkspaceClient
+from dbclient.test.TestUtils import TEST_CONFIG
+
+INHERITED_ACL = {
+    'object_id': '/notebooks/1',
+    'object_type': 'notebook',
+    'access_control_list': [
+        {'user_name': 'a@b.com', 'all_permissions': [{'permission_level': 'CAN_MANAGE', 'inherited': True}]},
+        {'group_name': 'admins', 'all_permissions': [{'permission_level': 'CAN_MANAGE', 'inherited': False}]},
+    ]
+}
+EXPLICIT_ACL = {
+    'object_id': '/notebooks/2',
+    'object_type': 'notebook',
+    'access_control_list': [
+        {'user_name': 'a@b.com', 'all_permissions': [{'permission_level': 'CAN_RUN', 'inherited': False}]},
+    ]
+}
+
+
+class TestWorkspaceClient(unittest.TestCase):
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp() + '/'
+        config = dict(TEST_CONFIG, export_dir=self.export_dir)
+        self.client = WorkspaceClient(config, MagicMock())
+
+    def test_has_explicit_acl(self):
+        self.assertFalse(WorkspaceClient.has_explicit_acl(INHERITED_ACL['access_control_list']))
+        self.assertTrue(WorkspaceClient.has_explicit_acl(EXPLICIT_ACL['access_control_list']))
+        self.assertFalse(WorkspaceClient.has_explicit_acl(None))
+
+    def test_log_all_workspace_acls_prunes_inherited(self):
+        with open(self.export_dir + 'user_workspace.log', 'w') as fp:
+            fp.write(json.dumps({'path': '/Users/a@b.com/inherited', 'object_id': 1}) + '\n')
+            fp.write(json.dumps({'path': '/Users/a@b.com/explicit', 'object_id': 2}) + '\n')
+        responses = {'/permissions/notebooks/1': INHERITED_ACL, '/permissions/notebooks/2': EXPLICIT_ACL}
+        self.client.get = MagicMock(side_effect=lambda endpoint, *args, **kwargs:
+                                    dict(responses[endpoint], http_status_code=200))
+
+        self.client.log_all_workspace_acls(num_parallel=2)
+
+        with open(self.export_dir + 'acl_notebooks.log') as fp:
+            acls = [json.loads(line) for line in fp]
+        with open(self.export_dir + 'acl_notebooks_inherited.log') as fp:
+            inherited = [json.loads(line) for line in fp]
+        self.assertEqual([acl['path'] for acl in acls], ['/Users/a@b.com/explicit'])
+        self.assertEqual(inherited, [{'path': '/Users/a@b.com/inherited', 'object_id': '/notebooks/1'}])
+        self.assertTrue(os.path.exists(self.export_dir + 'acl_directories_inherited.log'))
+
+    def test_apply_acl_on_object_skips_inherited(self):
+        checkpoint_key_set = MagicMock()
+        checkpoint_key_set.contains.return_value = False
+        self.client.get = MagicMock()
+        acl_str = json.dumps(dict(INHERITED_ACL, path='/Shared/nb'))
+
+        self.client.apply_acl_on_object(acl_str, MagicMock(), checkpoint_key_set)
+
+        self.client.get.assert_not_called()
+        checkpoint_key_set.write.assert_called_once_with('/Shared/nb')
+
+    def test_download_notebooks_links_unchanged_from_baseline(self):
+        baseline_dir = tempfile.mkdtemp() + '/'
+        os.makedirs(baseline_dir + 'artifacts/Users/a@b.com')
+        with open(baseline_dir + 'artifacts/Users/a@b.com/same.dbc', 'w') as fp:
+            fp.write('baseline')
+        with open(baseline_dir + 'user_workspace.log', 'w') as fp:
+            for path, modified_at in [('/Users/a@b.com/same', 1), ('/Users/a@b.com/changed', 1),
+                                      ('/Users/a@b.com/deleted', 1)]:
+                fp.write(json.dumps({'path': path, 'object_id': 1, 'modified_at': modified_at}) + '\n')
+        with open(self.export_dir + 'user_workspace.log', 'w') as fp:
+            for path, modified_at in [('/Users/a@b.com/same', 1), ('/Users/a@b.com/changed', 2)]:
+                fp.write(json.dumps({'path': path, 'object_id': 1, 'modified_at': modified_at}) + '\n')
+        checkpoint_set = MagicMock()
+        checkpoint_set.contains.return_value = False
+        self.client._checkpoint_service.get_checkpoint_key_set.return_value = checkpoint_set
+        self.client.get = MagicMock(return_value={'file_type': 'dbc', 'content': 'Y2hhbmdlZA=='})
+
+        num_notebooks = self.client.download_notebooks(num_parallel=1, baseline_dir=baseline_dir)
+
+        self.assertEqual(num_notebooks, 2)
+        self.client.get.assert_called_once()
+        self.assertEqual(self.client.get.call_args[0][1]['path'], '/Users/a@b.com/changed')
+        linked = self.export_dir + 'artifacts/Users/a@b.com/same.dbc'
+        self.assertTrue(os.path.samefile(linked, baseline_dir + 'artifacts/Users/a@b.com/same.dbc'))
+        with open(self.export_dir + 'deleted_notebooks.log') as fp:
+            self.assertEqual([json.loads(line) for line in fp], [{'path': '/Users/a@b.com/deleted'}])
+
+    def test_download_notebooks_does_not_link_checkpointed_notebooks(self):
+        baseline_dir = tempfile.mkdtemp() + '/'
+        os.makedirs(baseline_dir + 'artifacts/Users/a@b.com')
+        with open(baseline_dir + 'artifacts/Users/a@b.com/same.dbc', 'w') as fp:
+            fp.write('baseline')
+        for export_dir in [baseline_dir, self.export_dir]:
+            with open(export_dir + 'user_workspace.log', 'w') as fp:
+                fp.write(json.dumps({'path': '/Users/a@b.com/same', 'object_id': 1, 'modified_at': 1}) + '\n')
+        checkpoint_set = MagicMock()
+        # exported by an interrupted run of this session
+        checkpoint_set.contains.return_value = True
+        self.client._checkpoint_service.get_checkpoint_key_set.return_value = checkpoint_set
+        self.client.get = MagicMock()
+
+        with self.assertLogs(level='INFO') as logs:
+            num_notebooks = self.client.download_notebooks(num_parallel=1, baseline_dir=baseline_dir)
+
+        self.assertEqual(num_notebooks, 1)
+        self.client.get.assert_not_called()
+        self.assertFalse(os.path.exists(self.export_dir + 'artifacts/Users/a@b.com/same.dbc'))
+        self.assertIn('0 unchanged notebooks linked, 1 notebooks already exported', logs.output[-1])
+
+    def test_pass_through_notebooks(self):
+        with open(self.export_dir + 'user_workspace.log', 'w') as fp:
+            for path in ['/Users/a@b.com/nb', '/Users/missing@b.com/nb', '/Shared/dir/nb']:
+                fp.write(json.dumps({'path': path, 'object_id': 1}) + '\n')
+        checkpoint_set = MagicMock()
+        checkpoint_set.contains.return_value = False
+        self.client._checkpoint_service.get_checkpoint_key_set.return_value = checkpoint_set
+        self.client.get = MagicMock(return_value={'file_type': 'dbc', 'content': 'Y2hhbmdlZA=='})
+        dst_client = WorkspaceClient(dict(TEST_CONFIG, export_dir=self.export_dir), MagicMock())
+        dst_client.get = MagicMock(side_effect=lambda endpoint, json_params, *args, **kwargs:
+                                   {'object_type': 'DIRECTORY'} if json_params['path'] == '/Users/a@b.com' else {})
+        dst_client.post = MagicMock(return_value={'http_status_code': 200})
+
+        num_notebooks = self.client.pass_through_notebooks(dst_client, num_parallel=2, queue_size=1,
+                                                           archive_missing=True)
+
+        self.assertEqual(num_notebooks, 3)
+        imported = sorted(call[0][1]['path'] for call in dst_client.post.call_args_list if call[0][0] == '/workspace/import')
+        self.assertEqual(imported, ['/Archive/missing@b.com/nb', '/Shared/dir/nb', '/Users/a@b.com/nb'])
+        mkdirs = sorted(call[0][1]['path'] for call in dst_client.post.call_args_list if call[0][0] == '/workspace/mkdirs')
+        self.assertEqual(mkdirs, ['/Archive/missing@b.com', '/Shared/dir'])
+        # nothing lands on local disk without local_dir, so only the imports are checkpointed
+        self.assertFalse(os.path.exists(self.export_dir + 'artifacts'))
+        self.assertEqual(sorted(call[0][0] for call in checkpoint_set.write.call_args_list),
+                         ['/Shared/dir/nb', '/Users/a@b.com/nb', '/Users/missing@b.com/nb'])
+
+
+    def test_pass_through_notebooks_creates_each_dir_once(self):
+        with open(self.export_dir + 'user_workspace.log', 'w') as fp:
+            for i in range(20):
+                fp.write(json.dumps({'path': f'/Shared/dir{i % 2}/nb{i}', 'object_id': i}) + '\n')
+        checkpoint_set = MagicMock()
+        checkpoint_set.contains.return_value = False
+        self.client._checkpoint_service.get_checkpoint_key_set.return_value = checkpoint_set
+        self.client.get = MagicMock(return_value={'file_type': 'dbc', 'content': 'Y2hhbmdlZA=='})
+        dst_client = WorkspaceClient(dict(TEST_CONFIG, export_dir=self.export_dir), MagicMock())
+        dst_client.get = MagicMock(return_value={})
+        posts = []
+        failed_mkdirs = set()
+
+        def _post(endpoint, json_params, *args, **kwargs):
+            posts.append((endpoint, json_params['path']))
+            if endpoint == '/workspace/mkdirs':
+                # the first mkdirs of dir1 fails, so it is retried by the next notebook in dir1
+                if json_params['path'] == '/Shared/dir1' and json_params['path'] not in failed_mkdirs:
+                    failed_mkdirs.add(json_params['path'])
+                    return {'error_code': 'INTERNAL_ERROR', 'http_status_code': 500}
+                if json_params['path'] == '/Shared/dir0':
+                    # the notebooks of a dir are imported once the dir is created
+                    self.assertFalse(any(path.startswith('/Shared/dir0/') for _, path in posts[:-1]))
+            return {'http_status_code': 200}
+        dst_client.post = MagicMock(side_effect=_post)
+
+        self.client.pass_through_notebooks(dst_client, num_parallel=8, queue_size=20)
+
+        mkdirs = sorted(path for endpoint, path in posts if endpoint == '/workspace/mkdirs')
+        self.assertEqual(mkdirs, ['/Shared/dir0', '/Shared/dir1', '/Shared/dir1'])
+
+if __name__ == '__main__':
+    unittest.main()
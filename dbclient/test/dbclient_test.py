@@ -78,6 +78,25 @@ class DBClientTest(unittest.TestCase):
         with self.assertRaises(Exception):
             client.get("/endpoint")
 
+    def test_scim_iterator_pages(self):
+        config = dict(test_client_config(), is_azure=False, is_gcp=False, retry_total=1, retry_backoff=1,
+                      timeout=300.0, num_parallel=2)
+        client = dbclient(config)
+        users = [{'id': str(i), 'userName': f'user{i}'} for i in range(1, 8)]
+
+        def _get_page(endpoint, json_params):
+            # the server caps the page size at 2
+            start = json_params['startIndex'] - 1
+            return {'totalResults': len(users), 'Resources': users[start:start + 2]}
+        client.get = mock.MagicMock(side_effect=_get_page)
+
+        result = list(client.scim_iterator('/preview/scim/v2/Users', {'attributes': 'userName'}))
+
+        self.assertEqual(result, users)
+        self.assertEqual(sorted(call[0][1]['startIndex'] for call in client.get.call_args_list), [1, 3, 5, 7])
+        self.assertTrue(all(call[0][1]['attributes'] == 'userName' for call in client.get.call_args_list))
+        self.assertEqual(client.get.call_args_list[1][0][1]['count'], 2)
+
 
 if __name__ == '__main__':
     unittest.main()
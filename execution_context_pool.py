@@ -0,0 +1,154 @@
+import contextlib
+import json
+import logging
+import threading
+import time
+import wmconstants
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ExecutionContextPool():
+    """Execution contexts (rest api 1.2) of a cluster, reused by all clients of the session.
+
+    get_context hands out one shared context to callers that run their commands one at a time, context hands out up to
+    size further contexts for the exclusive use of concurrent commands. Contexts are health-checked when they are handed
+    out and recreated if they died, e.g. because the cluster restarted. The context ids are saved in the session
+    checkpoint, so a resumed session reattaches to the contexts of the running cluster instead of creating new ones.
+    Contexts are health-checked and created without holding the lock of the pool: creating one may take several
+    retries, and release is called from the thread that polls the commands of all clients.
+    """
+
+    CREATE_RETRIES = 5
+
+    def __init__(self, client, cid, size, checkpoint_map=None):
+        """
+        :param client: ClustersClient of the workspace of the cluster
+        :param cid: cluster id
+        :param size: max number of exclusive contexts of the cluster
+        :param checkpoint_map: CheckpointKeyMap to save the context ids in, None if checkpointing is disabled
+        """
+        self._client = client
+        self._cid = cid
+        self._size = size
+        self._checkpoint_map = checkpoint_map
+        self._condition = threading.Condition()
+        self._shared_lock = threading.Lock()  # serializes the health checks and creation of the shared context
+        self._shared = None
+        self._contexts = []  # exclusive contexts
+        self._free = []  # exclusive contexts that are not handed out
+        self._num_reserved = 0  # exclusive contexts that are being created
+        if checkpoint_map is not None and checkpoint_map.contains(cid):
+            saved_contexts = json.loads(checkpoint_map.get(cid))
+            if saved_contexts['shared'] and self.is_alive(saved_contexts['shared']):
+                self._shared = saved_contexts['shared']
+            self._contexts = [ec_id for ec_id in saved_contexts['exclusive'] if self.is_alive(ec_id)][:size]
+            self._free = list(self._contexts)
+            logging.info(f"Reattached to {len(self._contexts) + bool(self._shared)} execution contexts of {cid}")
+
+    def is_alive(self, ec_id):
+        status = self._client.get('/contexts/status', {'clusterId': self._cid, 'contextId': ec_id}, version="1.2")
+        return status.get('status', None) in ('Running', 'Pending')
+
+    def _create_context(self):
+        logging.info("Creating remote Spark Session")
+        ec_payload = {"language": "python",
+                      "clusterId": self._cid}
+        for attempt in range(self.CREATE_RETRIES):
+            ec = self._client.post('/contexts/create', json_params=ec_payload, version="1.2")
+            # Grab the execution context ID
+            ec_id = ec.get('id', None)
+            if ec_id:
+                return ec_id
+            # the driver may not accept contexts yet right after the cluster is running
+            logging.info(f'Unable to establish remote session, attempt {attempt + 1} of {self.CREATE_RETRIES}')
+            logging.info(ec)
+            time.sleep(2 ** attempt)
+        raise Exception("Remote session error")
+
+    def _save(self):
+        if self._checkpoint_map is not None:
+            self._checkpoint_map.update(self._cid, json.dumps({'shared': self._shared, 'exclusive': self._contexts}))
+
+    def get_context(self):
+        """:return: id of a live context shared by all callers of get_context"""
+        with self._shared_lock:
+            if self._shared is not None:
+                if self.is_alive(self._shared):
+                    return self._shared
+                logging.info(f"Execution context {self._shared} of {self._cid} died, recreating it")
+            ec_id = self._create_context()
+            with self._condition:
+                self._shared = ec_id
+                self._save()
+            return ec_id
+
+    def acquire(self):
+        """:return: id of a live context for the exclusive use of the caller until it is released"""
+        with self._condition:
+            while not self._free and len(self._contexts) + self._num_reserved >= self._size:
+                self._condition.wait()
+            if self._free:
+                ec_id = self._free.pop()
+            else:
+                # reserve the slot of a new context, which is created outside of the lock
+                ec_id = None
+                self._num_reserved += 1
+        if ec_id is not None:
+            if self.is_alive(ec_id):
+                return ec_id
+            logging.info(f"Execution context {ec_id} of {self._cid} died, recreating it")
+        try:
+            new_ec_id = self._create_context()
+        except Exception:
+            with self._condition:
+                if ec_id is None:
+                    self._num_reserved -= 1
+                else:
+                    self._contexts.remove(ec_id)
+                    self._save()
+                self._condition.notify()
+            raise
+        with self._condition:
+            if ec_id is None:
+                self._num_reserved -= 1
+                self._contexts.append(new_ec_id)
+            else:
+                self._contexts[self._contexts.index(ec_id)] = new_ec_id
+            self._save()
+        return new_ec_id
+
+    def release(self, ec_id):
+        with self._condition:
+            self._free.append(ec_id)
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def context(self):
+        """Hands out a context for the exclusive use of the with block."""
+        ec_id = self.acquire()
+        try:
+            yield ec_id
+        finally:
+            self.release(ec_id)
+
+
+def get_execution_context_pool(client, cid, size, checkpoint_service=None):
+    """
+    Return the execution context pool of the cluster, shared by all clients of the workspace.
+    :param checkpoint_service: service of the session to save the context ids in and reattach to them
+    """
+    key = (client.get_url(), cid)
+    with _pools_lock:
+        if key in _pools:
+            return _pools[key]
+    checkpoint_map = None
+    if checkpoint_service is not None and checkpoint_service.checkpoint_enabled:
+        checkpoint_map = checkpoint_service.get_checkpoint_key_map(
+            wmconstants.WM_SESSION, wmconstants.EXECUTION_CONTEXT_OBJECT)
+    # the pool checks the saved contexts over http, so it is built outside of the lock; a pool built concurrently
+    # for the same cluster only reattached and is discarded
+    pool = ExecutionContextPool(client, cid, size, checkpoint_map)
+    with _pools_lock:
+        return _pools.setdefault(key, pool)
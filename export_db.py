@@ -57,7 +57,7 @@ def main():
         print("Complete Service Principals Export Time: " + str(timedelta(seconds=end - start)))
         start = timer()
         # log all groups
-        scim_c.log_all_groups()
+        scim_c.log_all_groups(num_parallel=args.num_parallel)
         end = timer()
         print("Complete Group Export Time: " + str(timedelta(seconds=end - start)))
         # log the instance profiles
@@ -123,8 +123,8 @@ def main():
         cl_c = ClustersClient(client_config, checkpoint_service)
         start = timer()
         # log the cluster json
-        cl_c.log_cluster_configs()
-        cl_c.log_cluster_policies()
+        cl_c.log_cluster_configs(num_parallel=args.num_parallel)
+        cl_c.log_cluster_policies(num_parallel=args.num_parallel)
         end = timer()
         print("Complete Cluster Export Time: " + str(timedelta(seconds=end - start)))
         # log the instance pools
@@ -139,7 +139,7 @@ def main():
         start = timer()
         jobs_c = JobsClient(client_config, checkpoint_service)
         # log job configs
-        jobs_c.log_job_configs()
+        jobs_c.log_job_configs(num_parallel=args.num_parallel)
         end = timer()
         print("Complete Jobs Export Time: " + str(timedelta(seconds=end - start)))
 
@@ -287,7 +287,7 @@ def main():
         start = timer()
         scim_c = ScimClient(client_config, checkpoint_service)
         # log notebooks and libraries
-        user_names = scim_c.log_groups_from_list(group_name_list)
+        user_names = scim_c.log_groups_from_list(group_name_list, num_parallel=args.num_parallel)
         print('Export users notebooks:', user_names)
         ws_c = WorkspaceClient(client_config, checkpoint_service)
         for username in user_names:
@@ -296,28 +296,33 @@ def main():
                 ws_c.export_user_home(username, 'user_exports', num_parallel=args.num_parallel)
         print('Exporting users jobs:')
         jobs_c = JobsClient(client_config, checkpoint_service)
-        jobs_c.log_job_configs(users_list=user_names)
+        jobs_c.log_job_configs(users_list=user_names, num_parallel=args.num_parallel)
         end = timer()
         print("Complete User Export Time: " + str(timedelta(seconds=end - start)))
 
     if args.mlflow_experiments:
         print("Exporting MLflow experiments.")
         mlflow_c = MLFlowClient(client_config, checkpoint_service)
-        mlflow_c.export_mlflow_experiments()
+        # permissions and runs requested along with the experiments are exported while the experiments are listed
+        mlflow_c.export_mlflow_experiments(export_acls=args.mlflow_experiments_permissions,
+                                           export_runs=args.mlflow_runs, start_date=args.start_date,
+                                           num_parallel=args.num_parallel)
         failed_task_log = logging_utils.get_error_log_file(wmconstants.WM_EXPORT, wmconstants.MLFLOW_EXPERIMENT_OBJECT, client_config['export_dir'])
         logging_utils.raise_if_failed_task_file_exists(failed_task_log, "MLflow Experiments Export.")
 
     if args.mlflow_experiments_permissions:
         print("Importing MLflow experiment permissions.")
-        mlflow_c = MLFlowClient(client_config, checkpoint_service)
-        mlflow_c.export_mlflow_experiments_acls()
+        if not args.mlflow_experiments:
+            mlflow_c = MLFlowClient(client_config, checkpoint_service)
+            mlflow_c.export_mlflow_experiments_acls()
         failed_task_log = logging_utils.get_error_log_file(wmconstants.WM_EXPORT, wmconstants.MLFLOW_EXPERIMENT_PERMISSION_OBJECT, client_config['export_dir'])
         logging_utils.raise_if_failed_task_file_exists(failed_task_log, "MLflow Experiments Permissions Export.")
 
     if args.mlflow_runs:
         print("Exporting MLflow runs.")
-        mlflow_c = MLFlowClient(client_config, checkpoint_service)
-        mlflow_c.export_mlflow_runs(args.start_date, num_parallel=args.num_parallel)
+        if not args.mlflow_experiments:
+            mlflow_c = MLFlowClient(client_config, checkpoint_service)
+            mlflow_c.export_mlflow_runs(args.start_date, num_parallel=args.num_parallel)
         failed_task_log = logging_utils.get_error_log_file(wmconstants.WM_EXPORT, wmconstants.MLFLOW_RUN_OBJECT, client_config['export_dir'])
         logging_utils.raise_if_failed_task_file_exists(failed_task_log, "MLflow Runs Export.")
 
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import threading
+
+GROUP_MEMBERSHIP_INDEX_FILE = "group_membership_index.json"
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class GroupMembershipIndex():
+    """Effective group memberships of all users, service principals and groups of a workspace.
+
+    Nested groups are resolved by transitive closure, i.e. a user in group A, which is a member of group B, is
+    effectively a member of A and B. Cycles in the group graph are tolerated.
+    The index is built from one paged listing of users and groups, and shared by all exports filtered by
+    groups_to_keep through get_group_membership_index.
+    """
+
+    def __init__(self, user_groups, service_principal_groups, group_parents):
+        """
+        :param user_groups: dict of userName -> list of groups the user is a direct member of
+        :param service_principal_groups: dict of applicationId -> list of groups the service principal is a direct
+        member of
+        :param group_parents: dict of group name -> list of groups the group is a direct member of
+        """
+        self._user_groups = user_groups
+        self._service_principal_groups = service_principal_groups
+        self._group_parents = group_parents
+        self._group_ancestors = {}
+        self._users_in_groups = {}
+        for group in group_parents:
+            self._group_ancestors[group] = self._ancestors(group)
+
+    def _ancestors(self, group):
+        ancestors = set()
+        pending = list(self._group_parents.get(group, []))
+        while pending:
+            parent = pending.pop()
+            if parent not in ancestors:
+                ancestors.add(parent)
+                pending.extend(self._group_parents.get(parent, []))
+        return ancestors
+
+    def _effective_groups(self, direct_groups):
+        effective_groups = set(direct_groups)
+        for group in direct_groups:
+            effective_groups |= self._group_ancestors.get(group, set())
+        return effective_groups
+
+    def user_groups(self, user_name):
+        """:return: set of all groups the user is a direct or nested member of"""
+        return self._effective_groups(self._user_groups.get(user_name, []))
+
+    def service_principal_groups(self, application_id):
+        """:return: set of all groups the service principal is a direct or nested member of"""
+        return self._effective_groups(self._service_principal_groups.get(application_id, []))
+
+    def group_groups(self, group_name):
+        """:return: set of the group itself and all groups it is a direct or nested member of"""
+        return {group_name} | self._group_ancestors.get(group_name, set())
+
+    def users_in_groups(self, groups):
+        """:return: set of userNames that are direct or nested members of any of the groups"""
+        groups = frozenset(groups)
+        if groups not in self._users_in_groups:
+            self._users_in_groups[groups] = {user_name for user_name in self._user_groups
+                                             if self.user_groups(user_name) & groups}
+        return self._users_in_groups[groups]
+
+    def groups_within(self, groups):
+        """:return: set of the groups and all groups nested in them"""
+        groups = set(groups)
+        return {group for group in self._group_parents if self.group_groups(group) & groups} | groups
+
+    @classmethod
+    def build(cls, client):
+        """
+        :param client: dbclient of the workspace to list the users and groups of
+        """
+        user_names = {}
+        service_principal_app_ids = {}
+        group_names = {}
+        group_members = {}
+        for user in client.scim_iterator('/preview/scim/v2/Users', {'attributes': 'userName'}):
+            user_names[user['id']] = user['userName']
+        for sp in client.scim_iterator('/preview/scim/v2/ServicePrincipals', {'attributes': 'applicationId'}):
+            service_principal_app_ids[sp['id']] = sp['applicationId']
+        for group in client.scim_iterator('/preview/scim/v2/Groups', {'attributes': 'displayName,members'}):
+            group_names[group['id']] = group['displayName']
+            group_members[group['displayName']] = group.get('members', [])
+
+        user_groups = {user_name: [] for user_name in user_names.values()}
+        service_principal_groups = {app_id: [] for app_id in service_principal_app_ids.values()}
+        group_parents = {group_name: [] for group_name in group_members}
+        for group_name, members in group_members.items():
+            for member in members:
+                ref = member.get('$ref', '')
+                member_id = member.get('value')
+                if 'Users/' in ref and member_id in user_names:
+                    user_groups[user_names[member_id]].append(group_name)
+                elif 'ServicePrincipals/' in ref and member_id in service_principal_app_ids:
+                    service_principal_groups[service_principal_app_ids[member_id]].append(group_name)
+                elif 'Groups/' in ref:
+                    group_parents.setdefault(group_names.get(member_id, member.get('display')), []).append(group_name)
+        logging.info(f"Built group membership index of {len(user_groups)} users, {len(service_principal_groups)} "
+                     f"service principals and {len(group_parents)} groups")
+        return cls(user_groups, service_principal_groups, group_parents)
+
+    @classmethod
+    def load(cls, index_file):
+        with open(index_file, 'r') as fp:
+            index = json.loads(fp.read())
+        return cls(index['users'], index['service_principals'], index['groups'])
+
+    def save(self, index_file):
+        with open(index_file, 'w') as fp:
+            fp.write(json.dumps({'users': self._user_groups, 'service_principals': self._service_principal_groups,
+                                 'groups': self._group_parents}))
+
+
+def get_group_membership_index(client):
+    """
+    Return the group membership index of the client's export dir. It is built once per export and saved as
+    group_membership_index.json, so a resumed export reuses it.
+    """
+    export_dir = client.get_export_dir()
+    with _indexes_lock:
+        if export_dir not in _indexes:
+            index_file = export_dir + GROUP_MEMBERSHIP_INDEX_FILE
+            if os.path.exists(index_file):
+                index = GroupMembershipIndex.load(index_file)
+            else:
+                index = GroupMembershipIndex.build(client)
+                index.save(index_file)
+            _indexes[export_dir] = index
+        return _indexes[export_dir]
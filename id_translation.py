@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import threading
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class IdTranslationCache():
+    """Translates the ids of clusters, instance pools, cluster policies and jobs of the source workspace to their ids
+    in the destination workspace.
+
+    Objects are matched by name: the destination workspace is listed once per object type, the exported logs are read
+    once per file, and both are kept up to date as objects are created during the import session.
+    Clients share the cache through get_id_translation_cache.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.RLock()
+        self._cluster_ids = None  # cluster_name -> cluster_id in the destination workspace
+        self._pool_ids = None  # instance_pool_name -> instance_pool_id in the destination workspace
+        self._policy_ids = None  # policy name -> policy_id in the destination workspace
+        self._source_names = {}  # exported log file -> {old id: name}
+        self._job_ids = {}  # job id map file -> {old job id: new job id}
+
+    def cluster_ids(self):
+        """:return: dict of cluster_name -> cluster_id in the destination workspace"""
+        with self._lock:
+            if self._cluster_ids is None:
+                self._cluster_ids = {x['cluster_name']: x['cluster_id'] for x in self._client.get_cluster_list(False)}
+            return self._cluster_ids
+
+    def pool_ids(self):
+        """:return: dict of instance_pool_name -> instance_pool_id in the destination workspace"""
+        with self._lock:
+            if self._pool_ids is None:
+                pools = self._client.get('/instance-pools/list').get('instance_pools', [])
+                self._pool_ids = {x['instance_pool_name']: x['instance_pool_id'] for x in pools}
+            return self._pool_ids
+
+    def policy_ids(self):
+        """:return: dict of policy name -> policy_id in the destination workspace"""
+        with self._lock:
+            if self._policy_ids is None:
+                policies = self._client.get('/policies/clusters/list').get('policies', [])
+                self._policy_ids = {x['name']: x['policy_id'] for x in policies}
+            return self._policy_ids
+
+    def add_cluster(self, cluster_name, cluster_id):
+        with self._lock:
+            self.cluster_ids()[cluster_name] = cluster_id
+
+    def add_pool(self, pool_name, pool_id):
+        with self._lock:
+            self.pool_ids()[pool_name] = pool_id
+
+    def add_policy(self, policy_name, policy_id):
+        with self._lock:
+            self.policy_ids()[policy_name] = policy_id
+
+    def source_names(self, log_file, id_key, name_key):
+        """
+        :param log_file: exported json-lines log, e.g. instance_pools.log
+        :return: dict of id -> name of the objects in the source workspace
+        """
+        with self._lock:
+            if log_file not in self._source_names:
+                names = {}
+                with open(log_file, 'r') as fp:
+                    for line in fp:
+                        conf = json.loads(line)
+                        names[conf[id_key]] = conf[name_key]
+                self._source_names[log_file] = names
+            return self._source_names[log_file]
+
+    def translate(self, source_names, current_ids):
+        """:return: dict of old id -> new id of the objects that exist in the destination workspace by name"""
+        with self._lock:
+            return {old_id: current_ids[name] for old_id, name in source_names.items() if name in current_ids}
+
+    def job_ids(self, job_map_log):
+        """:return: dict of old job id -> new job id, read from the job id map once and updated by add_job"""
+        with self._lock:
+            if job_map_log not in self._job_ids:
+                job_ids = {}
+                if os.path.exists(job_map_log):
+                    with open(job_map_log, 'r') as fp:
+                        for line in fp:
+                            job_map = json.loads(line)
+                            job_ids[str(job_map['old_id'])] = job_map['new_id']
+                self._job_ids[job_map_log] = job_ids
+            return self._job_ids[job_map_log]
+
+    def add_job(self, job_map_log, old_job_id, new_job_id):
+        with self._lock:
+            self.job_ids(job_map_log)[str(old_job_id)] = new_job_id
+
+    def reset_job_ids(self, job_map_log):
+        """drop the job ids of a job id map that is rewritten from scratch"""
+        with self._lock:
+            self._job_ids[job_map_log] = {}
+
+
+def get_id_translation_cache(client, refresh=False):
+    """
+    Return the id translation cache of the client's export dir, shared by all clients of the import session.
+    :param refresh: drop the cached listings, e.g. after objects were created or deleted outside of this session
+    """
+    export_dir = client.get_export_dir()
+    with _caches_lock:
+        if refresh or export_dir not in _caches:
+            logging.info(f"Creating id translation cache for {export_dir}")
+            _caches[export_dir] = IdTranslationCache(client)
+        return _caches[export_dir]
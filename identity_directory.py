@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import threading
+
+IDENTITY_DIRECTORY_FILE = "identity_directory.json"
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def _read_json_lines(log_file):
+    if not os.path.exists(log_file):
+        return
+    with open(log_file, 'r') as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+class IdentityDirectory():
+    """Maps the users, groups and service principals of the source workspace to the destination workspace.
+
+    The directory is built once per session from the exported logs and paged listings of the destination workspace,
+    and stored in the export dir as identity_directory.json:
+        {"users": {userName: {"source_id": .., "id": ..}},
+         "groups": {displayName: {"source_id": .., "id": ..}},
+         "service_principals": {source_id: {"displayName": .., "source_application_id": .., "id": ..,
+                                            "applicationId": ..}}}
+    Clients share it through get_identity_directory, so id lookups during imports are dictionary lookups.
+    """
+
+    def __init__(self, entries):
+        self._entries = entries
+        users = entries.get('users', {})
+        groups = entries.get('groups', {})
+        service_principals = entries.get('service_principals', {})
+        self._user_ids = {name: user['id'] for name, user in users.items() if user.get('id')}
+        self._source_user_names = {user['source_id']: name for name, user in users.items() if user.get('source_id')}
+        self._group_ids = {name: group['id'] for name, group in groups.items() if group.get('id')}
+        self._service_principal_ids = {source_id: sp['id'] for source_id, sp in service_principals.items()
+                                       if sp.get('id')}
+        self._service_principal_app_ids = {sp['source_application_id']: sp['applicationId']
+                                           for sp in service_principals.values()
+                                           if sp.get('source_application_id') and sp.get('applicationId')}
+
+    @classmethod
+    def build(cls, client, users_log='users.log', group_log_dir='groups/',
+              sp_mapping_log='service_principals_id_mapping.log'):
+        """
+        :param client: dbclient of the destination workspace, whose export dir holds the exported logs
+        """
+        export_dir = client.get_export_dir()
+        users = {}
+        for user in _read_json_lines(export_dir + users_log):
+            users[user['userName']] = {'source_id': user.get('id'), 'id': None}
+        for user in client.scim_iterator('/preview/scim/v2/Users', {'attributes': 'userName'}):
+            users.setdefault(user['userName'], {'source_id': None})['id'] = user['id']
+
+        groups = {}
+        group_dir = export_dir + group_log_dir
+        if os.path.exists(group_dir):
+            for group_name in os.listdir(group_dir):
+                with open(group_dir + group_name, 'r') as fp:
+                    groups[group_name] = {'source_id': json.loads(fp.read()).get('id'), 'id': None}
+        for group in client.scim_iterator('/preview/scim/v2/Groups', {'attributes': 'displayName'}):
+            groups.setdefault(group['displayName'], {'source_id': None})['id'] = group['id']
+
+        # service principals are matched when they are imported, see ScimClient.import_service_principals
+        service_principals = {}
+        for sp in _read_json_lines(export_dir + sp_mapping_log):
+            service_principals[sp['exported_id']] = {'displayName': sp.get('display_name'),
+                                                     'source_application_id': sp['exported_app_id'],
+                                                     'id': sp['current_id'],
+                                                     'applicationId': sp['current_app_id']}
+        logging.info(f"Built identity directory with {len(users)} users, {len(groups)} groups and "
+                     f"{len(service_principals)} service principals")
+        return cls({'users': users, 'groups': groups, 'service_principals': service_principals})
+
+    @classmethod
+    def load(cls, directory_file):
+        with open(directory_file, 'r') as fp:
+            return cls(json.loads(fp.read()))
+
+    def save(self, directory_file):
+        with open(directory_file, 'w') as fp:
+            fp.write(json.dumps(self._entries))
+
+    def user_ids(self):
+        """:return: dict of userName -> id in the destination workspace"""
+        return self._user_ids
+
+    def source_user_names(self):
+        """:return: dict of id in the source workspace -> userName"""
+        return self._source_user_names
+
+    def group_ids(self):
+        """:return: dict of group displayName -> id in the destination workspace"""
+        return self._group_ids
+
+    def service_principal_ids(self):
+        """:return: dict of service principal id in the source workspace -> id in the destination workspace"""
+        return self._service_principal_ids
+
+    def service_principal_app_ids(self):
+        """:return: dict of applicationId in the source workspace -> applicationId in the destination workspace"""
+        return self._service_principal_app_ids
+
+
+def _is_stale(export_dir, directory_file):
+    """the directory is stale if users or service principals were imported after it was saved"""
+    directory_mtime = os.path.getmtime(directory_file)
+    for import_log in ['user_name_to_user_id.log', 'service_principals_id_mapping.log']:
+        if os.path.exists(export_dir + import_log) and os.path.getmtime(export_dir + import_log) > directory_mtime:
+            return True
+    return False
+
+
+def get_identity_directory(client, refresh=False):
+    """
+    Return the identity directory of the client's export dir. It is read from identity_directory.json, or built and
+    saved if that file does not exist yet or is stale, and then cached for all clients of the same export dir.
+    :param refresh: rebuild the directory, e.g. after principals were created in the destination workspace
+    """
+    export_dir = client.get_export_dir()
+    with _directories_lock:
+        if refresh or export_dir not in _directories:
+            directory_file = export_dir + IDENTITY_DIRECTORY_FILE
+            if not refresh and os.path.exists(directory_file) and not _is_stale(export_dir, directory_file):
+                directory = IdentityDirectory.load(directory_file)
+            else:
+                directory = IdentityDirectory.build(client)
+                directory.save(directory_file)
+            _directories[export_dir] = directory
+        return _directories[export_dir]
@@ -102,7 +102,7 @@ def main():
             print("Complete Instance Profile Import Time: " + str(timedelta(seconds=end - start)))
         print("Start import of cluster policies ...")
         start = timer()
-        cl_c.import_cluster_policies()
+        cl_c.import_cluster_policies(num_parallel=args.num_parallel)
         end = timer()
         print("Complete Cluster Policies Creation Time: " + str(timedelta(seconds=end - start)))
         print("Start import of instance pool configurations ...")
@@ -112,7 +112,7 @@ def main():
         print("Complete Instance Pools Creation Time: " + str(timedelta(seconds=end - start)))
         print("Start import of cluster configurations ...")
         start = timer()
-        cl_c.import_cluster_configs()
+        cl_c.import_cluster_configs(num_parallel=args.num_parallel)
         end = timer()
         print("Complete Cluster Import Time: " + str(timedelta(seconds=end - start)))
 
@@ -120,7 +120,7 @@ def main():
         print("Importing the jobs configs at {0}".format(now))
         start = timer()
         jobs_c = JobsClient(client_config, checkpoint_service)
-        jobs_c.import_job_configs()
+        jobs_c.import_job_configs(num_parallel=args.num_parallel)
         end = timer()
         print("Complete Jobs Export Time: " + str(timedelta(seconds=end - start)))
 
@@ -240,7 +240,7 @@ def main():
         jobs_c = JobsClient(client_config, checkpoint_service)
         # this will only import the groups jobs since we're filtering the jobs during the export process
         print('Importing the groups members jobs:')
-        jobs_c.import_job_configs()
+        jobs_c.import_job_configs(num_parallel=args.num_parallel)
         end = timer()
         print("Complete User Export Time: " + str(timedelta(seconds=end - start)))
 
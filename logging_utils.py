@@ -2,8 +2,11 @@ import logging
 import json
 import os
 import re
+import threading
 import wmconstants
 
+_error_loggers_lock = threading.Lock()
+
 
 def set_default_logging(parent_dir, level=logging.INFO):
     os.makedirs(_get_log_dir(parent_dir), exist_ok=True)
@@ -11,25 +14,39 @@ def set_default_logging(parent_dir, level=logging.INFO):
     all_log_handler = logging.FileHandler(log_file)
     console_handler = logging.StreamHandler()
 
+    # force replaces and closes the handlers of a previous call, e.g. of the previous session of a --sync cycle
     logging.basicConfig(format="%(asctime)s;%(levelname)s;%(message)s",
                         datefmt='%Y-%m-%d,%H:%M:%S',
                         level=level,
-                        handlers=[all_log_handler, console_handler])
+                        handlers=[all_log_handler, console_handler],
+                        force=True)
 
 
 def get_error_logger(action_type, object_type, log_dir):
     """
     Failures are written to object specific log file.
+    The logger is shared by all callers of the same object type, and its file handler is added once per log file.
+    Handlers of the files in other log dirs, e.g. of a previous session, are closed.
     """
     logger = logging.getLogger(f"workspace_migration_{object_type}")
 
     failed_log_file = get_error_log_file(action_type, object_type, log_dir)
     os.makedirs(_get_log_dir(log_dir), exist_ok=True)
 
-    error_handler = logging.FileHandler(failed_log_file, 'w+')
-    error_handler.setLevel(logging.ERROR)
+    with _error_loggers_lock:
+        for handler in list(logger.handlers):
+            if not isinstance(handler, logging.FileHandler):
+                continue
+            if handler.baseFilename == os.path.abspath(failed_log_file):
+                return logger
+            if os.path.dirname(handler.baseFilename) != os.path.abspath(_get_log_dir(log_dir)):
+                logger.removeHandler(handler)
+                handler.close()
+
+        error_handler = logging.FileHandler(failed_log_file, 'w+')
+        error_handler.setLevel(logging.ERROR)
 
-    logger.addHandler(error_handler)
+        logger.addHandler(error_handler)
     return logger
 
 
@@ -1,12 +1,90 @@
+import argparse
+import json
 import os.path
+import time
 from datetime import datetime
 from pipeline import Pipeline
 from tasks import *
+from validate import session_delta
 import wmconstants
 from checkpoint_service import CheckpointService
 import logging_utils
 
 
+# Primary keys used to match exported items, shared by validation and session delta imports.
+GROUPS_DIFF_CONFIG = DiffConfig(
+    primary_key='displayName',
+    ignored_keys={'id'},
+    children={
+        "members": DiffConfig(
+            primary_key="display",
+            ignored_keys={"value", "$ref"}
+        ),
+        "roles": DiffConfig(
+            primary_key="value",
+        ),
+        "groups": DiffConfig(
+            primary_key="display",
+            ignored_keys={'value', '$ref'}
+        ),
+        "entitlements": DiffConfig(
+            primary_key="value",
+        ),
+    })
+WORKSPACE_ITEM_DIFF_CONFIG = DiffConfig(primary_key='path', ignored_keys={'object_id', 'modified_at'})
+WORKSPACE_ACL_DIFF_CONFIG = DiffConfig(
+    primary_key='path',
+    ignored_keys={'object_id'},
+    children={
+        "access_control_list": DiffConfig(
+            primary_key=["user_name", "group_name"],
+            children={
+                "all_permissions": DiffConfig(
+                    primary_key="__HASH__",
+                    ignored_keys={'inherited_from_object'}
+                )
+            }
+        )
+    }
+)
+CLUSTERS_DIFF_CONFIG = DiffConfig(
+    primary_key="cluster_name",
+    ignored_keys=["cluster_id", "policy_id", "instance_pool_id", "spark_version"],
+    children={
+        "aws_attributes": DiffConfig(
+            ignored_keys=["zone_id"]
+        )
+    }
+)
+CLUSTER_POLICIES_DIFF_CONFIG = DiffConfig(
+    primary_key="name",
+    ignored_keys=["policy_id", "created_at_timestamp"],
+)
+ACL_CLUSTERS_DIFF_CONFIG = DiffConfig(
+    primary_key='cluster_name',
+    ignored_keys={'object_id'},
+    children={
+        "access_control_list": DiffConfig(
+            primary_key=["user_name", "group_name"],
+            children={
+                "all_permissions": DiffConfig(
+                    primary_key="__HASH__",
+                    ignored_keys={'inherited_from_object'}
+                )
+            }
+        )
+    }
+)
+ACL_CLUSTER_POLICIES_DIFF_CONFIG = DiffConfig(
+    primary_key='name',
+    ignored_keys={'object_id'},
+    children=ACL_CLUSTERS_DIFF_CONFIG.children
+)
+# jobs are only matched within one workspace, where job ids are stable
+JOBS_DIFF_CONFIG = DiffConfig(primary_key='job_id')
+ACL_JOBS_DIFF_CONFIG = DiffConfig(primary_key='object_id', children=ACL_CLUSTERS_DIFF_CONFIG.children)
+
+
 def generate_session(args) -> str:
     if args.validate_pipeline:
         prefix = 'V'
@@ -59,6 +137,11 @@ def build_pipeline(args) -> Pipeline:
 
     client_config['timeout'] = args.timeout
 
+    # previous export session used as baseline for incremental notebook exports
+    if args.incremental_from_session:
+        client_config['incremental_baseline_dir'] = os.path.join(
+            client_config['base_dir'], args.incremental_from_session) + '/'
+
     if not args.dry_run:
         os.makedirs(client_config['export_dir'], exist_ok=True)
 
@@ -71,6 +154,12 @@ def build_pipeline(args) -> Pipeline:
     if args.export_pipeline:
         return build_export_pipeline(client_config, checkpoint_service, args)
 
+    if args.pass_through_notebooks:
+        return build_pass_through_pipeline(client_config, checkpoint_service, args)
+
+    if args.import_pipeline and args.delta_from_session:
+        return build_delta_import_pipeline(client_config, args)
+
     if args.import_pipeline:
         return build_import_pipeline(client_config, checkpoint_service, args)
 
@@ -120,6 +209,38 @@ def build_export_pipeline(client_config, checkpoint_service, args) -> Pipeline:
     return pipeline
 
 
+def build_pass_through_pipeline(client_config, checkpoint_service, args) -> Pipeline:
+    """
+    Stream notebooks from --profile into --destination-profile
+    log_workspace_items -> pass_through_notebooks
+    """
+    if not args.destination_profile:
+        raise ValueError('--pass-through-notebooks requires --destination-profile.')
+    login_args = parser.get_login_credentials(profile=args.destination_profile)
+    dst_client_config = parser.build_client_config(
+        args.destination_profile, login_args['host'], login_args.get('token', login_args.get('password')), args)
+    for key in ['session', 'no_prompt', 'groups_to_keep', 'skip_missing_users', 'base_dir', 'export_dir',
+                'verbose', 'timeout']:
+        dst_client_config[key] = client_config[key]
+    dst_client_config['max_requests_per_second'] = args.destination_max_requests_per_second
+
+    if not client_config.get("no_prompt", None):
+        confirm = input(f"Pass notebooks through from `{client_config['url']}` into "
+                        f"`{dst_client_config['url']}`? (y/N) ")
+        if confirm.lower() not in ["y", "yes"]:
+            raise RuntimeError("User aborted pass through pipeline. Exiting..")
+    with open(os.path.join(client_config['export_dir'], "source_info.txt"), 'w') as f:
+        f.write(client_config['url'])
+
+    completed_pipeline_steps = checkpoint_service.get_checkpoint_key_set(
+        wmconstants.WM_IMPORT, wmconstants.MIGRATION_PIPELINE_OBJECT_TYPE)
+    pipeline = Pipeline(client_config['export_dir'], completed_pipeline_steps, args.dry_run)
+    workspace_item_log_export = pipeline.add_task(WorkspaceItemLogExportTask(client_config, args, checkpoint_service))
+    pipeline.add_task(NotebookPassThroughTask(client_config, dst_client_config, checkpoint_service, args),
+                      [workspace_item_log_export])
+    return pipeline
+
+
 def build_import_pipeline(client_config, checkpoint_service, args) -> Pipeline:
     """
     All import jobs
@@ -156,6 +277,63 @@ def build_import_pipeline(client_config, checkpoint_service, args) -> Pipeline:
     return pipeline
 
 
+def build_delta_import_pipeline(client_config, args) -> Pipeline:
+    """
+    Import only what changed between the session imported last (--delta-from-session) and the current session.
+    The delta is laid out in {session}/delta/, which is used as export_dir by all import tasks.
+    session_delta -> import_groups -> import_notebooks -> import_workspace_acls
+                                   -> import_clusters_delta -> import_jobs_delta
+    """
+    skip_tasks = args.skip_tasks
+    base_dir = os.path.join(client_config['base_dir'], args.delta_from_session) + '/'
+    current_dir = client_config['export_dir']
+
+    with open(os.path.join(current_dir, "source_info.txt"), 'r') as f:
+        source_url = f.readline()
+        if not client_config.get("no_prompt", None):
+            confirm = input(f"Import changes since session {args.delta_from_session} from `{source_url}` into "
+                            f"`{client_config['url']}`? (y/N) ")
+            if confirm.lower() not in ["y", "yes"]:
+                raise RuntimeError("User aborted import pipeline. Exiting..")
+
+    delta_config = dict(client_config)
+    delta_config['export_dir'] = os.path.join(current_dir, 'delta') + '/'
+    # changed notebooks already exist in the destination and can only be replaced in SOURCE format
+    if str(args.notebook_format) == 'SOURCE':
+        delta_config['overwrite_notebooks'] = True
+    else:
+        logging.info("Changed notebooks can only be overwritten with --notebook-format SOURCE; "
+                     "only new notebooks will be imported.")
+    if not args.dry_run:
+        os.makedirs(delta_config['export_dir'], exist_ok=True)
+    checkpoint_service = CheckpointService(delta_config)
+
+    diff_configs = {
+        'groups': session_delta.delta_config(GROUPS_DIFF_CONFIG),
+        'user_dirs.log': session_delta.delta_config(WORKSPACE_ITEM_DIFF_CONFIG, {'object_id', 'modified_at'}),
+        'user_workspace.log': session_delta.delta_config(WORKSPACE_ITEM_DIFF_CONFIG, {'object_id'}),
+        'acl_notebooks.log': session_delta.delta_config(WORKSPACE_ACL_DIFF_CONFIG),
+        'acl_directories.log': session_delta.delta_config(WORKSPACE_ACL_DIFF_CONFIG),
+        'cluster_policies.log': session_delta.delta_config(CLUSTER_POLICIES_DIFF_CONFIG, ["created_at_timestamp"]),
+        'acl_cluster_policies.log': session_delta.delta_config(ACL_CLUSTER_POLICIES_DIFF_CONFIG),
+        'clusters.log': session_delta.delta_config(CLUSTERS_DIFF_CONFIG),
+        'acl_clusters.log': session_delta.delta_config(ACL_CLUSTERS_DIFF_CONFIG),
+        'jobs.log': JOBS_DIFF_CONFIG,
+        'acl_jobs.log': ACL_JOBS_DIFF_CONFIG,
+    }
+
+    completed_pipeline_steps = checkpoint_service.get_checkpoint_key_set(
+        wmconstants.WM_IMPORT, wmconstants.MIGRATION_PIPELINE_OBJECT_TYPE)
+    pipeline = Pipeline(delta_config['export_dir'], completed_pipeline_steps, args.dry_run)
+    delta = pipeline.add_task(SessionDeltaTask(base_dir, current_dir, delta_config['export_dir'], diff_configs))
+    import_groups = pipeline.add_task(GroupImportTask(delta_config, checkpoint_service, wmconstants.GROUPS in skip_tasks), [delta])
+    import_notebooks = pipeline.add_task(WorkspaceImportTask(delta_config, checkpoint_service, args, wmconstants.NOTEBOOKS in skip_tasks), [import_groups])
+    pipeline.add_task(WorkspaceACLImportTask(delta_config, checkpoint_service, wmconstants.WORKSPACE_ACLS in skip_tasks), [import_notebooks])
+    import_clusters = pipeline.add_task(ClustersDeltaImportTask(delta_config, checkpoint_service, wmconstants.CLUSTERS in skip_tasks), [import_groups])
+    pipeline.add_task(JobsDeltaImportTask(delta_config, checkpoint_service, wmconstants.JOBS in skip_tasks), [import_clusters])
+    return pipeline
+
+
 def build_validate_pipeline(client_config, checkpoint_service, args):
     completed_pipeline_steps = checkpoint_service.get_checkpoint_key_set(
         wmconstants.WM_VALIDATE, wmconstants.MIGRATION_PIPELINE_OBJECT_TYPE)
@@ -205,48 +383,14 @@ def build_validate_pipeline(client_config, checkpoint_service, args):
             }),
     )
     # GroupExportTask
-    add_dir_diff_task("validate-groups", "groups", DiffConfig(
-        primary_key='displayName',
-        ignored_keys={'id'},
-        children={
-            "members": DiffConfig(
-                primary_key="display",
-                ignored_keys={"value", "$ref"}
-            ),
-            "roles": DiffConfig(
-                primary_key="value",
-            ),
-            "groups": DiffConfig(
-                primary_key="display",
-                ignored_keys={'value', '$ref'}
-            ),
-            "entitlements": DiffConfig(
-                primary_key="value",
-            ),
-        }))
+    add_dir_diff_task("validate-groups", "groups", GROUPS_DIFF_CONFIG)
     # WorkspaceItemLogExportTask
-    workspace_item_config = DiffConfig(primary_key='path', ignored_keys={'object_id'})
-    add_diff_task("validate-user_dirs", "user_dirs.log", workspace_item_config)
-    add_diff_task("validate-user_workspace", "user_workspace.log", workspace_item_config)
-    add_diff_task("validate-libraries", "libraries.log", workspace_item_config)
+    add_diff_task("validate-user_dirs", "user_dirs.log", WORKSPACE_ITEM_DIFF_CONFIG)
+    add_diff_task("validate-user_workspace", "user_workspace.log", WORKSPACE_ITEM_DIFF_CONFIG)
+    add_diff_task("validate-libraries", "libraries.log", WORKSPACE_ITEM_DIFF_CONFIG)
     # WorkspaceACLExportTask
-    acl_config = DiffConfig(
-        primary_key='path',
-        ignored_keys={'object_id'},
-        children={
-            "access_control_list": DiffConfig(
-                primary_key=["user_name", "group_name"],
-                children={
-                    "all_permissions": DiffConfig(
-                        primary_key="__HASH__",
-                        ignored_keys={'inherited_from_object'}
-                    )
-                }
-            )
-        }
-    )
-    add_diff_task("validate-acl_notebooks", "acl_notebooks.log", acl_config)
-    add_diff_task("validate-acl_directories", "acl_directories.log", acl_config)
+    add_diff_task("validate-acl_notebooks", "acl_notebooks.log", WORKSPACE_ACL_DIFF_CONFIG)
+    add_diff_task("validate-acl_directories", "acl_directories.log", WORKSPACE_ACL_DIFF_CONFIG)
     # SecretExportTask
     add_dir_diff_task("validate-secrets_scopes", "secret_scopes", DiffConfig(primary_key='name'))
     add_diff_task("validate-secret_scopes_acls", "secret_scopes_acls.log", DiffConfig(
@@ -258,49 +402,10 @@ def build_validate_pipeline(client_config, checkpoint_service, args):
         }
     ))
     #  ClustersExportTask
-    add_diff_task("validate-clusters", "clusters.log", DiffConfig(
-        primary_key="cluster_name",
-        ignored_keys=["cluster_id", "policy_id", "instance_pool_id", "spark_version"],
-        children={
-            "aws_attributes": DiffConfig(
-                ignored_keys=["zone_id"]
-            )
-        }
-    ))
-    add_diff_task("validate-cluster_policies", "cluster_policies.log", DiffConfig(
-        primary_key="name",
-        ignored_keys=["policy_id", "created_at_timestamp"],
-    ))
-    add_diff_task("validate-acl_clusters", "acl_clusters.log", DiffConfig(
-        primary_key='cluster_name',
-        ignored_keys={'object_id'},
-        children={
-            "access_control_list": DiffConfig(
-                primary_key=["user_name", "group_name"],
-                children={
-                    "all_permissions": DiffConfig(
-                        primary_key="__HASH__",
-                        ignored_keys={'inherited_from_object'}
-                    )
-                }
-            )
-        }
-    ))
-    add_diff_task("validate-acl_cluster_policies", "acl_cluster_policies.log", DiffConfig(
-        primary_key='name',
-        ignored_keys={'object_id'},
-        children={
-            "access_control_list": DiffConfig(
-                primary_key=["user_name", "group_name"],
-                children={
-                    "all_permissions": DiffConfig(
-                        primary_key="__HASH__",
-                        ignored_keys={'inherited_from_object'}
-                    )
-                }
-            )
-        }
-    ))
+    add_diff_task("validate-clusters", "clusters.log", CLUSTERS_DIFF_CONFIG)
+    add_diff_task("validate-cluster_policies", "cluster_policies.log", CLUSTER_POLICIES_DIFF_CONFIG)
+    add_diff_task("validate-acl_clusters", "acl_clusters.log", ACL_CLUSTERS_DIFF_CONFIG)
+    add_diff_task("validate-acl_cluster_policies", "acl_cluster_policies.log", ACL_CLUSTER_POLICIES_DIFF_CONFIG)
     # InstancePoolsExportTask
     add_diff_task("validate-instance_pools", "instance_pools.log", DiffConfig(
         primary_key="instance_pool_name",
@@ -339,11 +444,92 @@ def build_validate_pipeline(client_config, checkpoint_service, args):
     return pipeline
 
 
+# objects exported in every sync cycle, i.e. everything the delta import pipeline can apply
+SYNC_EXPORT_TASKS = [wmconstants.USERS, wmconstants.GROUPS, wmconstants.WORKSPACE_ITEM_LOG,
+                     wmconstants.WORKSPACE_ACLS, wmconstants.NOTEBOOKS, wmconstants.CLUSTERS,
+                     wmconstants.INSTANCE_POOLS, wmconstants.JOBS]
+
+
+def _sync_cycle_args(args, **overrides):
+    cycle_args = argparse.Namespace(**vars(args))
+    cycle_args.sync = False
+    for key, value in overrides.items():
+        setattr(cycle_args, key, value)
+    return cycle_args
+
+
+def log_sync_lag(watermarks, summary=None):
+    """Log, for each object type, how long ago the source state that the destination now holds was exported."""
+    now = time.time()
+    for object_type in sorted(key for key in watermarks.keys() if key != 'last_session'):
+        watermark = json.loads(watermarks.get(object_type))
+        lag = int(now - watermark['exported_at'])
+        changes = summary.get(object_type + '.log', summary.get(object_type)) if summary else None
+        logging.info(f"Sync lag {object_type}: {lag}s (session {watermark['session']})"
+                     + (f", changes {changes}" if changes else ""))
+
+
+def run_sync(args):
+    """
+    Repeatedly export the changes of the source workspace and import them into the destination workspace.
+    Each cycle exports a new session incrementally from the last synced session and imports its delta. The last
+    synced session and the export time of every object type are kept in the sync watermark checkpoint of the export
+    dir, so an interrupted sync resumes from the last cycle that was fully imported.
+    """
+    if not args.destination_profile:
+        raise ValueError('--sync requires --destination-profile.')
+    export_dir = parser.build_client_config_without_profile(args)['export_dir']
+    os.makedirs(export_dir, exist_ok=True)
+    watermarks = CheckpointService({'use_checkpoint': True, 'export_dir': export_dir}).get_checkpoint_key_map(
+        wmconstants.WM_SYNC, wmconstants.SYNC_WATERMARK_OBJECT)
+    if not watermarks.contains('last_session'):
+        if not args.delta_from_session:
+            raise ValueError('The first --sync cycle requires --delta-from-session, the session that was imported '
+                             'into the destination workspace last.')
+        watermarks.update('last_session', args.delta_from_session)
+
+    cycle = 0
+    while args.sync_cycles <= 0 or cycle < args.sync_cycles:
+        cycle += 1
+        started_at = time.time()
+        last_session = watermarks.get('last_session')
+        session = generate_session(args)
+        logging.info(f"Sync cycle {cycle}: exporting session {session} incrementally from {last_session}")
+        try:
+            build_pipeline(_sync_cycle_args(
+                args, session=session, export_pipeline=True, import_pipeline=False, use_checkpoint=True,
+                incremental_from_session=last_session, delta_from_session='', keep_tasks=SYNC_EXPORT_TASKS)).run()
+            build_pipeline(_sync_cycle_args(
+                args, session=session, profile=args.destination_profile, export_pipeline=False,
+                import_pipeline=True, use_checkpoint=True, incremental_from_session='',
+                delta_from_session=last_session, no_prompt=True)).run()
+
+            with open(os.path.join(export_dir, session, 'delta', 'delta_summary.json'), 'r') as fp:
+                summary = json.loads(fp.read())
+            for log_file in summary:
+                object_type = log_file[:-len('.log')] if log_file.endswith('.log') else log_file
+                watermarks.update(object_type, json.dumps({'session': session, 'exported_at': started_at}))
+            # advanced last, a cycle interrupted before this point is redone from the same session
+            watermarks.update('last_session', session)
+            log_sync_lag(watermarks, summary)
+        except Exception as e:
+            logging.error(f"Sync cycle {cycle} of session {session} failed, retrying from {last_session} in the "
+                          f"next cycle: {e}")
+            log_sync_lag(watermarks)
+
+        if args.sync_cycles <= 0 or cycle < args.sync_cycles:
+            time.sleep(max(0.0, started_at + args.sync_interval_minutes * 60 - time.time()))
+
+
 def main():
     args = parser.get_pipeline_parser().parse_args()
     if os.name == 'nt' and (not args.bypass_windows_check):
         raise ValueError('This tool currently does not support running on Windows OS')
 
+    if args.sync:
+        run_sync(args)
+        return
+
     pipeline = build_pipeline(args)
     pipeline.run()
 
@@ -58,10 +58,45 @@ class Pipeline:
 
     def run(self):
         """The current implementation runs task sequentially in a thread pool."""
+        prewarms = self._prewarm_tasks()
         with ThreadPoolExecutor() as executor:
             for task in self._tasks:
                 future = executor.submit(functools.partial(self._run_task, task))
-                future.result()
+                try:
+                    future.result()
+                except Exception:
+                    self._log_unused_prewarms(prewarms)
+                    raise
+                prewarms.pop(task.name, None)
+
+    def _prewarm_tasks(self):
+        """:return: dict of task name -> future of its preparation, for the tasks that returned one"""
+        prewarms = {}
+        if self._dry_run:
+            return prewarms
+        for task in self._tasks:
+            if task.skip or self._completed_steps.contains(f'{task.name}'):
+                continue
+            try:
+                future = task.prewarm()
+            except Exception as e:
+                # the task prepares itself when it runs
+                logging.info(f'Failed to prewarm {task.name}: {e}')
+                continue
+            if future is not None:
+                prewarms[task.name] = future
+        return prewarms
+
+    @staticmethod
+    def _log_unused_prewarms(prewarms):
+        """Log the clusters that were prewarmed for tasks that will not run since the pipeline failed."""
+        for task_name, future in prewarms.items():
+            if not future.done():
+                logging.warning(f'The cluster prewarmed for {task_name} is still starting. It keeps running until '
+                                f'its auto termination unless it is terminated.')
+            elif future.exception() is None:
+                logging.warning(f'Cluster {future.result()} prewarmed for {task_name} keeps running until its auto '
+                                f'termination unless it is terminated.')
 
     def _run_task(self, task: AbstractTask):
         if self._completed_steps.contains(f'{task.name}'):
@@ -1,5 +1,7 @@
+import tempfile
 import unittest
 import os
+from concurrent.futures import Future
 
 from .pipeline import Pipeline
 from .task import AbstractTask
@@ -16,6 +18,21 @@ class AppendTask(AbstractTask):
     def run(self):
         self._result.append(self.number)
 
+class PrewarmTask(AbstractTask):
+    def __init__(self, name, prewarmed, skip=False, prewarm_future=None, fail=False):
+        super().__init__(name, 'test', 'test', skip)
+        self._prewarmed = prewarmed
+        self._prewarm_future = prewarm_future
+        self._fail = fail
+
+    def prewarm(self):
+        self._prewarmed.append(self.name)
+        return self._prewarm_future
+
+    def run(self):
+        if self._fail:
+            raise RuntimeError(f'{self.name} failed')
+
 class PipelineTest(unittest.TestCase):
 
     def setUp(self):
@@ -71,6 +88,40 @@ class PipelineTest(unittest.TestCase):
         pipeline.run()
         self.assertEqual(result, [])
 
+    def test_prewarm_tasks_to_run(self):
+        checkpoint_file = os.path.join(tempfile.mkdtemp(), 'pipeline_steps.log')
+        with open(checkpoint_file, 'w+') as wp:
+            wp.write("task1\n")
+
+        prewarmed = []
+        pipeline = Pipeline('test_data', CheckpointKeySet(checkpoint_file))
+        for task_name, skip in [("task1", False), ("task2", True), ("task3", False)]:
+            pipeline.add_task(PrewarmTask(task_name, prewarmed, skip=skip))
+        pipeline.run()
+        self.assertEqual(prewarmed, ["task3"])
+
+        prewarmed = []
+        pipeline = Pipeline('test_data', DisabledCheckpointKeySet(), dry_run=True)
+        pipeline.add_task(PrewarmTask("task1", prewarmed))
+        pipeline.run()
+        self.assertEqual(prewarmed, [])
+
+    def test_failed_pipeline_logs_unused_prewarms(self):
+        prewarmed = []
+        used, started, starting = Future(), Future(), Future()
+        for future in (used, started):
+            future.set_result('cluster-id')
+        pipeline = Pipeline(tempfile.mkdtemp(), DisabledCheckpointKeySet())
+        pipeline.add_task(PrewarmTask("task1", prewarmed, prewarm_future=used))
+        pipeline.add_task(PrewarmTask("task2", prewarmed, fail=True))
+        pipeline.add_task(PrewarmTask("task3", prewarmed, prewarm_future=started))
+        pipeline.add_task(PrewarmTask("task4", prewarmed, prewarm_future=starting))
+        with self.assertLogs(level='WARNING') as logs, self.assertRaises(RuntimeError):
+            pipeline.run()
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('Cluster cluster-id prewarmed for task3', logs.output[0])
+        self.assertIn('prewarmed for task4 is still starting', logs.output[1])
+
     def _create_test_pipeline(self, pipeline_steps_key_set, task_names, result):
         pipeline = Pipeline('test_data', pipeline_steps_key_set)
         parents = []
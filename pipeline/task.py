@@ -14,3 +14,9 @@ class AbstractTask(ABC):
     def run(self):
         """Run the task."""
         pass
+
+    def prewarm(self):
+        """Start slow preparations of the task in the background, e.g. the cluster it runs commands on.
+        Called when the pipeline starts, for every task that is going to run.
+        :return: optional future of the preparation, e.g. that resolves to the id of the prewarmed cluster"""
+        pass
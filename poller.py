@@ -0,0 +1,64 @@
+import logging
+import random
+import time
+
+
+class Poller():
+    """Waits for remote objects to reach a final state, e.g. clusters to start or notebook runs to terminate.
+
+    The state is polled first right away, then with exponential backoff from initial_interval up to max_interval
+    seconds. A random jitter keeps concurrent waiters from polling in lockstep. After timeout seconds a TimeoutError is
+    raised instead of waiting forever. wait_all checks the states of many objects with one call per poll.
+    """
+
+    def __init__(self, initial_interval=1, max_interval=30, backoff=2, jitter=0.2, timeout=3600, max_errors=0):
+        """
+        :param max_errors: number of failed polls that are retried before the error is raised
+        """
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        self.max_errors = max_errors
+
+    def wait_all(self, keys, get_states, is_done, description='objects'):
+        """
+        :param keys: keys of the objects to wait for
+        :param get_states: function of the list of pending keys that returns a dict of key -> state; missing keys are
+        still pending
+        :param is_done: function of a state that returns True for final states
+        :return: dict of key -> final state
+        """
+        deadline = time.monotonic() + self.timeout
+        interval = self.initial_interval
+        pending = list(keys)
+        final_states = {}
+        num_errors = 0
+        while True:
+            try:
+                states = get_states(pending)
+            except Exception as e:
+                num_errors += 1
+                if num_errors > self.max_errors:
+                    raise
+                logging.info(f"Polling {description} failed ({num_errors} of {self.max_errors} retries): {e}")
+                states = {}
+            for key in list(pending):
+                if key in states and is_done(states[key]):
+                    final_states[key] = states[key]
+                    pending.remove(key)
+            if not pending:
+                return final_states
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Timed out after {self.timeout} seconds waiting for {description}: {pending}")
+            time.sleep(min(interval * random.uniform(1 - self.jitter, 1 + self.jitter), remaining))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    def wait(self, get_state, is_done, description='object'):
+        """
+        :param get_state: function that returns the state of the object
+        :return: final state
+        """
+        return self.wait_all([description], lambda keys: {description: get_state()}, is_done, description)[description]
@@ -0,0 +1,105 @@
+import base64
+import gzip
+import json
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import logging_utils
+
+RESULT_SIZE_MARKER = '__migration_result_size__='
+
+# installed once per execution context, writes a result as compressed json to dbfs and prints its size on a marked
+# line, so that other output of the command, e.g. warnings, is ignored. A partially written result is deleted.
+REMOTE_RESULT_HELPER = f'''
+def _migration_write_result(result, path):
+    import gzip, json, os
+    local_path = '/dbfs' + path
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    try:
+        with gzip.open(local_path, 'wt', encoding='utf-8') as fp:
+            json.dump(result, fp)
+    except BaseException:
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        raise
+    print('{RESULT_SIZE_MARKER}' + str(os.path.getsize(local_path)))
+'''
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+class RemoteResultTransport():
+    """Fetches results of remote commands (rest api 1.2) that are too large for the command output.
+
+    The result is written as compressed json to a unique dbfs path by a helper that is installed once per execution
+    context, and downloaded with parallel ranged /dbfs/read calls. Clients share the transport of their workspace
+    through get_remote_result_transport.
+    """
+
+    RESULTS_DIR = '/tmp/migration/results/'
+    READ_SIZE = 1024 * 1024  # max length of /dbfs/read
+
+    def __init__(self, client, num_parallel):
+        self._client = client
+        self._num_parallel = num_parallel
+        self._lock = threading.Lock()
+        self._helper_contexts = set()  # (cluster id, execution context id) with the helper installed
+
+    def _install_helper(self, cid, ec_id):
+        with self._lock:
+            if (cid, ec_id) in self._helper_contexts:
+                return
+        results = self._client.submit_command(cid, ec_id, REMOTE_RESULT_HELPER)
+        if logging_utils.check_error(results):
+            raise ValueError(f"Unable to install the remote result helper: {results.get('summary', None)}")
+        with self._lock:
+            self._helper_contexts.add((cid, ec_id))
+
+    def _read(self, path, offset):
+        resp = self._client.get('/dbfs/read', {'path': path, 'offset': offset, 'length': self.READ_SIZE})
+        if logging_utils.check_error(resp):
+            raise ValueError(f"Unable to read {path} at offset {offset}: {json.dumps(resp)}")
+        return base64.b64decode(resp.get('data', ''))
+
+    @staticmethod
+    def _parse_size(output):
+        for line in reversed(str(output).splitlines()):
+            if line.startswith(RESULT_SIZE_MARKER):
+                return int(line[len(RESULT_SIZE_MARKER):])
+        raise ValueError(f"Remote command output has no result size: {output}")
+
+    def get(self, cid, ec_id, expression, error_logger=None):
+        """
+        :param expression: python expression to evaluate in the execution context, its value must be json
+        serializable
+        :param error_logger: logger of the command error, if any
+        :return: value of the expression
+        """
+        self._install_helper(cid, ec_id)
+        path = f'{self.RESULTS_DIR}{uuid.uuid4().hex}.json.gz'
+        results = self._client.submit_command(cid, ec_id, f"_migration_write_result({expression}, '{path}')")
+        if logging_utils.check_error(results):
+            if error_logger:
+                logging_utils.log_response_error(error_logger, results)
+            raise ValueError(f"Remote command failed: {results.get('summary', None)}")
+        try:
+            size = self._parse_size(results.get('data', ''))
+            with ThreadPoolExecutor(max_workers=self._num_parallel) as executor:
+                chunks = executor.map(lambda offset: self._read(path, offset), range(0, size, self.READ_SIZE))
+                data = b''.join(chunks)
+        finally:
+            self._client.post('/dbfs/delete', {'path': path})
+        logging.info(f"Downloaded remote result of {size} bytes")
+        return json.loads(gzip.decompress(data).decode('utf-8'))
+
+
+def get_remote_result_transport(client, num_parallel):
+    """Return the remote result transport of the client's workspace, shared by all clients."""
+    url = client.get_url()
+    with _transports_lock:
+        if url not in _transports:
+            _transports[url] = RemoteResultTransport(client, num_parallel)
+        return _transports[url]
@@ -2,12 +2,14 @@ import logging
 
 import json
 import os
+import shutil
 
 import validate
 from collections import defaultdict
 from pipeline import AbstractTask
 from dbclient import *
 from validate import *
+from validate import session_delta
 from timeit import default_timer as timer
 from datetime import timedelta
 import wmconstants
@@ -63,7 +65,7 @@ class GroupExportTask(AbstractTask):
 
     def run(self):
         scim_c = ScimClient(self.client_config, self.checkpoint_service)
-        scim_c.log_all_groups()
+        scim_c.log_all_groups(num_parallel=self.client_config["num_parallel"])
 
 
 class InstanceProfileImportTask(AbstractTask):
@@ -115,7 +117,7 @@ class GroupImportTask(AbstractTask):
 
     def run(self):
         scim_c = ScimClient(self.client_config, self.checkpoint_service)
-        scim_c.import_all_groups()
+        scim_c.import_all_groups(num_parallel=self.client_config["num_parallel"])
 
 class WorkspaceItemLogExportTask(AbstractTask):
     """Task that log all workspace items to download them at a later time.
@@ -183,10 +185,35 @@ class NotebookExportTask(AbstractTask):
 
     def run(self):
         ws_c = WorkspaceClient(self.client_config, self.checkpoint_service)
-        num_notebooks = ws_c.download_notebooks(num_parallel=self.client_config["num_parallel"])
+        num_notebooks = ws_c.download_notebooks(num_parallel=self.client_config["num_parallel"],
+                                                baseline_dir=self.client_config.get("incremental_baseline_dir"))
         print(f"Total number of notebooks downloaded: {num_notebooks}")
 
 
+class NotebookPassThroughTask(AbstractTask):
+    """Task that streams all logged notebooks from the source into the destination workspace.
+
+    Notebooks are only saved locally, to the artifacts/ dir of the session, if --keep-local-artifacts is set.
+    """
+    def __init__(self, client_config, dst_client_config, checkpoint_service, args, skip=False):
+        super().__init__("pass_through_notebooks", wmconstants.WM_IMPORT, wmconstants.WORKSPACE_NOTEBOOK_OBJECT, skip)
+        self.client_config = client_config
+        self.dst_client_config = dst_client_config
+        self.checkpoint_service = checkpoint_service
+        self.args = args
+
+    def run(self):
+        ws_c = WorkspaceClient(self.client_config, self.checkpoint_service)
+        dst_ws_c = WorkspaceClient(self.dst_client_config, self.checkpoint_service)
+        if dst_ws_c.is_overwrite_notebooks() and not dst_ws_c.is_source_file_format():
+            raise ValueError('Overwrite notebooks only supports the SOURCE format. See Rest API docs for details')
+        local_dir = ws_c.get_export_dir() + 'artifacts/' if self.args.keep_local_artifacts else None
+        num_notebooks = ws_c.pass_through_notebooks(dst_ws_c, num_parallel=self.client_config["num_parallel"],
+                                                    queue_size=self.args.pass_through_queue_size,
+                                                    archive_missing=self.args.archive_missing, local_dir=local_dir)
+        print(f"Total number of notebooks passed through: {num_notebooks}")
+
+
 class WorkspaceACLImportTask(AbstractTask):
     """Task that import ACLs of all notebooks and directories.
 
@@ -239,8 +266,8 @@ class ClustersExportTask(AbstractTask):
     def run(self):
         cl_c = ClustersClient(self.client_config, self.checkpoint_service)
         # log the cluster json
-        cl_c.log_cluster_configs()
-        cl_c.log_cluster_policies()
+        cl_c.log_cluster_configs(num_parallel=self.client_config["num_parallel"])
+        cl_c.log_cluster_policies(num_parallel=self.client_config["num_parallel"])
 
 
 class InstancePoolsExportTask(AbstractTask):
@@ -266,8 +293,8 @@ class ClustersImportTask(AbstractTask):
 
     def run(self):
         cl_c = ClustersClient(self.client_config, self.checkpoint_service)
-        cl_c.import_cluster_policies()
-        cl_c.import_cluster_configs()
+        cl_c.import_cluster_policies(num_parallel=self.client_config["num_parallel"])
+        cl_c.import_cluster_configs(num_parallel=self.client_config["num_parallel"])
 
 
 class InstancePoolsImportTask(AbstractTask):
@@ -299,9 +326,10 @@ class JobsExportTask(AbstractTask):
         jobs_c = JobsClient(self.client_config, self.checkpoint_service)
 
         if self.client_config.get("groups_to_keep"):
-            jobs_c.log_job_configs(groups_list=self.client_config.get("groups_to_keep"))
+            jobs_c.log_job_configs(groups_list=self.client_config.get("groups_to_keep"),
+                                   num_parallel=self.client_config["num_parallel"])
         else:
-            jobs_c.log_job_configs()
+            jobs_c.log_job_configs(num_parallel=self.client_config["num_parallel"])
 
 
 class JobsImportTask(AbstractTask):
@@ -318,7 +346,7 @@ class JobsImportTask(AbstractTask):
 
     def run(self):
         jobs_c = JobsClient(self.client_config, self.checkpoint_service)
-        jobs_c.import_job_configs()
+        jobs_c.import_job_configs(num_parallel=self.client_config["num_parallel"])
 
 
 class MetastoreExportTask(AbstractTask):
@@ -333,6 +361,15 @@ class MetastoreExportTask(AbstractTask):
         self.checkpoint_service = checkpoint_service
         self.args = args
 
+    def prewarm(self):
+        hive_c = HiveClient(self.client_config, self.checkpoint_service)
+        if self.args.cluster_name:
+            return hive_c.prewarm_cluster(cluster_name=self.args.cluster_name)
+        else:
+            # export_hive_metastore launches the cluster with the first instance profile
+            instance_profiles = hive_c.get_instance_profiles_list()
+            return hive_c.prewarm_cluster(iam_role=instance_profiles[0] if instance_profiles else None)
+
     def run(self):
         hive_c = HiveClient(self.client_config, self.checkpoint_service)
         hive_c.export_hive_metastore(cluster_name=self.args.cluster_name,
@@ -351,6 +388,10 @@ class MetastoreImportTask(AbstractTask):
         self.checkpoint_service = checkpoint_service
         self.args = args
 
+    def prewarm(self):
+        hive_c = HiveClient(self.client_config, self.checkpoint_service)
+        return hive_c.prewarm_cluster(cluster_name=self.args.cluster_name)
+
     def run(self):
         hive_c = HiveClient(self.client_config, self.checkpoint_service)
         # log job configs
@@ -371,6 +412,10 @@ class MetastoreTableACLExportTask(AbstractTask):
         self.args = args
         self.checkpoint_service = checkpoint_service
 
+    def prewarm(self):
+        table_acls_c = TableACLsClient(self.client_config, self.checkpoint_service)
+        return table_acls_c.prewarm_cluster(enable_table_acls=True)
+
     def run(self):
         table_acls_c = TableACLsClient(self.client_config, self.checkpoint_service)
         notebook_exit_value = table_acls_c.export_table_acls(db_name='')
@@ -396,6 +441,10 @@ class MetastoreTableACLImportTask(AbstractTask):
         self.args = args
         self.checkpoint_service = checkpoint_service
 
+    def prewarm(self):
+        table_acls_c = TableACLsClient(self.client_config, self.checkpoint_service)
+        return table_acls_c.prewarm_cluster(enable_table_acls=True)
+
     def run(self):
         table_acls_c = TableACLsClient(self.client_config, self.checkpoint_service)
         table_acls_c.import_table_acls()
@@ -412,6 +461,10 @@ class SecretExportTask(AbstractTask):
         self.args = args
         self.checkpoint_service = checkpoint_service
 
+    def prewarm(self):
+        secrets_c = SecretsClient(self.client_config, self.checkpoint_service)
+        return secrets_c.prewarm_cluster(cluster_name=self.args.cluster_name)
+
     def run(self):
         secrets_c = SecretsClient(self.client_config, self.checkpoint_service)
         secrets_c.log_all_secrets(cluster_name=self.args.cluster_name)
@@ -433,6 +486,180 @@ class SecretImportTask(AbstractTask):
         secrets_c.import_all_secrets()
 
 
+class SessionDeltaTask(AbstractTask):
+    """Task that lays out the difference between the session imported last and the current export session.
+
+    Added and changed items are written to delta_dir under the file names the delta import tasks read, files the
+    import clients need to map ids are copied as a whole, removed items are listed in delta_removed.log and the
+    counts per log file are written to delta_summary.json.
+    Removed items are only listed for review, the delta import never deletes them from the destination workspace.
+    """
+    # exported files the import clients read to map ids, copied from the current session as a whole
+    REFERENCE_FILES = ['source_info.txt', 'users.log', 'service_principals.log', 'instance_pools.log',
+                       'cluster_policies.log', 'clusters.log', 'repos.log']
+    # files written by the import of the base session, keyed by the name they get in delta_dir. When the base
+    # session was itself imported as a delta (e.g. by --sync), its files are read from its delta/ dir and the job
+    # id maps of the whole chain are concatenated.
+    BASE_IMPORT_FILES = {'user_name_to_user_id.log': ['user_name_to_user_id.log', 'delta/user_name_to_user_id.log'],
+                         'service_principals_id_mapping.log': ['service_principals_id_mapping.log',
+                                                               'delta/service_principals_id_mapping.log'],
+                         'job_id_map_base.log': ['job_id_map.log', 'delta/job_id_map_base.log',
+                                                 'delta/job_id_map.log']}
+    NOTEBOOK_FILE_EXTENSIONS = ['dbc', 'html', 'py', 'scala', 'sql', 'r', 'ipynb']
+
+    def __init__(self, base_dir, current_dir, delta_dir, diff_configs, skip=False):
+        """
+        :param diff_configs: dict of log file / 'groups' dir -> DiffConfig holding the primary keys to match items with
+        """
+        super().__init__("session_delta", wmconstants.WM_IMPORT, wmconstants.SESSION_DELTA_OBJECT, skip)
+        self.base_dir = base_dir
+        self.current_dir = current_dir
+        self.delta_dir = delta_dir
+        self.diff_configs = diff_configs
+        self._summary = {}
+        self._removed = []
+
+    def _diff_log(self, log_file, is_changed=None):
+        delta = session_delta.diff_log_files(self.base_dir + log_file, self.current_dir + log_file,
+                                             self.diff_configs[log_file], is_changed)
+        self._summary[log_file] = delta.counts()
+        self._removed.extend({'file': log_file, 'key': key} for key in delta.removed)
+        return delta
+
+    def _find_notebook_file(self, artifacts_dir, notebook_path):
+        for file_ext in self.NOTEBOOK_FILE_EXTENSIONS:
+            notebook_file = artifacts_dir + notebook_path + '.' + file_ext
+            if os.path.exists(notebook_file):
+                return notebook_file
+        return None
+
+    def _notebook_file_changed(self, notebook):
+        current_file = self._find_notebook_file(self.current_dir + 'artifacts', notebook['path'])
+        base_file = self._find_notebook_file(self.base_dir + 'artifacts', notebook['path'])
+        return current_file is not None and (base_file is None or session_delta.files_differ(base_file, current_file))
+
+    def _write(self, log_file, items):
+        session_delta.write_json_lines(self.delta_dir + log_file, items)
+
+    def _copy(self, source_file, log_file):
+        if os.path.exists(source_file):
+            shutil.copy2(source_file, self.delta_dir + log_file)
+
+    def _copy_base_import_file(self, delta_file, base_files):
+        base_files = [self.base_dir + base_file for base_file in base_files if os.path.exists(self.base_dir + base_file)]
+        if not base_files:
+            return
+        if delta_file != 'job_id_map_base.log':
+            # the mapping of the latest import in the chain is a superset of the earlier ones
+            self._copy(base_files[-1], delta_file)
+            return
+        with open(self.delta_dir + delta_file, 'w') as write_fp:
+            for base_file in base_files:
+                with open(base_file, 'r') as read_fp:
+                    for line in read_fp:
+                        if line.strip():
+                            write_fp.write(line if line.endswith('\n') else line + '\n')
+
+    def run(self):
+        os.makedirs(self.delta_dir, exist_ok=True)
+        for log_file in self.REFERENCE_FILES:
+            self._copy(self.current_dir + log_file, log_file)
+        for delta_file, base_files in self.BASE_IMPORT_FILES.items():
+            self._copy_base_import_file(delta_file, base_files)
+
+        # groups: one file per group
+        groups_delta = session_delta.diff_log_dirs(self.base_dir + 'groups', self.current_dir + 'groups',
+                                                   self.diff_configs['groups'])
+        self._summary['groups'] = groups_delta.counts()
+        self._removed.extend({'file': 'groups', 'key': key} for key in groups_delta.removed)
+        if os.path.exists(self.delta_dir + 'groups'):
+            shutil.rmtree(self.delta_dir + 'groups')
+        os.makedirs(self.delta_dir + 'groups')
+        for group_file in groups_delta.added + groups_delta.changed:
+            shutil.copy2(os.path.join(self.current_dir, 'groups', group_file), self.delta_dir + 'groups/' + group_file)
+
+        # notebooks and directories: link the changed notebooks into the delta artifacts/
+        if os.path.exists(self.delta_dir + 'artifacts'):
+            shutil.rmtree(self.delta_dir + 'artifacts')
+        os.makedirs(self.delta_dir + 'artifacts')
+        dirs_delta = self._diff_log('user_dirs.log')
+        notebooks_delta = self._diff_log('user_workspace.log', self._notebook_file_changed)
+        self._write('user_dirs.log', dirs_delta.added + dirs_delta.changed)
+        self._write('user_workspace.log', notebooks_delta.added + notebooks_delta.changed)
+        for directory in dirs_delta.added:
+            os.makedirs(self.delta_dir + 'artifacts' + directory['path'], exist_ok=True)
+        for notebook in notebooks_delta.added + notebooks_delta.changed:
+            notebook_file = self._find_notebook_file(self.current_dir + 'artifacts', notebook['path'])
+            if notebook_file:
+                session_delta.link_or_copy(
+                    notebook_file, self.delta_dir + 'artifacts' + notebook_file[len(self.current_dir + 'artifacts'):])
+
+        # workspace ACLs
+        for log_file in ['acl_notebooks.log', 'acl_directories.log']:
+            acl_delta = self._diff_log(log_file)
+            self._write(log_file, acl_delta.added + acl_delta.changed)
+        self._write('acl_repos.log', [])
+
+        # cluster policies and clusters: new ones are created, changed clusters are edited in place
+        policies_delta = self._diff_log('cluster_policies.log')
+        self._write('cluster_policies_added.log', policies_delta.added)
+        policy_acls_delta = self._diff_log('acl_cluster_policies.log')
+        self._write('acl_cluster_policies_delta.log', policy_acls_delta.added + policy_acls_delta.changed)
+        clusters_delta = self._diff_log('clusters.log')
+        self._write('clusters_added.log', clusters_delta.added)
+        self._write('clusters_changed.log', clusters_delta.changed)
+        cluster_acls_delta = self._diff_log('acl_clusters.log')
+        self._write('acl_clusters_delta.log', cluster_acls_delta.added + cluster_acls_delta.changed)
+
+        # jobs: new ones are created, changed ones are reset through the job id map of the base import
+        jobs_delta = self._diff_log('jobs.log')
+        self._write('jobs_added.log', jobs_delta.added)
+        self._write('jobs_changed.log', jobs_delta.changed)
+        added_job_ids = {f"/jobs/{job['job_id']}" for job in jobs_delta.added}
+        job_acls_delta = self._diff_log('acl_jobs.log')
+        job_acls = job_acls_delta.added + job_acls_delta.changed
+        self._write('acl_jobs_added.log', [acl for acl in job_acls if acl['object_id'] in added_job_ids])
+        self._write('acl_jobs_changed.log', [acl for acl in job_acls if acl['object_id'] not in added_job_ids])
+
+        # listed only, nothing is deleted in the destination workspace
+        self._write('delta_removed.log', self._removed)
+        with open(self.delta_dir + 'delta_summary.json', 'w') as fp:
+            fp.write(json.dumps(self._summary, indent=2))
+        for name, counts in self._summary.items():
+            logging.info(f"Delta {name}: {counts}")
+
+
+class ClustersDeltaImportTask(AbstractTask):
+    """Task that imports the cluster policies and clusters laid out by SessionDeltaTask."""
+    def __init__(self, client_config, checkpoint_service, skip=False):
+        super().__init__("import_clusters_delta", wmconstants.WM_IMPORT, wmconstants.CLUSTER_OBJECT, skip)
+        self.client_config = client_config
+        self.checkpoint_service = checkpoint_service
+
+    def run(self):
+        cl_c = ClustersClient(self.client_config, self.checkpoint_service)
+        cl_c.import_cluster_policies(log_file='cluster_policies_added.log', acl_log_file='acl_cluster_policies_delta.log',
+                                     num_parallel=self.client_config["num_parallel"])
+        cl_c.import_cluster_configs(log_file='clusters_added.log', acl_log_file='acl_clusters_delta.log',
+                                    num_parallel=self.client_config["num_parallel"])
+        cl_c.update_cluster_configs(log_file='clusters_changed.log')
+
+
+class JobsDeltaImportTask(AbstractTask):
+    """Task that imports the jobs laid out by SessionDeltaTask."""
+    def __init__(self, client_config, checkpoint_service, skip=False):
+        super().__init__("import_jobs_delta", wmconstants.WM_IMPORT, wmconstants.JOB_OBJECT, skip)
+        self.client_config = client_config
+        self.checkpoint_service = checkpoint_service
+
+    def run(self):
+        jobs_c = JobsClient(self.client_config, self.checkpoint_service)
+        jobs_c.import_job_configs(log_file='jobs_added.log', acl_file='acl_jobs_added.log',
+                                  num_parallel=self.client_config["num_parallel"])
+        jobs_c.update_job_configs(log_file='jobs_changed.log', acl_file='acl_jobs_changed.log',
+                                  job_map_file='job_id_map_base.log')
+
+
 class FinishExportTask(AbstractTask):
     """
     Final tasks to finish export. This task will print out necessary information to be used for import pipeline.
@@ -301,5 +301,31 @@ class ImportUserTaskTest(BaseTaskTest):
             UserImportTask(test_client_config()).run()
 
 
+class DeltaImportTaskTest(unittest.TestCase):
+    def setUp(self):
+        self.client_config = dict(test_client_config(), num_parallel=3)
+        self.checkpoint_service = mock.MagicMock()
+
+    @mock.patch('tasks.tasks.ClustersClient')
+    def test_clusters_delta_import(self, clusters_client):
+        ClustersDeltaImportTask(self.client_config, self.checkpoint_service).run()
+        clusters_client.assert_called_once_with(self.client_config, self.checkpoint_service)
+        cl_c = clusters_client.return_value
+        cl_c.import_cluster_policies.assert_called_once_with(
+            log_file='cluster_policies_added.log', acl_log_file='acl_cluster_policies_delta.log', num_parallel=3)
+        cl_c.import_cluster_configs.assert_called_once_with(
+            log_file='clusters_added.log', acl_log_file='acl_clusters_delta.log', num_parallel=3)
+        cl_c.update_cluster_configs.assert_called_once_with(log_file='clusters_changed.log')
+
+    @mock.patch('tasks.tasks.JobsClient')
+    def test_jobs_delta_import(self, jobs_client):
+        JobsDeltaImportTask(self.client_config, self.checkpoint_service).run()
+        jobs_client.assert_called_once_with(self.client_config, self.checkpoint_service)
+        jobs_c = jobs_client.return_value
+        jobs_c.import_job_configs.assert_called_once_with(
+            log_file='jobs_added.log', acl_file='acl_jobs_added.log', num_parallel=3)
+        jobs_c.update_job_configs.assert_called_once_with(
+            log_file='jobs_changed.log', acl_file='acl_jobs_changed.log', job_map_file='job_id_map_base.log')
+
 if __name__ == '__main__':
     unittest.main()
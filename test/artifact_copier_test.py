@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+from mlflow.entities import FileInfo
+from artifact_copier import ArtifactCopier
+from checkpoint_service import CheckpointKeyMap
+
+
+class ArtifactCopierTest(unittest.TestCase):
+    def setUp(self):
+        self.staging_dir = tempfile.mkdtemp() + '/'
+        self.checkpointer = CheckpointKeyMap(os.path.join(tempfile.mkdtemp(), 'steps.log'))
+        self.tree = {
+            None: [FileInfo('model', True, None), FileInfo('small.txt', False, 10)],
+            'model': [FileInfo('model/data', True, None), FileInfo('model/MLmodel', False, 100)],
+            'model/data': [FileInfo('model/data/model.pkl', False, 1000)],
+        }
+        self.src_client = MagicMock()
+        self.src_client.list_artifacts.side_effect = lambda run_id, path: self.tree[path]
+
+        def _download_artifacts(run_id, path, dst_path):
+            local_path = os.path.join(dst_path, path)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            with open(local_path, 'w') as fp:
+                fp.write(path)
+            return local_path
+        self.src_client.download_artifacts.side_effect = _download_artifacts
+        self.uploaded = []
+        self.uploaded_lock = threading.Lock()
+
+        def _log_artifact(run_id, local_path, artifact_path):
+            with self.uploaded_lock:
+                self.uploaded.append((run_id, os.path.basename(local_path), artifact_path))
+        self.dst_client = MagicMock()
+        self.dst_client.log_artifact.side_effect = _log_artifact
+
+    def test_list_files(self):
+        copier = ArtifactCopier(self.src_client, self.dst_client, self.staging_dir, self.checkpointer)
+        self.assertEqual(sorted(f.path for f in copier.list_files('run1')),
+                         ['model/MLmodel', 'model/data/model.pkl', 'small.txt'])
+        copier.close()
+
+    def test_copy_largest_first_and_checkpoint_each_file(self):
+        copier = ArtifactCopier(self.src_client, self.dst_client, self.staging_dir, self.checkpointer, num_parallel=1)
+        copier.copy('run1', 'new1')
+        self.assertEqual(self.uploaded, [('new1', 'model.pkl', 'model/data'), ('new1', 'MLmodel', 'model'),
+                                         ('new1', 'small.txt', None)])
+        # the staged files are removed once they are uploaded
+        self.assertFalse(os.path.exists(self.staging_dir + 'run1_temp/'))
+
+        # a resumed copy only copies the files that are not checkpointed yet
+        self.checkpointer.remove('run1_artifacts/small.txt')
+        self.uploaded.clear()
+        copier.copy('run1', 'new1')
+        self.assertEqual(self.uploaded, [('new1', 'small.txt', None)])
+        copier.close()
+
+    def test_failed_file_is_not_checkpointed(self):
+        def _log_artifact(run_id, local_path, artifact_path):
+            if local_path.endswith('MLmodel'):
+                raise IOError('upload failed')
+        self.dst_client.log_artifact.side_effect = _log_artifact
+        copier = ArtifactCopier(self.src_client, self.dst_client, self.staging_dir, self.checkpointer, num_parallel=1)
+        with self.assertRaises(IOError):
+            copier.copy('run1', 'new1')
+        copier.close()
+        self.assertTrue(self.checkpointer.contains('run1_artifacts/model/data/model.pkl'))
+        self.assertFalse(self.checkpointer.contains('run1_artifacts/model/MLmodel'))
+
+    def test_staged_bytes_are_bounded(self):
+        staged = []
+        max_staged = [0]
+        lock = threading.Lock()
+        download_artifacts = self.src_client.download_artifacts.side_effect
+
+        def _download_artifacts(run_id, path, dst_path):
+            with lock:
+                staged.append(path)
+                max_staged[0] = max(max_staged[0], len(staged))
+            return download_artifacts(run_id, path, dst_path)
+
+        def _log_artifact(run_id, local_path, artifact_path):
+            with lock:
+                staged.pop()
+        self.src_client.download_artifacts.side_effect = _download_artifacts
+        self.dst_client.log_artifact.side_effect = _log_artifact
+        # model.pkl fills the budget on its own, so it is never staged along with another file
+        copier = ArtifactCopier(self.src_client, self.dst_client, self.staging_dir, self.checkpointer,
+                                num_parallel=3, max_staged_bytes=1000)
+        copier.copy('run1', 'new1')
+        copier.close()
+        self.assertEqual(copier._staged_bytes, 0)
+        self.assertLessEqual(max_staged[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import concurrent.futures
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from batched_sqlite_writer import BatchedSqliteWriter
+
+
+class BatchedSqliteWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.db_file = os.path.join(tempfile.mkdtemp(), 'runs.db')
+        con = sqlite3.connect(self.db_file)
+        with con:
+            con.execute('CREATE TABLE runs (id TEXT UNIQUE, start_time INT, run_obj TEXT)')
+        con.close()
+
+    def _count_rows(self):
+        con = sqlite3.connect(self.db_file)
+        count = con.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+        con.close()
+        return count
+
+    def test_write_from_many_threads(self):
+        writer = BatchedSqliteWriter(self.db_file, "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", batch_size=100)
+        committed_counts = []
+
+        def _write_experiment(i):
+            writer.write([(f'run_{i}_{j}', j, '{}') for j in range(50)])
+            writer.write([(f'run_{i}_{j}', j, '{}') for j in range(50, 75)])
+            writer.on_committed(lambda: committed_counts.append(self._count_rows()))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(_write_experiment, range(40)))
+        writer.close()
+
+        self.assertEqual(self._count_rows(), 40 * 75)
+        # every callback sees at least the rows of its own experiment committed
+        self.assertEqual(len(committed_counts), 40)
+        self.assertTrue(all(count >= 75 for count in committed_counts))
+
+    def test_close_raises_writer_error(self):
+        writer = BatchedSqliteWriter(self.db_file, "INSERT INTO missing_table VALUES (?)")
+        writer.write([('run_1',)])
+        with self.assertRaises(sqlite3.OperationalError):
+            writer.close()
+
+    def test_close_raises_connection_error(self):
+        # the database cannot be opened in a missing directory
+        writer = BatchedSqliteWriter(os.path.join(self.db_file, 'missing', 'runs.db'),
+                                     "INSERT INTO runs VALUES (?, ?, ?)", max_queued_writes=2)
+        with self.assertRaises(sqlite3.OperationalError):
+            # more writes than the queue holds, none of them blocks
+            for i in range(10):
+                writer.write([(f'run_{i}', i, '{}')])
+        with self.assertRaises(sqlite3.OperationalError):
+            writer.close()
+
+    def test_close_raises_pragma_error(self):
+        con = MagicMock()
+        con.execute.side_effect = sqlite3.OperationalError('database is locked')
+        with patch('batched_sqlite_writer.sqlite3.connect', return_value=con):
+            writer = BatchedSqliteWriter(self.db_file, "INSERT INTO runs VALUES (?, ?, ?)", max_queued_writes=2)
+            with self.assertRaises(sqlite3.OperationalError):
+                for i in range(10):
+                    writer.write([(f'run_{i}', i, '{}')])
+            with self.assertRaises(sqlite3.OperationalError):
+                writer.close()
+        con.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
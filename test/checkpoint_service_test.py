@@ -83,3 +83,24 @@ class TestCheckpointService(unittest.TestCase):
             assert(key_counter_map[key] == 1)
 
         os.remove("test/checkpoint/export_mlflow_runs.log")
+
+    def test_checkpoint_key_map_update(self):
+        TEST_CONFIG['export_dir'] = 'test/'
+        TEST_CONFIG['use_checkpoint'] = True
+
+        checkpoint_service = CheckpointService(TEST_CONFIG)
+        checkpoint_key_map = checkpoint_service.get_checkpoint_key_map(
+            wmconstants.WM_SYNC, wmconstants.SYNC_WATERMARK_OBJECT)
+        checkpoint_key_map.write("last_session", "M1")
+        checkpoint_key_map.write("last_session", "M2")
+        assert(checkpoint_key_map.get("last_session") == "M1")
+        checkpoint_key_map.update("last_session", "M3")
+        assert(checkpoint_key_map.get("last_session") == "M3")
+
+        # the last value written wins on restore
+        restored_key_map = checkpoint_service.get_checkpoint_key_map(
+            wmconstants.WM_SYNC, wmconstants.SYNC_WATERMARK_OBJECT)
+        assert(restored_key_map.get("last_session") == "M3")
+        assert(restored_key_map.keys() == ["last_session"])
+
+        os.remove("test/checkpoint/sync_watermarks.log")
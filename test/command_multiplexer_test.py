@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import MagicMock
+from command_multiplexer import CommandMultiplexer
+
+
+class CommandMultiplexerTest(unittest.TestCase):
+    def setUp(self):
+        # command i is still running for its first i status polls
+        self.polls = {}
+        self.client = MagicMock()
+        self.client.get_key.side_effect = lambda resp, key: resp[key]
+        self.client.post.side_effect = lambda endpoint, json_params, version: {'id': json_params['command']}
+
+        def _get(endpoint, json_params, version):
+            command_id = json_params['commandId']
+            self.polls[command_id] = self.polls.get(command_id, 0) + 1
+            if self.polls[command_id] <= int(command_id):
+                return {'status': 'Running'}
+            return {'status': 'Finished', 'results': {'resultType': 'text', 'data': f'done {command_id}'}}
+        self.client.get.side_effect = _get
+
+    def test_commands_are_polled_until_finished(self):
+        multiplexer = CommandMultiplexer(self.client)
+        multiplexer.INITIAL_POLL_INTERVAL = 0.01
+        futures = [multiplexer.submit('c1', f'ec{i % 2}', str(i)) for i in range(6)]
+        self.assertEqual([f.result(timeout=10)['data'] for f in futures], [f'done {i}' for i in range(6)])
+        self.assertEqual(self.polls, {str(i): i + 1 for i in range(6)})
+
+    def test_failed_submit(self):
+        self.client.post.side_effect = lambda endpoint, json_params, version: {'error_code': 'INVALID_STATE'}
+        future = CommandMultiplexer(self.client).submit('c1', 'ec0', '1')
+        with self.assertRaises(ValueError):
+            future.result(timeout=10)
+        self.client.get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
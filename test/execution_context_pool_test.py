@@ -0,0 +1,97 @@
+import json
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from checkpoint_service import CheckpointService
+from execution_context_pool import ExecutionContextPool
+
+
+class ExecutionContextPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.alive = set()
+        self.created = []
+        self.client = MagicMock()
+
+        def _post(endpoint, json_params=None, version='2.0'):
+            ec_id = f'ec{len(self.created)}'
+            self.created.append(ec_id)
+            self.alive.add(ec_id)
+            return {'id': ec_id}
+
+        def _get(endpoint, json_params=None, version='2.0'):
+            return {'id': json_params['contextId'],
+                    'status': 'Running' if json_params['contextId'] in self.alive else 'Error'}
+        self.client.post.side_effect = _post
+        self.client.get.side_effect = _get
+
+    def test_shared_context_is_reused_and_recreated(self):
+        pool = ExecutionContextPool(self.client, 'c1', 2)
+        ec_id = pool.get_context()
+        self.assertEqual(pool.get_context(), ec_id)
+        self.assertEqual(self.created, [ec_id])
+        # e.g. the cluster restarted
+        self.alive.clear()
+        self.assertNotEqual(pool.get_context(), ec_id)
+        self.assertEqual(len(self.created), 2)
+
+    def test_exclusive_contexts_are_bounded(self):
+        pool = ExecutionContextPool(self.client, 'c1', 2)
+
+        def _use_context(i):
+            with pool.context() as ec_id:
+                return ec_id
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            used_contexts = set(executor.map(_use_context, range(20)))
+        self.assertLessEqual(len(self.created), 2)
+        self.assertEqual(used_contexts, set(self.created))
+        self.assertNotIn(pool.get_context(), used_contexts)
+
+    def test_contexts_are_created_outside_of_the_lock(self):
+        pool = ExecutionContextPool(self.client, 'c1', 2)
+        ec_id = pool.acquire()
+        creating = threading.Event()
+        created = threading.Event()
+        post = self.client.post.side_effect
+
+        def _slow_post(endpoint, json_params=None, version='2.0'):
+            creating.set()
+            created.wait(10)
+            return post(endpoint, json_params, version)
+        self.client.post.side_effect = _slow_post
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(pool.acquire)
+            self.assertTrue(creating.wait(10))
+            # the context being created is reserved, its slot is not handed out twice
+            self.assertEqual(pool._num_reserved, 1)
+            # the poller thread releases contexts while another one is created
+            pool.release(ec_id)
+            self.assertEqual(pool.acquire(), ec_id)
+            created.set()
+            self.assertEqual(future.result(timeout=10), self.created[-1])
+        self.assertEqual(pool._num_reserved, 0)
+        self.assertEqual(len(self.created), 2)
+
+    def test_reattach_from_checkpoint(self):
+        config = {'use_checkpoint': True, 'export_dir': tempfile.mkdtemp() + '/'}
+        checkpoint_service = CheckpointService(config)
+        pool = ExecutionContextPool(self.client, 'c1', 2,
+                                    checkpoint_service.get_checkpoint_key_map('session', 'execution_contexts'))
+        shared_ec_id = pool.get_context()
+        with pool.context() as ec_id:
+            pass
+        self.alive.discard(ec_id)
+
+        restored_pool = ExecutionContextPool(self.client, 'c1', 2,
+                                             checkpoint_service.get_checkpoint_key_map('session',
+                                                                                       'execution_contexts'))
+        self.assertEqual(restored_pool.get_context(), shared_ec_id)
+        self.assertEqual(len(self.created), 2)
+        with open(config['export_dir'] + 'checkpoint/session_execution_contexts.log') as fp:
+            saved = json.loads(json.loads(fp.readlines()[-1])['value'])
+        self.assertEqual(saved, {'shared': shared_ec_id, 'exclusive': [ec_id]})
+
+
+if __name__ == '__main__':
+    unittest.main()
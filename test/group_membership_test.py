@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from group_membership import GroupMembershipIndex, get_group_membership_index
+
+
+class GroupMembershipIndexTest(unittest.TestCase):
+    def setUp(self):
+        # u1 is in g1, g1 is in g2, g2 and g3 are nested in each other, u2 is only in g4
+        listings = {'/preview/scim/v2/Users': [{'id': '1', 'userName': 'u1@b.com'},
+                                               {'id': '2', 'userName': 'u2@b.com'}],
+                    '/preview/scim/v2/ServicePrincipals': [{'id': '5', 'applicationId': 'app-a'}],
+                    '/preview/scim/v2/Groups': [
+                        {'id': '10', 'displayName': 'g1', 'members': [{'$ref': 'Users/1', 'value': '1'},
+                                                                      {'$ref': 'ServicePrincipals/5', 'value': '5'}]},
+                        {'id': '11', 'displayName': 'g2', 'members': [{'$ref': 'Groups/10', 'value': '10'},
+                                                                      {'$ref': 'Groups/12', 'value': '12'}]},
+                        {'id': '12', 'displayName': 'g3', 'members': [{'$ref': 'Groups/11', 'value': '11'}]},
+                        {'id': '13', 'displayName': 'g4', 'members': [{'$ref': 'Users/2', 'value': '2'}]}]}
+        self.client = MagicMock()
+        self.client.get_export_dir.return_value = tempfile.mkdtemp() + '/'
+        self.client.scim_iterator.side_effect = lambda endpoint, params=None: iter(listings[endpoint])
+
+    def test_build(self):
+        index = GroupMembershipIndex.build(self.client)
+        self.assertEqual(index.user_groups('u1@b.com'), {'g1', 'g2', 'g3'})
+        self.assertEqual(index.user_groups('u2@b.com'), {'g4'})
+        self.assertEqual(index.service_principal_groups('app-a'), {'g1', 'g2', 'g3'})
+        self.assertEqual(index.users_in_groups(['g3']), {'u1@b.com'})
+        self.assertEqual(index.users_in_groups(['g1', 'g4']), {'u1@b.com', 'u2@b.com'})
+        self.assertEqual(index.groups_within(['g2']), {'g1', 'g2', 'g3'})
+        self.assertEqual(index.groups_within(['g4']), {'g4'})
+
+    def test_get_group_membership_index_is_built_once(self):
+        index = get_group_membership_index(self.client)
+        self.assertIs(get_group_membership_index(self.client), index)
+        self.assertEqual(self.client.scim_iterator.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
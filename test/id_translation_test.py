@@ -0,0 +1,41 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from id_translation import get_id_translation_cache
+
+
+class IdTranslationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp() + '/'
+        with open(self.export_dir + 'instance_pools.log', 'w') as fp:
+            fp.write(json.dumps({'instance_pool_id': 'old-p1', 'instance_pool_name': 'p1'}) + '\n')
+            fp.write(json.dumps({'instance_pool_id': 'old-p2', 'instance_pool_name': 'p2'}) + '\n')
+        with open(self.export_dir + 'job_id_map.log', 'w') as fp:
+            fp.write(json.dumps({'old_id': 1, 'new_id': '101'}) + '\n')
+        self.client = MagicMock()
+        self.client.get_export_dir.return_value = self.export_dir
+        self.client.get.return_value = {'instance_pools': [{'instance_pool_name': 'p1', 'instance_pool_id': 'new-p1'}]}
+
+    def test_pools_are_listed_once_and_updated(self):
+        cache = get_id_translation_cache(self.client)
+        old_pools = cache.source_names(self.export_dir + 'instance_pools.log', 'instance_pool_id', 'instance_pool_name')
+        self.assertEqual(cache.translate(old_pools, cache.pool_ids()), {'old-p1': 'new-p1'})
+        cache.add_pool('p2', 'new-p2')
+        self.assertEqual(cache.translate(old_pools, cache.pool_ids()), {'old-p1': 'new-p1', 'old-p2': 'new-p2'})
+        self.client.get.assert_called_once_with('/instance-pools/list')
+        self.assertIs(get_id_translation_cache(self.client), cache)
+        self.assertIsNot(get_id_translation_cache(self.client, refresh=True), cache)
+
+    def test_job_ids(self):
+        cache = get_id_translation_cache(self.client)
+        job_map_log = self.export_dir + 'job_id_map.log'
+        self.assertEqual(cache.job_ids(job_map_log), {'1': '101'})
+        cache.add_job(job_map_log, 2, '102')
+        self.assertEqual(cache.job_ids(job_map_log), {'1': '101', '2': '102'})
+        cache.reset_job_ids(job_map_log)
+        self.assertEqual(cache.job_ids(job_map_log), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from identity_directory import IdentityDirectory, get_identity_directory, IDENTITY_DIRECTORY_FILE
+
+
+class IdentityDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp() + '/'
+        with open(self.export_dir + 'users.log', 'w') as fp:
+            fp.write(json.dumps({'id': '1', 'userName': 'a@b.com'}) + '\n')
+            fp.write(json.dumps({'id': '2', 'userName': 'missing@b.com'}) + '\n')
+        os.makedirs(self.export_dir + 'groups')
+        with open(self.export_dir + 'groups/g1', 'w') as fp:
+            fp.write(json.dumps({'id': '10', 'displayName': 'g1'}))
+        with open(self.export_dir + 'service_principals_id_mapping.log', 'w') as fp:
+            fp.write(json.dumps({'display_name': 'sp', 'exported_id': '20', 'current_id': '200',
+                                 'exported_app_id': 'app-a', 'current_app_id': 'app-b'}) + '\n')
+        listings = {'/preview/scim/v2/Users': [{'id': '100', 'userName': 'a@b.com'}],
+                    '/preview/scim/v2/Groups': [{'id': '110', 'displayName': 'g1'}]}
+        self.client = MagicMock()
+        self.client.get_export_dir.return_value = self.export_dir
+        self.client.scim_iterator.side_effect = lambda endpoint, params=None: iter(listings[endpoint])
+
+    def test_build(self):
+        directory = IdentityDirectory.build(self.client)
+        self.assertEqual(directory.user_ids(), {'a@b.com': '100'})
+        self.assertEqual(directory.source_user_names(), {'1': 'a@b.com', '2': 'missing@b.com'})
+        self.assertEqual(directory.group_ids(), {'g1': '110'})
+        self.assertEqual(directory.service_principal_ids(), {'20': '200'})
+        self.assertEqual(directory.service_principal_app_ids(), {'app-a': 'app-b'})
+
+    def test_get_identity_directory_is_built_once(self):
+        directory = get_identity_directory(self.client)
+        self.assertTrue(os.path.exists(self.export_dir + IDENTITY_DIRECTORY_FILE))
+        self.assertIs(get_identity_directory(self.client), directory)
+        self.assertEqual(self.client.scim_iterator.call_count, 2)
+        # a saved directory is loaded without listing the workspace again
+        self.assertEqual(IdentityDirectory.load(self.export_dir + IDENTITY_DIRECTORY_FILE).user_ids(),
+                         directory.user_ids())
+        self.assertIsNot(get_identity_directory(self.client, refresh=True), directory)
+        self.assertEqual(self.client.scim_iterator.call_count, 4)
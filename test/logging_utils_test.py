@@ -0,0 +1,52 @@
+import logging
+import os
+import tempfile
+import unittest
+import logging_utils
+
+
+class LoggingUtilsTest(unittest.TestCase):
+    def _file_handlers(self, logger):
+        return [handler.baseFilename for handler in logger.handlers if isinstance(handler, logging.FileHandler)]
+
+    def test_get_error_logger_adds_one_handler_per_file(self):
+        session1, session2 = tempfile.mkdtemp(), tempfile.mkdtemp()
+        logger = logging_utils.get_error_logger('export', 'test_objects', session1)
+        logging_utils.get_error_logger('export', 'test_objects', session1)
+        logging_utils.get_error_logger('import', 'test_objects', session1)
+        self.assertEqual(len(self._file_handlers(logger)), 2)
+
+        # the handlers of the previous session are closed
+        logging_utils.get_error_logger('export', 'test_objects', session2)
+        self.assertEqual(self._file_handlers(logger),
+                         [os.path.abspath(logging_utils.get_error_log_file('export', 'test_objects', session2))])
+        logger.error('failed')
+        with open(logging_utils.get_error_log_file('export', 'test_objects', session2)) as fp:
+            self.assertEqual(fp.read(), 'failed\n')
+        with open(logging_utils.get_error_log_file('export', 'test_objects', session1)) as fp:
+            self.assertEqual(fp.read(), '')
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+    def test_set_default_logging_replaces_the_handlers(self):
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        try:
+            logging_utils.set_default_logging(tempfile.mkdtemp())
+            session2 = tempfile.mkdtemp()
+            logging_utils.set_default_logging(session2, logging.DEBUG)
+            self.assertEqual(self._file_handlers(root), [os.path.abspath(session2 + '/app_logs/wm_logs.log')])
+            self.assertEqual(len(root.handlers), 2)
+            self.assertEqual(root.level, logging.DEBUG)
+        finally:
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+                handler.close()
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import migration_pipeline
+import wmconstants
+from checkpoint_service import CheckpointService
+from dbclient import parser
+
+
+class RunSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp() + '/'
+        self.args = parser.get_pipeline_parser().parse_args(
+            ['--sync', '--destination-profile', 'dst', '--delta-from-session', 'base', '--sync-cycles', '3',
+             '--set-export-dir', self.export_dir])
+        self.sessions = iter(['s1', 's2', 's3'])
+        self.built = []
+
+    def _build_pipeline(self, args):
+        self.built.append(args)
+        pipeline = MagicMock()
+        if args.import_pipeline:
+            def _run():
+                # the import of the second cycle fails
+                if args.session == 's2':
+                    raise RuntimeError('import failed')
+                os.makedirs(os.path.join(self.export_dir, args.session, 'delta'), exist_ok=True)
+                with open(os.path.join(self.export_dir, args.session, 'delta', 'delta_summary.json'), 'w') as fp:
+                    fp.write(json.dumps({'jobs.log': {'added': 1}, 'clusters.log': {'changed': 2}}))
+            pipeline.run.side_effect = _run
+        return pipeline
+
+    def _get_watermarks(self):
+        return CheckpointService({'use_checkpoint': True, 'export_dir': self.export_dir}).get_checkpoint_key_map(
+            wmconstants.WM_SYNC, wmconstants.SYNC_WATERMARK_OBJECT)
+
+    def test_run_sync(self):
+        with patch.object(migration_pipeline, 'build_pipeline', side_effect=self._build_pipeline), \
+                patch.object(migration_pipeline, 'generate_session', side_effect=lambda args: next(self.sessions)), \
+                patch.object(migration_pipeline.time, 'sleep') as sleep:
+            migration_pipeline.run_sync(self.args)
+
+        # each cycle exports incrementally from, and imports the delta of, the last session that was fully synced
+        exports = [(a.session, a.incremental_from_session) for a in self.built if a.export_pipeline]
+        imports = [(a.session, a.delta_from_session, a.profile) for a in self.built if a.import_pipeline]
+        self.assertEqual(exports, [('s1', 'base'), ('s2', 's1'), ('s3', 's1')])
+        self.assertEqual(imports, [('s1', 'base', 'dst'), ('s2', 's1', 'dst'), ('s3', 's1', 'dst')])
+        self.assertTrue(all(a.use_checkpoint and not a.sync for a in self.built))
+        self.assertEqual(sleep.call_count, 2)
+
+        watermarks = self._get_watermarks()
+        self.assertEqual(watermarks.get('last_session'), 's3')
+        self.assertEqual(sorted(watermarks.keys()), ['clusters', 'jobs', 'last_session'])
+        self.assertEqual(json.loads(watermarks.get('jobs'))['session'], 's3')
+
+    def test_run_sync_resumes_from_the_watermark(self):
+        self._get_watermarks().update('last_session', 's0')
+        self.args.delta_from_session = ''
+        self.args.sync_cycles = 1
+        with patch.object(migration_pipeline, 'build_pipeline', side_effect=self._build_pipeline), \
+                patch.object(migration_pipeline, 'generate_session', side_effect=lambda args: next(self.sessions)):
+            migration_pipeline.run_sync(self.args)
+        self.assertEqual([a.incremental_from_session for a in self.built if a.export_pipeline], ['s0'])
+        self.assertEqual(self._get_watermarks().get('last_session'), 's1')
+
+
+if __name__ == '__main__':
+    unittest.main()
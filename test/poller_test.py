@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import patch
+from poller import Poller
+
+
+class PollerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.sleeps = []
+
+        def _sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+        self.patches = [patch('poller.time.monotonic', side_effect=lambda: self.now),
+                        patch('poller.time.sleep', side_effect=_sleep)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_wait_backs_off_within_the_jitter(self):
+        states = iter(['PENDING'] * 6 + ['RUNNING'])
+        poller = Poller(initial_interval=1, max_interval=8, backoff=2, jitter=0.2)
+        self.assertEqual(poller.wait(lambda: next(states), lambda state: state == 'RUNNING'), 'RUNNING')
+        for sleep, interval in zip(self.sleeps, [1, 2, 4, 8, 8, 8]):
+            self.assertGreaterEqual(sleep, interval * 0.8)
+            self.assertLessEqual(sleep, interval * 1.2)
+        self.assertEqual(len(self.sleeps), 6)
+
+    def test_wait_all_returns_the_final_states(self):
+        polls = []
+
+        def _get_states(keys):
+            polls.append(list(keys))
+            return {key: 'DONE' for key in keys[:1]}
+        states = Poller(jitter=0).wait_all(['a', 'b', 'c'], _get_states, lambda state: state == 'DONE')
+        self.assertEqual(states, {'a': 'DONE', 'b': 'DONE', 'c': 'DONE'})
+        # only the pending keys are polled
+        self.assertEqual(polls, [['a', 'b', 'c'], ['b', 'c'], ['c']])
+
+    def test_wait_times_out(self):
+        poller = Poller(initial_interval=10, max_interval=10, jitter=0, timeout=25)
+        with self.assertRaises(TimeoutError):
+            poller.wait(lambda: 'PENDING', lambda state: False)
+        # the last sleep ends at the deadline
+        self.assertEqual(self.sleeps, [10, 10, 5])
+
+    def test_failed_polls_are_retried_up_to_max_errors(self):
+        results = iter([IOError('1'), IOError('2'), 'RUNNING'])
+
+        def _get_state():
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        self.assertEqual(Poller(max_errors=2, jitter=0).wait(_get_state, lambda state: True), 'RUNNING')
+
+        results = iter([IOError('1'), IOError('2'), 'RUNNING'])
+        with self.assertRaises(IOError):
+            Poller(max_errors=1, jitter=0).wait(_get_state, lambda state: True)
+
+
+if __name__ == '__main__':
+    unittest.main()
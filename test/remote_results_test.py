@@ -0,0 +1,80 @@
+import base64
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from remote_results import RemoteResultTransport, REMOTE_RESULT_HELPER, RESULT_SIZE_MARKER
+
+
+class RemoteResultTransportTest(unittest.TestCase):
+    def setUp(self):
+        self.tables = [f'table_{i}' for i in range(5000)]
+        self.files = {}
+        self.client = MagicMock()
+
+        def _submit_command(cid, ec_id, cmd):
+            if cmd == REMOTE_RESULT_HELPER:
+                return {'resultType': 'text', 'data': ''}
+            path = cmd.split("'")[-2]
+            self.files[path] = gzip.compress(json.dumps(self.tables).encode('utf-8'))
+            # other output of the command is ignored
+            return {'resultType': 'text',
+                    'data': f"WARNING: deprecated\n{RESULT_SIZE_MARKER}{len(self.files[path])}"}
+
+        def _get(endpoint, json_params):
+            data = self.files[json_params['path']]
+            chunk = data[json_params['offset']:json_params['offset'] + json_params['length']]
+            return {'bytes_read': len(chunk), 'data': base64.b64encode(chunk).decode('ascii')}
+        self.client.submit_command.side_effect = _submit_command
+        self.client.get.side_effect = _get
+
+    def test_get(self):
+        transport = RemoteResultTransport(self.client, 4)
+        transport.READ_SIZE = 1000
+        self.assertEqual(transport.get('c1', 'ec1', 'all_tables'), self.tables)
+        self.assertEqual(transport.get('c1', 'ec1', 'all_tables'), self.tables)
+        # the helper is installed once per context, and the results are read in ranges and deleted
+        helper_installs = [c for c in self.client.submit_command.call_args_list if c.args[2] == REMOTE_RESULT_HELPER]
+        self.assertEqual(len(helper_installs), 1)
+        self.assertGreater(self.client.get.call_count, 2)
+        self.assertEqual(sorted(c.args[1]['path'] for c in self.client.post.call_args_list), sorted(self.files))
+
+    def test_get_fails_on_command_error(self):
+        self.client.submit_command.side_effect = lambda cid, ec_id, cmd: \
+            {'resultType': 'text', 'data': ''} if cmd == REMOTE_RESULT_HELPER else \
+            {'resultType': 'error', 'summary': 'boom'}
+        error_logger = MagicMock()
+        with self.assertRaises(ValueError):
+            RemoteResultTransport(self.client, 4).get('c1', 'ec1', 'all_tables', error_logger)
+        error_logger.error.assert_called_once()
+        self.client.get.assert_not_called()
+
+    def test_get_fails_without_result_size(self):
+        self.client.submit_command.side_effect = lambda cid, ec_id, cmd: {'resultType': 'text', 'data': 'Out[1]: 12'}
+        with self.assertRaises(ValueError):
+            RemoteResultTransport(self.client, 4).get('c1', 'ec1', 'all_tables')
+        # the result file is deleted even though its size is unknown
+        self.client.post.assert_called_once()
+
+    def test_helper_deletes_partial_result(self):
+        dbfs_root = tempfile.mkdtemp()
+        helper_globals = {}
+        # the helper writes below /dbfs on the cluster
+        exec(REMOTE_RESULT_HELPER.replace("'/dbfs'", repr(dbfs_root)), helper_globals)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            helper_globals['_migration_write_result'](self.tables, '/tmp/result.json.gz')
+        self.assertEqual(RemoteResultTransport._parse_size(output.getvalue()),
+                         os.path.getsize(dbfs_root + '/tmp/result.json.gz'))
+
+        with self.assertRaises(TypeError):
+            helper_globals['_migration_write_result']({'not json': object()}, '/tmp/failed.json.gz')
+        self.assertFalse(os.path.exists(dbfs_root + '/tmp/failed.json.gz'))
+
+
+if __name__ == '__main__':
+    unittest.main()
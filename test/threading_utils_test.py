@@ -1,5 +1,6 @@
 import unittest
-from threading_utils import propagate_exceptions
+from unittest.mock import patch
+from threading_utils import propagate_exceptions, RateLimiter
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor
 
@@ -22,4 +23,36 @@ class ThreadingUtilsTest(unittest.TestCase):
         with self.assertRaises(MyBadException):
             futures = run_stuff()
             concurrent.futures.wait(futures)
-            propagate_exceptions(futures)
\ No newline at end of file
+            propagate_exceptions(futures)
+
+    def test_rate_limiter_spaces_out_calls(self):
+        now = [100.0]
+        sleeps = []
+
+        def _sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        with patch('threading_utils.time.monotonic', side_effect=lambda: now[0]), \
+                patch('threading_utils.time.sleep', side_effect=_sleep):
+            limiter = RateLimiter(4)
+            for _ in range(3):
+                limiter.acquire()
+            self.assertEqual(sleeps, [0.25, 0.25])
+            # an idle limiter does not save up slots for a burst
+            now[0] += 10
+            limiter.acquire()
+            limiter.acquire()
+            self.assertEqual(sleeps, [0.25, 0.25, 0.25])
+
+    def test_rate_limiter_is_shared_by_threads(self):
+        now = [0.0]
+        with patch('threading_utils.time.monotonic', side_effect=lambda: now[0]), \
+                patch('threading_utils.time.sleep') as sleep:
+            limiter = RateLimiter(10)
+            with ThreadPoolExecutor(8) as executor:
+                futures = [executor.submit(limiter.acquire) for _ in range(8)]
+                concurrent.futures.wait(futures)
+                propagate_exceptions(futures)
+            # each thread waits for its own slot, 0.1 seconds after the previous one
+            self.assertEqual(sorted(round(call.args[0], 3) for call in sleep.call_args_list),
+                             [round(0.1 * i, 3) for i in range(1, 8)])
@@ -1,3 +1,27 @@
+import threading
+import time
+
+
 def propagate_exceptions(futures):
     # Calling result() on a future whose execution raised an exception will propagate the exception to the caller
     [future.result() for future in futures]
+
+
+class RateLimiter():
+    """Spaces out calls made from any number of threads so that at most max_per_second of them start per second.
+
+    e.g. limiter = RateLimiter(10)
+         limiter.acquire()  # blocks until the next slot
+    """
+    def __init__(self, max_per_second):
+        self._interval = 1.0 / max_per_second
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            time.sleep(wait)
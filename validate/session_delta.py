@@ -0,0 +1,134 @@
+import filecmp
+import json
+import logging
+import os
+import shutil
+from collections import defaultdict
+
+from .json_diff import DiffConfig, prepare_diff_input, diff_json, _get_primary_key
+
+
+class SessionDelta:
+    """
+    Items that were added, changed or removed between the same log file of two export sessions.
+    added and changed hold the raw json objects of the current session, removed holds the primary keys.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.removed = []
+
+    def counts(self):
+        return {'added': len(self.added), 'changed': len(self.changed), 'removed': len(self.removed)}
+
+
+def delta_config(config, ignored_keys=None):
+    """
+    Build the config used to detect changes between two sessions of the same workspace from a validation config.
+    Validation ignores ids that differ across workspaces; within one workspace those ids are stable and a change in
+    e.g. spark_version must be picked up, so only the primary key and the children configs are kept.
+    """
+    return DiffConfig(primary_key=config.primary_key, ignored_keys=ignored_keys, children=config.children)
+
+
+def _prepare(raw, config):
+    """
+    Convert a log entry to diff input. Entries holding lists of dicts the config has no primary key for (e.g. the
+    tasks of a job) are compared as canonical json instead.
+    """
+    try:
+        return prepare_diff_input(raw, config)
+    except (AssertionError, NotImplementedError):
+        return json.dumps(raw, sort_keys=True)
+
+
+def _read_keyed_json_lines(file, config):
+    """
+    :return: dict of primary key -> (raw json object, diff input)
+    """
+    keyed = {}
+    if not os.path.exists(file):
+        return keyed
+    with open(file, 'r') as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            prepared = _prepare(raw, config)
+            key = _get_primary_key(raw, config.primary_key)
+            if key is None:
+                logging.info(f"No keys {str(config.primary_key)} found in {line}")
+                continue
+            keyed[key] = (raw, prepared)
+    return keyed
+
+
+def diff_log_files(base_file, current_file, config, is_changed=None):
+    """
+    Compute the delta of a json-lines log file between a base session and the current session.
+    :param config: DiffConfig with the primary key of the log entries
+    :param is_changed: optional callable(raw_object) for changes that are not visible in the log entry itself
+    :return: SessionDelta
+    """
+    base = _read_keyed_json_lines(base_file, config)
+    current = _read_keyed_json_lines(current_file, config)
+    delta = SessionDelta()
+    counters = defaultdict(int)
+    for key, (raw, prepared) in current.items():
+        if key not in base:
+            delta.added.append(raw)
+        elif diff_json(base[key][1], prepared, counters) or (is_changed and is_changed(raw)):
+            delta.changed.append(raw)
+    delta.removed = [key for key in base.keys() if key not in current]
+    return delta
+
+
+def diff_log_dirs(base_dir, current_dir, config):
+    """
+    Compute the delta of a directory holding one json object per file, e.g. groups/
+    :return: SessionDelta, where added / changed hold the file names
+    """
+    def _read_dir(directory):
+        keyed = {}
+        if not os.path.exists(directory):
+            return keyed
+        for file in os.listdir(directory):
+            with open(os.path.join(directory, file), 'r') as fp:
+                keyed[file] = _prepare(json.loads(fp.read()), config)
+        return keyed
+
+    base = _read_dir(base_dir)
+    current = _read_dir(current_dir)
+    delta = SessionDelta()
+    counters = defaultdict(int)
+    for file, prepared in current.items():
+        if file not in base:
+            delta.added.append(file)
+        elif diff_json(base[file], prepared, counters):
+            delta.changed.append(file)
+    delta.removed = [file for file in base.keys() if file not in current]
+    return delta
+
+
+def write_json_lines(file, items):
+    with open(file, 'w') as fp:
+        for item in items:
+            fp.write(json.dumps(item) + '\n')
+
+
+def link_or_copy(source, destination):
+    """hard-link source to destination, falling back to a copy across filesystems"""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def files_differ(base_file, current_file):
+    if not os.path.exists(base_file):
+        return True
+    return not filecmp.cmp(base_file, current_file, shallow=True)
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+from .json_diff import DiffConfig
+from .session_delta import diff_log_files, diff_log_dirs
+
+
+def _write_lines(file, items):
+    with open(file, 'w') as fp:
+        for item in items:
+            fp.write(json.dumps(item) + '\n')
+
+
+class DiffLogFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.base = os.path.join(self.dir, 'base.log')
+        self.current = os.path.join(self.dir, 'current.log')
+
+    def test_added_changed_removed(self):
+        config = DiffConfig(primary_key='path', ignored_keys={'object_id'})
+        _write_lines(self.base, [{'path': '/a', 'object_id': 1, 'modified_at': 1},
+                                 {'path': '/b', 'object_id': 2, 'modified_at': 1},
+                                 {'path': '/c', 'object_id': 3, 'modified_at': 1}])
+        _write_lines(self.current, [{'path': '/a', 'object_id': 10, 'modified_at': 1},
+                                    {'path': '/b', 'object_id': 2, 'modified_at': 2},
+                                    {'path': '/d', 'object_id': 4, 'modified_at': 1}])
+        delta = diff_log_files(self.base, self.current, config)
+        self.assertEqual([item['path'] for item in delta.added], ['/d'])
+        self.assertEqual([item['path'] for item in delta.changed], ['/b'])
+        self.assertEqual(delta.removed, ['/c'])
+        self.assertEqual(delta.counts(), {'added': 1, 'changed': 1, 'removed': 1})
+
+    def test_is_changed(self):
+        config = DiffConfig(primary_key='path')
+        _write_lines(self.base, [{'path': '/a'}])
+        _write_lines(self.current, [{'path': '/a'}])
+        self.assertEqual(diff_log_files(self.base, self.current, config).changed, [])
+        delta = diff_log_files(self.base, self.current, config, is_changed=lambda item: True)
+        self.assertEqual(delta.changed, [{'path': '/a'}])
+
+    def test_nested_lists_without_config(self):
+        config = DiffConfig(primary_key='job_id')
+        _write_lines(self.base, [{'job_id': 1, 'settings': {'tasks': [{'task_key': 'a'}]}}])
+        _write_lines(self.current, [{'job_id': 1, 'settings': {'tasks': [{'task_key': 'b'}]}}])
+        delta = diff_log_files(self.base, self.current, config)
+        self.assertEqual(len(delta.changed), 1)
+
+    def test_missing_base(self):
+        config = DiffConfig(primary_key='path')
+        _write_lines(self.current, [{'path': '/a'}])
+        delta = diff_log_files(self.base, self.current, config)
+        self.assertEqual(delta.added, [{'path': '/a'}])
+
+
+class DiffLogDirsTest(unittest.TestCase):
+    def test_groups(self):
+        base = tempfile.mkdtemp()
+        current = tempfile.mkdtemp()
+        config = DiffConfig(primary_key='displayName', ignored_keys={'id'},
+                            children={'members': DiffConfig(primary_key='display', ignored_keys={'value'})})
+        for directory, groups in [(base, {'g1': ['u1', 'u2'], 'g2': ['u1'], 'g3': []}),
+                                  (current, {'g1': ['u2', 'u1'], 'g2': ['u3'], 'g4': []})]:
+            for name, members in groups.items():
+                with open(os.path.join(directory, name), 'w') as fp:
+                    fp.write(json.dumps({'displayName': name, 'id': directory,
+                                         'members': [{'display': m, 'value': directory} for m in members]}))
+        delta = diff_log_dirs(base, current, config)
+        self.assertEqual(delta.added, ['g4'])
+        self.assertEqual(delta.changed, ['g2'])
+        self.assertEqual(delta.removed, ['g3'])
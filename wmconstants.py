@@ -3,6 +3,7 @@ USER_OBJECT = "users"
 SERVICE_PRINCIPAL_OBJECT = "service_principals"
 INSTANCE_PROFILE_OBJECT = "instance_profiles"
 GROUP_OBJECT = "groups"
+GROUP_MEMBERS_OBJECT = "group_members"
 WORKSPACE_ITEM_LOG_OBJECT = "workspace_item_log"
 WORKSPACE_NOTEBOOK_PATH_OBJECT = "notebook_paths"
 WORKSPACE_NOTEBOOK_OBJECT = "notebooks"
@@ -14,6 +15,7 @@ WORKSPACE_REPO_ACL_OBJECT = "acl_repos"
 METASTORE_TABLES = "metastore"
 METASTORE_TABLES_ACL = "metastore_acl"
 CLUSTER_OBJECT = "clusters"
+CLUSTER_POLICY_OBJECT = "cluster_policies"
 INSTANCE_POOL_OBJECT = "instance_pools"
 JOB_OBJECT = "jobs"
 SECRET_OBJECT = "secrets"
@@ -23,12 +25,17 @@ MLFLOW_RUN_OBJECT = "mlflow_runs"
 
 # Migration pipeline placeholder constants
 MIGRATION_PIPELINE_OBJECT_TYPE = "tasks"
+SESSION_DELTA_OBJECT = "session_delta"
+SYNC_WATERMARK_OBJECT = "watermarks"
+EXECUTION_CONTEXT_OBJECT = "execution_contexts"
 IGNORE_ERROR_LIST = ['RESOURCE_ALREADY_EXISTS', 'FEATURE_DISABLED']
 
 # Actions
 WM_EXPORT = "export"
 WM_IMPORT = "import"
 WM_VALIDATE = "validate"
+WM_SYNC = "sync"
+WM_SESSION = "session"
 
 # List of task objects in a pipeline
 INSTANCE_PROFILES = "instance_profiles"